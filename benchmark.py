@@ -0,0 +1,343 @@
+"""
+Нагрузочный тест обработки обновлений
+
+Использование: python benchmark.py [--database URL ...] [--caches on|off|both] [--users N] [--groups N]
+                                   [--updates N] [--concurrency N] [--json файл]
+                                   [--baseline файл] [--tolerance 0.2] [--max-p95 мс] [--min-rps N]
+
+Синтетические сообщения проходят через настоящий Dispatcher с UserMiddleware и
+роутерами бота (команды и кнопки меню из handlers/schedule.py). Исходящие запросы к Telegram не отправляются, а
+записываются фейковой сессией бота. База засевается группами (расписание из
+data/schedule.json для каждой) и пользователями.
+
+Для каждого сценария (база × кэши) печатаются пропускная способность и p50/p95/p99
+задержки по каждому обработчику. --caches off отключает кэш пользователей и кэш
+готовых текстов, чтобы увидеть, сколько они дают.
+
+Для CI: --baseline сравнивает результат с сохранённым через --json, и скрипт
+завершается с кодом 1, если пропускная способность упала или p95 выросла больше
+чем на --tolerance; --max-p95 и --min-rps задают абсолютные пороги.
+
+Для PostgreSQL нужна отдельная пустая база: скрипт создаёт в ней таблицы и
+отказывается работать, если в ней уже есть пользователи.
+"""
+import argparse
+import asyncio
+import json
+import random
+import statistics
+import sys
+import tempfile
+import time
+from collections import defaultdict
+from dataclasses import dataclass, field, replace
+from datetime import datetime
+from pathlib import Path
+
+from aiogram import Bot, Dispatcher
+from aiogram.client.session.base import BaseSession
+from aiogram.fsm.storage.memory import MemoryStorage
+from aiogram.methods import TelegramMethod
+from aiogram.types import Chat, Message, Update, User as TelegramUser
+from tortoise import Tortoise
+from tortoise.transactions import in_transaction
+
+from database import build_connection
+from handlers import router
+from middlewares.user_middleware import UserMiddleware
+from models import Group, Lesson, Subject, User
+from utils.render_cache import render_cache
+from utils.schedule_import import BULK_BATCH_SIZE, build_lesson, load_rows, resolve_groups, resolve_subjects
+from utils.timetable import load_timetable
+from utils.user_cache import user_cache
+
+DEFAULT_SOURCE = "data/schedule.json"
+
+# Тексты сообщений и обработчики, которые они вызывают
+WORKLOAD = {
+    "📅 На сегодня": "menu_today",
+    "📅 На завтра": "menu_tomorrow",
+    "📚 Моё расписание (чётная)": "menu_week_even",
+    "📚 Моё расписание (нечётная)": "menu_week_odd",
+    "📋 Общее (чётная)": "menu_general_even",
+    "📋 Общее (нечётная)": "menu_general_odd",
+    "/start": "cmd_start",
+}
+
+
+class RecordingSession(BaseSession):
+    """Сессия бота, которая ничего не отправляет, а только запоминает запросы"""
+
+    def __init__(self):
+        super().__init__()
+        self.calls: dict[str, int] = defaultdict(int)
+        self._message_id = 0
+
+    async def close(self) -> None:
+        pass
+
+    async def stream_content(self, *args, **kwargs):
+        yield b""
+
+    async def make_request(self, bot: Bot, method: TelegramMethod, timeout: int | None = None):
+        self.calls[type(method).__name__] += 1
+        if method.__returning__ is Message:
+            self._message_id += 1
+            return Message(
+                message_id=self._message_id,
+                date=datetime.now(),
+                chat=Chat(id=method.chat_id, type="private"),
+                text=getattr(method, "text", None),
+            )
+        return True
+
+
+@dataclass
+class ScenarioResult:
+    name: str
+    updates: int = 0
+    elapsed: float = 0.0
+    latencies: dict[str, list[float]] = field(default_factory=lambda: defaultdict(list))
+    bot_calls: dict[str, int] = field(default_factory=dict)
+
+    @property
+    def throughput(self) -> float:
+        return self.updates / self.elapsed if self.elapsed else 0.0
+
+    @property
+    def all_latencies(self) -> list[float]:
+        return [latency for values in self.latencies.values() for latency in values]
+
+    def summary(self) -> dict:
+        return {
+            "updates": self.updates,
+            "throughput": round(self.throughput, 1),
+            "overall": percentiles(self.all_latencies),
+            "handlers": {handler: percentiles(values) for handler, values in sorted(self.latencies.items())},
+            "bot_calls": self.bot_calls,
+        }
+
+
+def percentiles(values: list[float]) -> dict[str, float]:
+    """p50/p95/p99 в миллисекундах"""
+    if len(values) < 2:
+        value = values[0] * 1000 if values else 0.0
+        return {"p50": value, "p95": value, "p99": value}
+    cuts = statistics.quantiles(values, n=100, method="inclusive")
+    return {name: round(cuts[index] * 1000, 3) for name, index in (("p50", 49), ("p95", 94), ("p99", 98))}
+
+
+def message_update(update_id: int, user_id: int, text: str) -> Update:
+    return Update(
+        update_id=update_id,
+        message=Message(
+            message_id=update_id,
+            date=datetime.now(),
+            chat=Chat(id=user_id, type="private"),
+            from_user=TelegramUser(id=user_id, is_bot=False, first_name=f"User {user_id}", username=f"user{user_id}"),
+            text=text,
+        ),
+    )
+
+
+async def seed(users: int, groups: int, source: str) -> None:
+    """Группы с расписанием из source и пользователи, распределённые по группам и подгруппам"""
+    if await User.exists():
+        raise SystemExit("В базе уже есть пользователи: для нагрузочного теста нужна пустая база")
+
+    rows = load_rows(source, group="Группа")
+    rows = [replace(row, group=f"Группа {number}") for number in range(1, groups + 1) for row in rows]
+    async with in_transaction() as connection:
+        group_models, _ = await resolve_groups((row.group for row in rows), connection)
+        subjects, _ = await resolve_subjects((row.subject for row in rows), connection)
+        lessons = [build_lesson(row, subjects[row.subject], group_models[row.group]) for row in rows]
+        await Lesson.bulk_create(lessons, batch_size=BULK_BATCH_SIZE, using_db=connection)
+
+    group_ids = [group.id for group in group_models.values()]
+    await User.bulk_create(
+        [
+            User(
+                id=user_id,
+                username=f"user{user_id}",
+                full_name=f"User {user_id}",
+                group_id=group_ids[user_id % len(group_ids)],
+                subgroup=user_id % 2 + 1,
+            )
+            for user_id in range(1, users + 1)
+        ],
+        batch_size=BULK_BATCH_SIZE,
+    )
+
+
+async def cleanup() -> None:
+    """Удаляет засеянные данные, чтобы следующий сценарий начинал с пустой базы"""
+    await Lesson.all().delete()
+    await User.all().delete()
+    await Group.all().delete()
+    await Subject.all().delete()
+
+
+def set_caches(enabled: bool) -> None:
+    """Размер 0 отключает кэш: каждый запрос идёт в базу и рендерит текст заново"""
+    render_cache.clear()
+    user_cache.clear()
+    render_cache.max_size = 4096 if enabled else 0
+    user_cache.max_size = 10000 if enabled else 0
+
+
+async def run_scenario(
+        name: str,
+        dispatcher: Dispatcher,
+        database_url: str,
+        caches: bool,
+        users: int,
+        groups: int,
+        updates: int,
+        concurrency: int,
+        source: str,
+) -> ScenarioResult:
+    await Tortoise.init(config={
+        "connections": {"default": build_connection(database_url)},
+        "apps": {"models": {"models": ["models"], "default_connection": "default"}},
+    })
+    try:
+        await Tortoise.generate_schemas(safe=True)
+        await seed(users, groups, source)
+        try:
+            await load_timetable()
+            set_caches(caches)
+            return await measure(name, dispatcher, users, updates, concurrency)
+        finally:
+            await cleanup()
+    finally:
+        await Tortoise.close_connections()
+
+
+async def measure(name: str, dispatcher: Dispatcher, users: int, updates: int, concurrency: int) -> ScenarioResult:
+    session = RecordingSession()
+    bot = Bot("42:BENCHMARK", session=session)
+
+    rng = random.Random(42)
+    texts = list(WORKLOAD)
+    workload = []
+    for update_id in range(1, updates + 1):
+        text = rng.choice(texts)
+        workload.append((WORKLOAD[text], message_update(update_id, rng.randint(1, users), text)))
+
+    # Прогрев: первые обращения к базе и кэшам не попадают в замеры
+    for _, update in workload[:100]:
+        await dispatcher.feed_update(bot, update)
+    session.calls.clear()
+
+    result = ScenarioResult(name)
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def feed(handler: str, update: Update) -> None:
+        async with semaphore:
+            started = time.perf_counter()
+            await dispatcher.feed_update(bot, update)
+            result.latencies[handler].append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(feed(handler, update) for handler, update in workload))
+    result.elapsed = time.perf_counter() - started
+    result.updates = len(workload)
+    result.bot_calls = dict(session.calls)
+    return result
+
+
+def print_result(result: ScenarioResult) -> None:
+    summary = result.summary()
+    overall = summary["overall"]
+    print(f"\n{result.name}: {result.updates} обновлений за {result.elapsed:.2f} с, "
+          f"{summary['throughput']} обн./с, p50 {overall['p50']} мс, p95 {overall['p95']} мс, p99 {overall['p99']} мс")
+    print(f"  {'обработчик':<20} {'n':>6} {'p50, мс':>9} {'p95, мс':>9} {'p99, мс':>9}")
+    for handler, values in sorted(result.latencies.items()):
+        cuts = summary["handlers"][handler]
+        print(f"  {handler:<20} {len(values):>6} {cuts['p50']:>9} {cuts['p95']:>9} {cuts['p99']:>9}")
+
+
+def check_thresholds(
+        results: dict[str, dict],
+        baseline: dict[str, dict] | None,
+        tolerance: float,
+        max_p95: float | None,
+        min_rps: float | None,
+) -> list[str]:
+    """Список нарушений порогов; пустой — всё в норме"""
+    failures = []
+    for name, summary in results.items():
+        throughput, p95 = summary["throughput"], summary["overall"]["p95"]
+        if max_p95 is not None and p95 > max_p95:
+            failures.append(f"{name}: p95 {p95} мс больше порога {max_p95} мс")
+        if min_rps is not None and throughput < min_rps:
+            failures.append(f"{name}: {throughput} обн./с меньше порога {min_rps}")
+
+        previous = (baseline or {}).get(name)
+        if previous is None:
+            continue
+        if throughput < previous["throughput"] * (1 - tolerance):
+            failures.append(f"{name}: пропускная способность упала с {previous['throughput']} до {throughput} обн./с")
+        if p95 > previous["overall"]["p95"] * (1 + tolerance):
+            failures.append(f"{name}: p95 выросла с {previous['overall']['p95']} до {p95} мс")
+    return failures
+
+
+def scenario_name(database_url: str, caches: bool) -> str:
+    return f"{database_url.split('://', 1)[0]}/{'cache' if caches else 'nocache'}"
+
+
+async def benchmark(args: argparse.Namespace) -> dict[str, dict]:
+    cache_modes = {"on": [True], "off": [False], "both": [True, False]}[args.caches]
+    dispatcher = Dispatcher(storage=MemoryStorage())
+    dispatcher.message.middleware(UserMiddleware())
+    dispatcher.include_router(router)
+
+    results = {}
+    for database_url in args.database:
+        for caches in cache_modes:
+            name = scenario_name(database_url, caches)
+            result = await run_scenario(
+                name, dispatcher, database_url, caches, args.users, args.groups, args.updates, args.concurrency, args.source
+            )
+            print_result(result)
+            results[name] = result.summary()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Нагрузочный тест обработки обновлений")
+    parser.add_argument("--database", action="append",
+                        help="DSN базы (можно несколько); по умолчанию — временная SQLite")
+    parser.add_argument("--caches", choices=["on", "off", "both"], default="both",
+                        help="с кэшами пользователей и текстов, без них или оба варианта")
+    parser.add_argument("--users", type=int, default=10000)
+    parser.add_argument("--groups", type=int, default=20)
+    parser.add_argument("--updates", type=int, default=20000)
+    parser.add_argument("--concurrency", type=int, default=100, help="сколько обновлений обрабатывается одновременно")
+    parser.add_argument("--source", default=DEFAULT_SOURCE, help="расписание одной группы для засева")
+    parser.add_argument("--json", help="сохранить результаты в файл")
+    parser.add_argument("--baseline", help="файл с прошлыми результатами для сравнения")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="допустимое ухудшение относительно baseline")
+    parser.add_argument("--max-p95", type=float, help="порог p95, мс")
+    parser.add_argument("--min-rps", type=float, help="порог пропускной способности, обн./с")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        if not args.database:
+            args.database = [f"sqlite://{Path(directory) / 'benchmark.sqlite3'}"]
+        results = asyncio.run(benchmark(args))
+
+    if args.json:
+        Path(args.json).write_text(json.dumps(results, ensure_ascii=False, indent=2), encoding="utf-8")
+
+    baseline = json.loads(Path(args.baseline).read_text(encoding="utf-8")) if args.baseline else None
+    failures = check_thresholds(results, baseline, args.tolerance, args.max_p95, args.min_rps)
+    for failure in failures:
+        print(f"РЕГРЕССИЯ: {failure}", file=sys.stderr)
+    if failures:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -3,4 +3,12 @@ from aiogram import Router
 router = Router()
 
 from .schedule import router as schedule_router
-router.include_router(schedule_router)
\ No newline at end of file
+from .reminders import router as reminders_router
+from .search import router as search_router
+from .inline import router as inline_router
+from .admin import router as admin_router
+router.include_router(schedule_router)
+router.include_router(reminders_router)
+router.include_router(search_router)
+router.include_router(inline_router)
+router.include_router(admin_router)
\ No newline at end of file
@@ -0,0 +1,100 @@
+from aiogram import Bot, Router
+from aiogram.filters import Command, CommandObject
+from aiogram.types import Message
+
+import config
+from utils.broadcast import broadcaster
+from utils.ics import feed_builds
+from utils.inline import inline_cache
+from utils.notifications import change_notifier
+from utils.reminders import reminder_scheduler
+from utils.render_cache import render_cache
+from utils.throttle import throttle
+from utils.timetable import load_timetable, timetable_reloads
+from utils.update_scheduler import update_scheduler
+from utils.user import user_lookups
+from utils.user_cache import user_cache
+from utils.user_queue import user_upsert_queue
+
+router = Router()
+
+
+@router.message(Command("reload_schedule"))
+async def cmd_reload_schedule(message: Message):
+    if message.from_user.id not in config.ADMIN_IDS:
+        return
+
+    snapshot = await load_timetable()
+    await message.answer(f"Расписание перезагружено: {len(snapshot.lessons)} пар, {len(snapshot.groups)} групп, версия {snapshot.version}")
+
+
+@router.message(Command("stats"))
+async def cmd_stats(message: Message):
+    if message.from_user.id not in config.ADMIN_IDS:
+        return
+
+    users = user_cache.stats()
+    queue = user_upsert_queue.stats()
+    reminders = reminder_scheduler.stats()
+    updates = update_scheduler.stats()
+    throttled = throttle.stats()
+    await message.answer(
+        "Кэш пользователей: "
+        f"{users['size']} записей, попаданий {users['hits']}, промахов {users['misses']}, "
+        f"вытеснено {users['evictions']}\n"
+        f"Очередь записи: ждут {queue['pending']}, сбросов {queue['flushes']}, записано {queue['written']}\n"
+        f"Кэш текстов: попаданий {render_cache.hits}, промахов {render_cache.misses}\n"
+        f"Инлайн-ответы: {len(inline_cache)} в кэше, попаданий {inline_cache.hits}, промахов {inline_cache.misses}\n"
+        f"Напоминания: подписчиков {reminders['subscribers']}, таймеров на сегодня {reminders['timers']}, "
+        f"сработало {reminders['fired']}, отправлено {reminders['sent']}, ошибок {reminders['failed']}\n"
+        f"Уведомления об изменениях: рассылок {change_notifier.notifications}, отправлено {change_notifier.sent}\n"
+        f"Обновления: в работе {updates['running']}, ждут {updates['waiting']}, "
+        f"обработано {updates['processed']}, макс. ожидание {updates['max_wait'] * 1000:.0f} мс\n"
+        f"Ограничение частоты: пользователей {throttled['users']}, задержано {throttled['delayed']}, "
+        f"отброшено {throttled['dropped']}, вёдер удалено {throttled['evicted']}\n"
+        "Объединено одновременных вызовов: "
+        + ", ".join(f"{flight.name} {flight.coalesced} из {flight.executed + flight.coalesced}"
+                    for flight in (timetable_reloads, user_lookups, feed_builds))
+    )
+
+
+@router.message(Command("broadcast"))
+async def cmd_broadcast(message: Message, bot: Bot, command: CommandObject):
+    if message.from_user.id not in config.ADMIN_IDS:
+        return
+
+    if not command.args:
+        return await message.answer("Использование: /broadcast текст сообщения")
+
+    broadcast = await broadcaster.start(bot, command.args, created_by=message.from_user.id)
+    await message.answer(
+        f"Рассылка {broadcast.id} запущена.\n"
+        f"Прогресс: /broadcast_status {broadcast.id}, отмена: /broadcast_cancel {broadcast.id}"
+    )
+
+
+@router.message(Command("broadcast_status"))
+async def cmd_broadcast_status(message: Message, command: CommandObject):
+    if message.from_user.id not in config.ADMIN_IDS:
+        return
+
+    broadcast_id = int(command.args) if command.args and command.args.strip().isdigit() else None
+    broadcast = await broadcaster.get(broadcast_id)
+    if broadcast is None:
+        return await message.answer("Рассылка не найдена")
+
+    await message.answer(broadcaster.report(broadcast))
+
+
+@router.message(Command("broadcast_cancel"))
+async def cmd_broadcast_cancel(message: Message, command: CommandObject):
+    if message.from_user.id not in config.ADMIN_IDS:
+        return
+
+    if not command.args or not command.args.strip().isdigit():
+        return await message.answer("Использование: /broadcast_cancel номер рассылки")
+
+    if await broadcaster.cancel(int(command.args)):
+        await message.answer("Рассылка остановлена")
+    else:
+        await message.answer("Рассылка не найдена или уже завершена")
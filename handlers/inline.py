@@ -0,0 +1,26 @@
+from datetime import datetime
+
+from aiogram import Router
+from aiogram.types import InlineQuery, InlineQueryResultsButton
+
+from models import User
+from utils.inline import answer_inline_query
+
+router = Router()
+
+
+@router.inline_query()
+async def inline_schedule(inline_query: InlineQuery, user: User):
+    now = datetime.now()
+    answer = answer_inline_query(inline_query.query, user, now)
+
+    button = None
+    if not answer.results and user.group_id is None:
+        button = InlineQueryResultsButton(text="Выбрать группу", start_parameter="settings")
+
+    await inline_query.answer(
+        list(answer.results),
+        cache_time=answer.cache_time(now),
+        is_personal=answer.is_personal,
+        button=button,
+    )
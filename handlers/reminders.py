@@ -0,0 +1,62 @@
+from aiogram import Router
+from aiogram.filters import Command, CommandObject
+from aiogram.types import Message
+from aiogram.fsm.context import FSMContext
+
+import config
+from models import User
+from utils.decorators import require_subgroup
+from utils.reminders import MAX_REMIND_BEFORE
+from utils.user import save_user_settings
+
+router = Router()
+
+ON_WORDS = {"on", "вкл"}
+OFF_WORDS = {"off", "выкл"}
+
+
+@router.message(Command("remind"))
+@require_subgroup
+async def cmd_remind(message: Message, user: User, state: FSMContext, command: CommandObject):
+    arg = (command.args or "").strip().lower()
+
+    if not arg:
+        if user.remind_before is None:
+            text = "Напоминания о парах выключены.\nВключить: /remind 10 — за 10 минут до начала пары"
+        else:
+            text = (
+                f"Напоминаю о парах за {user.remind_before} мин.\n"
+                "Изменить: /remind 15, выключить: /remind off"
+            )
+        return await message.answer(text)
+
+    if arg in OFF_WORDS:
+        await save_user_settings(user, remind_before=None)
+        return await message.answer("Напоминания о парах выключены")
+
+    if not arg.isdigit() or not 1 <= int(arg) <= MAX_REMIND_BEFORE:
+        return await message.answer(f"Укажите число минут от 1 до {MAX_REMIND_BEFORE} или off")
+
+    await save_user_settings(user, remind_before=int(arg))
+    await message.answer(f"Буду напоминать о парах за {arg} мин.")
+
+
+@router.message(Command("digest"))
+@require_subgroup
+async def cmd_digest(message: Message, user: User, state: FSMContext, command: CommandObject):
+    arg = (command.args or "").strip().lower()
+
+    if arg in ON_WORDS:
+        enabled = True
+    elif arg in OFF_WORDS:
+        enabled = False
+    elif not arg:
+        enabled = not user.morning_digest
+    else:
+        return await message.answer("Используйте /digest on или /digest off")
+
+    await save_user_settings(user, morning_digest=enabled)
+    if enabled:
+        await message.answer(f"Каждое утро в {config.DIGEST_TIME} пришлю расписание на день")
+    else:
+        await message.answer("Утренняя сводка выключена")
@@ -1,35 +1,48 @@
+from datetime import date, timedelta
+
 from aiogram import Router, F
-from aiogram.filters import Command
-from aiogram.types import Message
+from aiogram.exceptions import TelegramBadRequest
+from aiogram.filters import Command, CommandObject
+from aiogram.types import CallbackQuery, InlineKeyboardMarkup, Message
 from aiogram.fsm.context import FSMContext
 
+import config
 from models import User
-from utils.decorators import require_subgroup
-
-from utils.schedule import (
-    get_today_lessons_for_user,
-    get_user_week_lessons,
-    get_general_week_lessons,
-)
-from utils.formatters import (
-    format_today_schedule,
-    format_user_week_schedule,
-    format_general_week_schedule,
+from utils.academic_calendar import get_calendar
+from utils.common import parse_date
+from utils.decorators import require_group, require_subgroup
+from utils.formatters import pack_messages
+from utils.ics import feed_url, personal_feed_url
+from utils.settings import ask_group, ask_subgroup, needs_subgroup, suggest_groups
+from utils.timetable import get_timetable
+from utils.user import save_user_settings
+
+from utils.render_cache import (
+    render_day_schedule,
+    render_general_weekday_schedule,
+    render_today_schedule,
+    render_user_week_schedule,
+    render_general_week_schedule,
+    render_weekday_schedule,
 )
 from states.settings import SettingsState
-from keyboards.reply import get_subgroup_keyboard, get_main_menu_keyboard
+from keyboards.inline import BrowseCallback, get_browse_keyboard
+from keyboards.reply import get_main_menu_keyboard
 
 router = Router()
 
+NEXT_DAYS = 7
+
 
 @router.message(Command("start"))
 async def cmd_start(message: Message, user: User, state: FSMContext):
     text = "Привет! Это бот с расписанием 👋\n\n"
 
-    if user.subgroup is None:
-        text += 'Сначала выберите свою подгруппу!'
-        await state.set_state(SettingsState.choose_subgroup)
-        return await message.answer(text, reply_markup=get_subgroup_keyboard())
+    if user.group_id is None:
+        return await ask_group(message, state, text + "Сначала напишите название своей группы, например ИВТ-21")
+
+    if needs_subgroup(user):
+        return await ask_subgroup(message, state, user.group_id, text + 'Сначала выберите свою подгруппу!')
 
     text += 'Воспользуйтесь меню для отображения вашего расписания'
     return await message.answer(text, reply_markup=get_main_menu_keyboard())
@@ -37,20 +50,40 @@ async def cmd_start(message: Message, user: User, state: FSMContext):
 
 @router.message(Command("settings"))
 async def cmd_settings(message: Message, state: FSMContext):
-    await state.set_state(SettingsState.choose_subgroup)
-    await message.answer("Выберите вашу подгруппу:", reply_markup=get_subgroup_keyboard())
+    await ask_group(message, state)
 
 
-@router.message(F.text == "⚙️ Изменить подгруппу")
-async def menu_change_subgroup(message: Message, state: FSMContext):
+@router.message(F.text.in_({"⚙️ Изменить группу", "⚙️ Изменить подгруппу"}))
+async def menu_change_group(message: Message, state: FSMContext):
     await cmd_settings(message, state)
 
 
-@router.message(SettingsState.choose_subgroup, F.text.in_({"1 подгруппа", "2 подгруппа"}))
-async def process_subgroup(message: Message, state: FSMContext, user: User):
-    subgroup = 1 if message.text == "1 подгруппа" else 2
-    user.subgroup = subgroup
-    await user.save()
+@router.message(SettingsState.choose_group, F.text, ~F.text.startswith("/"))
+async def process_group(message: Message, state: FSMContext, user: User):
+    group_id = get_timetable().find_group(message.text)
+    if group_id is None:
+        return await suggest_groups(message, message.text)
+
+    if get_timetable().group_subgroups(group_id):
+        return await ask_subgroup(message, state, group_id)
+
+    await save_user_settings(user, group_id=group_id, subgroup=None)
+    await state.clear()
+    await message.answer(
+        f"Группа сохранена: {get_timetable().groups[group_id]}",
+        reply_markup=get_main_menu_keyboard()
+    )
+
+
+@router.message(SettingsState.choose_subgroup, F.text.regexp(r"^(\d+) подгруппа$").as_("match"))
+async def process_subgroup(message: Message, state: FSMContext, user: User, match):
+    data = await state.get_data()
+    group_id = data.get("group_id", user.group_id)
+    subgroup = int(match.group(1))
+    if subgroup not in get_timetable().group_subgroups(group_id):
+        return await ask_subgroup(message, state, group_id, "Такой подгруппы нет, выберите из списка:")
+
+    await save_user_settings(user, group_id=group_id, subgroup=subgroup)
 
     await state.clear()
     await message.answer(
@@ -62,64 +95,169 @@ async def process_subgroup(message: Message, state: FSMContext, user: User):
 @router.message(F.text == "📅 На сегодня")
 @require_subgroup
 async def menu_today(message: Message, user: User, state: FSMContext):
-    lessons = await get_today_lessons_for_user(user)
-    text = format_today_schedule(lessons)
+    text = render_today_schedule(user.group_id, user.subgroup)
     await message.answer(text)
 
 
+@router.message(F.text == "📅 На завтра")
+@require_subgroup
+async def menu_tomorrow(message: Message, user: User, state: FSMContext):
+    text = render_day_schedule(user.group_id, user.subgroup, date.today() + timedelta(days=1))
+    await message.answer(text)
+
+
+@router.message(F.text == "🗓 7 дней")
+@require_subgroup
+async def menu_next_days(message: Message, user: User, state: FSMContext):
+    today = date.today()
+    days = (render_day_schedule(user.group_id, user.subgroup, today + timedelta(days=offset)) for offset in range(NEXT_DAYS))
+    for text in pack_messages(days):
+        await message.answer(text)
+
+
 @router.message(F.text == "📚 Моё расписание (чётная)")
 @require_subgroup
 async def menu_week_even(message: Message, user: User, state: FSMContext):
-    lessons = await get_user_week_lessons(user, "even")
-    text = format_user_week_schedule(lessons, "even")
+    text = render_user_week_schedule(user.group_id, user.subgroup, "even")
     await message.answer(text)
 
 
 @router.message(F.text == "📚 Моё расписание (нечётная)")
 @require_subgroup
 async def menu_week_odd(message: Message, user: User, state: FSMContext):
-    lessons = await get_user_week_lessons(user, "odd")
-    text = format_user_week_schedule(lessons, "odd")
+    text = render_user_week_schedule(user.group_id, user.subgroup, "odd")
     await message.answer(text)
 
 
 @router.message(F.text == "📋 Общее (чётная)")
-async def menu_general_even(message: Message, user: User):
-    lessons = await get_general_week_lessons("even")
-    text = format_general_week_schedule(lessons, "even")
+@require_group
+async def menu_general_even(message: Message, user: User, state: FSMContext):
+    text = render_general_week_schedule(user.group_id, "even")
     await message.answer(text)
 
 
 @router.message(F.text == "📋 Общее (нечётная)")
-async def menu_general_odd(message: Message, user: User):
-    lessons = await get_general_week_lessons("odd")
-    text = format_general_week_schedule(lessons, "odd")
+@require_group
+async def menu_general_odd(message: Message, user: User, state: FSMContext):
+    text = render_general_week_schedule(user.group_id, "odd")
     await message.answer(text)
 
 
+def render_browse(user: User, position: BrowseCallback) -> tuple[str, InlineKeyboardMarkup]:
+    """Текст и клавиатура листалки для положения position"""
+    subgroups = sorted(get_timetable().group_subgroups(user.group_id))
+    if position.s is not None and position.s not in subgroups:
+        position = position.model_copy(update={"s": None})
+
+    if subgroups and position.s is None:
+        text = render_general_weekday_schedule(user.group_id, position.week_type, position.d)
+    else:
+        text = render_weekday_schedule(user.group_id, position.s, position.week_type, position.d)
+
+    today = date.today()
+    start = BrowseCallback.at(get_calendar().week_type(today), today.weekday(), position.s)
+    return text, get_browse_keyboard(position, subgroups, start)
+
+
+@router.message(F.text == "🗂 По дням")
+@require_group
+async def menu_browse(message: Message, user: User, state: FSMContext):
+    today = date.today()
+    position = BrowseCallback.at(get_calendar().week_type(today), today.weekday(), user.subgroup)
+    text, keyboard = render_browse(user, position)
+    await message.answer(text, reply_markup=keyboard)
+
+
+@router.callback_query(BrowseCallback.filter())
+async def browse_schedule(callback: CallbackQuery, callback_data: BrowseCallback, user: User):
+    if user.group_id is None:
+        return await callback.answer("Сначала выберите группу: /settings", show_alert=True)
+    if not isinstance(callback.message, Message):
+        # Сообщения старше 48 часов бот уже не может изменить
+        return await callback.answer("Сообщение устарело, откройте расписание заново", show_alert=True)
+
+    text, keyboard = render_browse(user, callback_data)
+    message = callback.message
+    # Неизменённое сообщение не отправляем: это лишний запрос и ошибка «message is not modified»
+    try:
+        if text.strip() != (message.text or "").strip():
+            await message.edit_text(text, reply_markup=keyboard)
+        elif message.reply_markup is None or \
+                keyboard.model_dump(exclude_none=True) != message.reply_markup.model_dump(exclude_none=True):
+            await message.edit_reply_markup(reply_markup=keyboard)
+    except TelegramBadRequest as e:
+        if "message is not modified" not in e.message:
+            raise
+    await callback.answer()
+
+
+@router.message(Command("browse"))
+@require_group
+async def cmd_browse(message: Message, user: User, state: FSMContext):
+    await menu_browse(message, user, state)
+
+
+@router.message(Command("calendar"))
+@require_group
+async def cmd_calendar(message: Message, user: User, state: FSMContext):
+    if not config.ICS_PORT or not config.ICS_BASE_URL:
+        return await message.answer("Подписка на календарь не настроена")
+
+    lines = ["Добавьте ссылку в Google Календарь («Добавить по URL») или в календарь телефона."]
+    if config.ICS_SECRET:
+        lines.append(f"\nЛичная ссылка — следует за вашей группой и подгруппой:\n{personal_feed_url(user.id)}")
+    subgroup = user.subgroup if user.subgroup in get_timetable().group_subgroups(user.group_id) else None
+    lines.append(f"\nСсылка для группы:\n{feed_url((user.group_id, subgroup))}")
+    await message.answer("\n".join(lines))
+
+
 @router.message(Command("today"))
 @require_subgroup
 async def cmd_today(message: Message, user: User, state: FSMContext):
-    await menu_today(message, user)
+    await menu_today(message, user, state)
+
+
+@router.message(Command("tomorrow"))
+@require_subgroup
+async def cmd_tomorrow(message: Message, user: User, state: FSMContext):
+    await menu_tomorrow(message, user, state)
+
+
+@router.message(Command("days"))
+@require_subgroup
+async def cmd_next_days(message: Message, user: User, state: FSMContext):
+    await menu_next_days(message, user, state)
+
+
+@router.message(Command("date"))
+@require_subgroup
+async def cmd_date(message: Message, user: User, state: FSMContext, command: CommandObject):
+    target_date = parse_date(command.args or "")
+    if target_date is None:
+        return await message.answer("Использование: /date 24.10 или /date 24.10.2026")
+
+    await message.answer(render_day_schedule(user.group_id, user.subgroup, target_date))
 
 
 @router.message(Command("week_even"))
 @require_subgroup
 async def cmd_week_even(message: Message, user: User, state: FSMContext):
-    await menu_week_even(message, user)
+    await menu_week_even(message, user, state)
 
 
 @router.message(Command("week_odd"))
 @require_subgroup
 async def cmd_week_odd(message: Message, user: User, state: FSMContext):
-    await menu_week_odd(message, user)
+    await menu_week_odd(message, user, state)
 
 
 @router.message(Command("general_even"))
-async def cmd_general_even(message: Message, user: User):
-    await menu_general_even(message, user)
+@require_group
+async def cmd_general_even(message: Message, user: User, state: FSMContext):
+    await menu_general_even(message, user, state)
 
 
 @router.message(Command("general_odd"))
-async def cmd_general_odd(message: Message, user: User):
-    await menu_general_odd(message, user)
+@require_group
+async def cmd_general_odd(message: Message, user: User, state: FSMContext):
+    await menu_general_odd(message, user, state)
@@ -0,0 +1,44 @@
+from datetime import datetime
+
+from aiogram import Router
+from aiogram.filters import Command, CommandObject
+from aiogram.types import Message
+
+from utils.formatters import format_occupancy, format_room_lesson_line, format_teacher_lesson_line
+from utils.search import get_search_index
+
+router = Router()
+
+
+@router.message(Command("teacher"))
+async def cmd_teacher(message: Message, command: CommandObject):
+    if not command.args:
+        return await message.answer("Использование: /teacher фамилия, например /teacher Жалнина")
+
+    teachers = get_search_index().find_teachers(command.args)
+    if not teachers:
+        return await message.answer("Преподаватель не найден")
+
+    now = datetime.now()
+    await message.answer("\n\n".join(
+        format_occupancy(f"👤 {teacher.name}", teacher.current(now), teacher.upcoming(now),
+                         format_teacher_lesson_line, now.date())
+        for teacher in teachers
+    ))
+
+
+@router.message(Command("room"))
+async def cmd_room(message: Message, command: CommandObject):
+    if not command.args:
+        return await message.answer("Использование: /room аудитория, например /room 2131в")
+
+    rooms = get_search_index().find_rooms(command.args)
+    if not rooms:
+        return await message.answer("Аудитория не найдена")
+
+    now = datetime.now()
+    await message.answer("\n\n".join(
+        format_occupancy(f"🚪 {room.name}", room.current(now), room.upcoming(now),
+                         format_room_lesson_line, now.date())
+        for room in rooms
+    ))
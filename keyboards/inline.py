@@ -0,0 +1,59 @@
+from aiogram.filters.callback_data import CallbackData
+from aiogram.types import InlineKeyboardButton, InlineKeyboardMarkup
+
+from utils.formatters import DAY_SHORT_NAMES, get_week_label
+
+
+class BrowseCallback(CallbackData, prefix="b"):
+    """
+    Положение в листалке расписания. Поля короткие, чтобы callback_data
+    («b:e:0:1») укладывалась в лимит Telegram в 64 байта с большим запасом.
+    """
+    # e — чётная неделя, o — нечётная
+    w: str
+    # День недели, 0 — понедельник
+    d: int
+    # Подгруппа; пусто — все подгруппы
+    s: int | None = None
+
+    @property
+    def week_type(self) -> str:
+        return "even" if self.w == "e" else "odd"
+
+    @classmethod
+    def at(cls, week_type: str, weekday: int, subgroup: int | None) -> "BrowseCallback":
+        return cls(w="e" if week_type == "even" else "o", d=weekday, s=subgroup)
+
+    def shift(self, days: int) -> "BrowseCallback":
+        """Соседний день; за воскресеньем идёт понедельник следующей (другой по чётности) недели"""
+        weekday = self.d + days
+        if 0 <= weekday < len(DAY_SHORT_NAMES):
+            return self.model_copy(update={"d": weekday})
+        return self.model_copy(update={"d": weekday % len(DAY_SHORT_NAMES), "w": "o" if self.w == "e" else "e"})
+
+
+def get_browse_keyboard(position: BrowseCallback, subgroups: list[int], today: BrowseCallback) -> InlineKeyboardMarkup:
+    """◀ день ▶, переключатели недели и подгруппы; subgroups — подгруппы группы"""
+    rows = [
+        [
+            InlineKeyboardButton(text="◀", callback_data=position.shift(-1).pack()),
+            InlineKeyboardButton(text="Сегодня", callback_data=today.model_copy(update={"s": position.s}).pack()),
+            InlineKeyboardButton(text="▶", callback_data=position.shift(1).pack()),
+        ],
+        [
+            InlineKeyboardButton(
+                text=f"🔁 {get_week_label(position.week_type)}",
+                callback_data=position.model_copy(update={"w": "o" if position.w == "e" else "e"}).pack(),
+            ),
+        ],
+    ]
+    if subgroups:
+        # По кругу: 1 подгруппа → 2 подгруппа → … → все подгруппы → 1 подгруппа
+        cycle = [*subgroups, None]
+        following = cycle[(cycle.index(position.s) + 1) % len(cycle)] if position.s in cycle else cycle[0]
+        label = f"{position.s} подгруппа" if position.s is not None else "Все подгруппы"
+        rows[1].append(InlineKeyboardButton(
+            text=f"🔁 {label}",
+            callback_data=position.model_copy(update={"s": following}).pack(),
+        ))
+    return InlineKeyboardMarkup(inline_keyboard=rows)
@@ -1,10 +1,26 @@
-from aiogram.types import ReplyKeyboardMarkup, KeyboardButton
+from typing import Iterable
 
+from aiogram.types import ReplyKeyboardMarkup, KeyboardButton, ReplyKeyboardRemove
 
-def get_subgroup_keyboard() -> ReplyKeyboardMarkup:
+
+def get_group_keyboard(names: Iterable[str]) -> ReplyKeyboardMarkup | ReplyKeyboardRemove:
+    """Подсказки с названиями групп, по две в ряд"""
+    buttons = [KeyboardButton(text=name) for name in names]
+    if not buttons:
+        return ReplyKeyboardRemove()
+
+    return ReplyKeyboardMarkup(
+        keyboard=[buttons[i:i + 2] for i in range(0, len(buttons), 2)],
+        resize_keyboard=True,
+        one_time_keyboard=True,
+        input_field_placeholder="Название группы"
+    )
+
+
+def get_subgroup_keyboard(subgroups: Iterable[int] = (1, 2)) -> ReplyKeyboardMarkup:
     return ReplyKeyboardMarkup(
         keyboard=[
-            [KeyboardButton(text="1 подгруппа"), KeyboardButton(text="2 подгруппа")]
+            [KeyboardButton(text=f"{subgroup} подгруппа") for subgroup in sorted(subgroups)]
         ],
         resize_keyboard=True,
         one_time_keyboard=True,
@@ -15,10 +31,10 @@ def get_subgroup_keyboard() -> ReplyKeyboardMarkup:
 def get_main_menu_keyboard() -> ReplyKeyboardMarkup:
     return ReplyKeyboardMarkup(
         keyboard=[
-            [KeyboardButton(text="📅 На сегодня")],
+            [KeyboardButton(text="📅 На сегодня"), KeyboardButton(text="📅 На завтра"), KeyboardButton(text="🗓 7 дней")],
             [KeyboardButton(text="📚 Моё расписание (чётная)"), KeyboardButton(text="📚 Моё расписание (нечётная)")],
             [KeyboardButton(text="📋 Общее (чётная)"), KeyboardButton(text="📋 Общее (нечётная)")],
-            [KeyboardButton(text="⚙️ Изменить подгруппу")]
+            [KeyboardButton(text="🗂 По дням"), KeyboardButton(text="⚙️ Изменить группу")]
         ],
         resize_keyboard=True
     )
@@ -1,18 +1,39 @@
+import argparse
 import asyncio
+import logging
 import os
+from datetime import date
 
 from dotenv import load_dotenv
 
 from aiogram import Bot, Dispatcher
-from aiogram.fsm.storage.memory import MemoryStorage
 from aiogram.client.default import DefaultBotProperties
 
+import config
 from handlers import router
+from middlewares.metrics_middleware import MetricsMiddleware
+from middlewares.throttle_middleware import ThrottleMiddleware
 from middlewares.user_middleware import UserMiddleware
 from database import init_db, close_db
+from storages import create_fsm_storage
+from storages.db import DbStorage
+from utils.academic_calendar import load_calendar
+from utils.broadcast import broadcaster
+from utils.ics import feed_server
+from utils.metrics import ApiMetricsMiddleware, instrument_db, metrics_server
+from utils.notifications import change_notifier
+from utils.reminders import reminder_scheduler, reminder_subscribers
+from utils.startup import StartupReport, set_not_ready
+from utils.timetable import load_timetable, watch_timetable
+from utils.update_scheduler import update_scheduler
+from utils.user_cache import user_cache
+from utils.user_queue import user_upsert_queue
+from utils.warmup import warm_render_cache, warm_user_cache
 
 load_dotenv()
 
+logger = logging.getLogger(__name__)
+
 ENVIRONMENT = os.getenv('ENVIRONMENT')
 
 if not ENVIRONMENT:
@@ -27,27 +48,109 @@ match ENVIRONMENT:
         raise ValueError('Некорректный ENVIRONMENT в .env файле!')
 
 
-async def main():
+async def on_startup(dispatcher: Dispatcher, bot: Bot):
+    startup = StartupReport(config.STARTUP_BUDGET_MS)
+    if config.METRICS_PORT:
+        # Сервер метрик поднимается первым, чтобы /ready отвечал «не готов» во время запуска
+        with startup.phase("метрики"):
+            await metrics_server.start(config.METRICS_HOST, config.METRICS_PORT)
+    with startup.phase("календарь"):
+        load_calendar(config.CALENDAR_PATH)
+    with startup.phase("база данных"):
+        await init_db()
+        instrument_db()
+    with startup.phase("расписание"):
+        snapshot = await load_timetable()
+    with startup.phase("подписки"):
+        if config.RUN_JOBS:
+            await reminder_subscribers.load()
+        if isinstance(dispatcher.storage, DbStorage):
+            await dispatcher.storage.delete_expired()
+    with startup.phase("прогрев"):
+        views = warm_render_cache(snapshot, date.today())
+        users = await warm_user_cache(config.WARM_USERS)
+        logger.info("Прогрев: %s текстов, %s пользователей", views, users)
+    with startup.phase("фоновые задачи"):
+        dispatcher["timetable_watcher"] = asyncio.create_task(watch_timetable(config.TIMETABLE_REFRESH_SECONDS))
+        user_upsert_queue.start()
+        # Расписание обновляется в каждом экземпляре, а рассылает сообщения только один
+        if config.RUN_JOBS:
+            reminder_scheduler.start(bot)
+            change_notifier.start(bot)
+            broadcaster.watch(bot, config.BROADCAST_POLL_SECONDS)
+        if config.ICS_PORT:
+            await feed_server.start(config.ICS_HOST, config.ICS_PORT)
+    startup.finish()
+
+    print("Бот запущен...")
+
+
+async def on_shutdown(dispatcher: Dispatcher):
+    set_not_ready()
+    # Если запуск упал раньше, задачи может не быть
+    watcher = dispatcher.get("timetable_watcher")
+    if watcher is not None:
+        watcher.cancel()
+    await reminder_scheduler.stop()
+    await broadcaster.stop()
+    await change_notifier.stop()
+    await user_upsert_queue.stop()
+    await feed_server.stop()
+    await metrics_server.stop()
+    await close_db()
+
+
+def create_bot() -> Bot:
     bot = Bot(
         token=BOT_TOKEN,
         default=DefaultBotProperties(parse_mode=None)
     )
-    storage = MemoryStorage()
-    dp = Dispatcher(storage=storage)
+    bot.session.middleware(ApiMetricsMiddleware())
+    return bot
 
+
+def create_dispatcher() -> Dispatcher:
+    storage = create_fsm_storage()
+    # Планировщик упорядочивает обновления пользователя до чтения состояния FSM
+    dp = Dispatcher(storage=storage, events_isolation=update_scheduler)
+
+    # MetricsMiddleware первым: его время включает UserMiddleware
+    dp.message.middleware(MetricsMiddleware())
+    dp.callback_query.middleware(MetricsMiddleware())
+    dp.inline_query.middleware(MetricsMiddleware())
+    # ThrottleMiddleware до UserMiddleware: отброшенные обновления не обращаются к базе
+    if config.THROTTLE_RATE > 0:
+        dp.message.middleware(ThrottleMiddleware())
+        dp.callback_query.middleware(ThrottleMiddleware())
+        dp.inline_query.middleware(ThrottleMiddleware())
     dp.message.middleware(UserMiddleware())
     dp.callback_query.middleware(UserMiddleware())
+    dp.inline_query.middleware(UserMiddleware())
 
     dp.include_router(router)
 
-    await init_db()
+    dp.startup.register(on_startup)
+    dp.shutdown.register(on_shutdown)
+    return dp
 
-    print("Бот запущен...")
-    try:
-        await dp.start_polling(bot)
-    finally:
-        await close_db()
+
+def main():
+    parser = argparse.ArgumentParser(description="Бот с расписанием занятий")
+    parser.add_argument("--mode", choices=["polling", "webhook"], default=config.BOT_MODE,
+                        help="polling — для разработки, webhook — aiohttp-сервер для продакшена")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    user_cache.configure(args.mode)
+    bot = create_bot()
+    dp = create_dispatcher()
+
+    if args.mode == "webhook":
+        from webhook import run_webhook
+        run_webhook(bot, dp)
+    else:
+        asyncio.run(dp.start_polling(bot, tasks_concurrency_limit=config.UPDATE_QUEUE_LIMIT))
 
 
 if __name__ == "__main__":
-    asyncio.run(main())
+    main()
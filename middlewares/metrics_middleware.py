@@ -0,0 +1,51 @@
+import time
+from typing import Callable, Dict, Any, Awaitable
+
+from aiogram import BaseMiddleware
+from aiogram.fsm.context import FSMContext
+from aiogram.fsm.state import State
+from aiogram.types import TelegramObject
+
+from utils.metrics import UpdateStats, current_update, fsm_transitions, record_update
+
+
+class TrackedFSMContext(FSMContext):
+    """FSMContext, который считает переходы между состояниями"""
+
+    def __init__(self, context: FSMContext, state: str | None):
+        super().__init__(storage=context.storage, key=context.key)
+        self._state = state
+
+    async def set_state(self, state: State | str | None = None) -> None:
+        await super().set_state(state)
+        new_state = state.state if isinstance(state, State) else state
+        if new_state != self._state:
+            fsm_transitions.inc(self._state or "none", new_state or "none")
+            self._state = new_state
+
+
+class MetricsMiddleware(BaseMiddleware):
+    """
+    Засекает обработку обновления вместе с UserMiddleware и обработчиком, поэтому
+    регистрируется первым; запросы к базе и вызовы Bot API за это время
+    складываются в UpdateStats.
+    """
+
+    async def __call__(
+            self,
+            handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+            event: TelegramObject,
+            data: Dict[str, Any]
+    ) -> Any:
+        handler_object = data.get("handler")
+        stats = UpdateStats(handler_object.callback.__name__ if handler_object else "unknown")
+        if isinstance(data.get("state"), FSMContext):
+            data["state"] = TrackedFSMContext(data["state"], data.get("raw_state"))
+
+        token = current_update.set(stats)
+        started = time.perf_counter()
+        try:
+            return await handler(event, data)
+        finally:
+            record_update(stats, time.perf_counter() - started)
+            current_update.reset(token)
@@ -0,0 +1,39 @@
+from typing import Callable, Dict, Any, Awaitable
+
+from aiogram import BaseMiddleware
+from aiogram.types import TelegramObject, Message, CallbackQuery, InlineQuery
+
+from utils.throttle import throttle
+
+THROTTLED_TEXT = "Слишком часто — подождите пару секунд"
+
+
+class ThrottleMiddleware(BaseMiddleware):
+    """
+    Ограничивает частоту обновлений пользователя до UserMiddleware, поэтому
+    отброшенное обновление не обращается к базе: ответ — только короткое
+    предупреждение без данных пользователя.
+    """
+
+    async def __call__(
+            self,
+            handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+            event: TelegramObject,
+            data: Dict[str, Any]
+    ) -> Any:
+        if not isinstance(event, (Message, CallbackQuery, InlineQuery)) or event.from_user is None:
+            return await handler(event, data)
+
+        handler_object = data.get("handler")
+        handler_name = handler_object.callback.__name__ if handler_object else "unknown"
+        if await throttle.admit(event.from_user.id, handler_name):
+            return await handler(event, data)
+
+        if isinstance(event, CallbackQuery):
+            # На нажатие кнопки нужно ответить в любом случае, иначе она «крутится»
+            await event.answer(THROTTLED_TEXT)
+        elif isinstance(event, InlineQuery):
+            await event.answer([], cache_time=0, is_personal=True)
+        elif throttle.should_warn(event.from_user.id):
+            await event.answer(THROTTLED_TEXT)
+        return None
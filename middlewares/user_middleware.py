@@ -1,9 +1,9 @@
 from typing import Callable, Dict, Any, Awaitable
 
 from aiogram import BaseMiddleware
-from aiogram.types import TelegramObject, Message, CallbackQuery
+from aiogram.types import TelegramObject, Message, CallbackQuery, InlineQuery
 
-from models import User
+from utils.user import get_or_create_user
 
 
 class UserMiddleware(BaseMiddleware):
@@ -13,15 +13,11 @@ class UserMiddleware(BaseMiddleware):
             event: TelegramObject,
             data: Dict[str, Any]
     ) -> Any:
-        if isinstance(event, (Message, CallbackQuery)):
-            user_id = event.from_user.id
-            user = await User.get_or_create(
-                id=user_id,
-                defaults={
-                    "username": event.from_user.username,
-                    "full_name": event.from_user.full_name
-                }
+        if isinstance(event, (Message, CallbackQuery, InlineQuery)):
+            data["user"] = await get_or_create_user(
+                event.from_user.id,
+                username=event.from_user.username,
+                full_name=event.from_user.full_name
             )
-            data["user"] = user[0]
 
         return await handler(event, data)
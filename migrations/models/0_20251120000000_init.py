@@ -0,0 +1,81 @@
+from tortoise import BaseDBAsyncClient
+
+SQLITE = """
+        CREATE TABLE IF NOT EXISTS "subjects" (
+    "id" INTEGER PRIMARY KEY AUTOINCREMENT NOT NULL,
+    "name" VARCHAR(255) NOT NULL,
+    "short_name" VARCHAR(100),
+    "created_at" TIMESTAMP NOT NULL  DEFAULT CURRENT_TIMESTAMP
+);
+CREATE TABLE IF NOT EXISTS "lessons" (
+    "id" INTEGER PRIMARY KEY AUTOINCREMENT NOT NULL,
+    "day_of_week" INT NOT NULL,
+    "start_time" VARCHAR(10) NOT NULL,
+    "end_time" VARCHAR(10) NOT NULL,
+    "lesson_type" VARCHAR(50) NOT NULL,
+    "teacher" VARCHAR(255),
+    "classroom" VARCHAR(50),
+    "week_type" VARCHAR(10),
+    "subgroup" INT,
+    "created_at" TIMESTAMP NOT NULL  DEFAULT CURRENT_TIMESTAMP,
+    "subject_id" INT NOT NULL REFERENCES "subjects" ("id") ON DELETE CASCADE
+);
+CREATE TABLE IF NOT EXISTS "users" (
+    "id" INTEGER PRIMARY KEY AUTOINCREMENT NOT NULL,
+    "username" VARCHAR(255),
+    "full_name" VARCHAR(255),
+    "subgroup" INT,
+    "created_at" TIMESTAMP NOT NULL  DEFAULT CURRENT_TIMESTAMP,
+    "updated_at" TIMESTAMP NOT NULL  DEFAULT CURRENT_TIMESTAMP
+);
+CREATE TABLE IF NOT EXISTS "aerich" (
+    "id" INTEGER PRIMARY KEY AUTOINCREMENT NOT NULL,
+    "version" VARCHAR(255) NOT NULL,
+    "app" VARCHAR(100) NOT NULL,
+    "content" JSON NOT NULL
+);"""
+
+POSTGRES = """
+        CREATE TABLE IF NOT EXISTS "subjects" (
+    "id" SERIAL NOT NULL PRIMARY KEY,
+    "name" VARCHAR(255) NOT NULL,
+    "short_name" VARCHAR(100),
+    "created_at" TIMESTAMPTZ NOT NULL  DEFAULT CURRENT_TIMESTAMP
+);
+CREATE TABLE IF NOT EXISTS "lessons" (
+    "id" SERIAL NOT NULL PRIMARY KEY,
+    "day_of_week" INT NOT NULL,
+    "start_time" VARCHAR(10) NOT NULL,
+    "end_time" VARCHAR(10) NOT NULL,
+    "lesson_type" VARCHAR(50) NOT NULL,
+    "teacher" VARCHAR(255),
+    "classroom" VARCHAR(50),
+    "week_type" VARCHAR(10),
+    "subgroup" INT,
+    "created_at" TIMESTAMPTZ NOT NULL  DEFAULT CURRENT_TIMESTAMP,
+    "subject_id" INT NOT NULL REFERENCES "subjects" ("id") ON DELETE CASCADE
+);
+CREATE TABLE IF NOT EXISTS "users" (
+    "id" BIGSERIAL NOT NULL PRIMARY KEY,
+    "username" VARCHAR(255),
+    "full_name" VARCHAR(255),
+    "subgroup" INT,
+    "created_at" TIMESTAMPTZ NOT NULL  DEFAULT CURRENT_TIMESTAMP,
+    "updated_at" TIMESTAMPTZ NOT NULL  DEFAULT CURRENT_TIMESTAMP
+);
+CREATE TABLE IF NOT EXISTS "aerich" (
+    "id" SERIAL NOT NULL PRIMARY KEY,
+    "version" VARCHAR(255) NOT NULL,
+    "app" VARCHAR(100) NOT NULL,
+    "content" JSONB NOT NULL
+);"""
+
+
+async def upgrade(db: BaseDBAsyncClient) -> str:
+    # Исходная схема; IF NOT EXISTS позволяет применить миграцию к уже созданной базе
+    return POSTGRES if db.capabilities.dialect == "postgres" else SQLITE
+
+
+async def downgrade(db: BaseDBAsyncClient) -> str:
+    return """
+        """
@@ -0,0 +1,100 @@
+from tortoise import BaseDBAsyncClient
+
+# SQLite не умеет менять тип столбца, поэтому таблица пересоздаётся с переносом данных
+SQLITE_UPGRADE = """
+        CREATE TABLE "lessons_new" (
+    "id" INTEGER PRIMARY KEY AUTOINCREMENT NOT NULL,
+    "day_of_week" SMALLINT NOT NULL,
+    "start_minutes" SMALLINT NOT NULL,
+    "end_minutes" SMALLINT NOT NULL,
+    "lesson_type" VARCHAR(50) NOT NULL,
+    "teacher" VARCHAR(255),
+    "classroom" VARCHAR(50),
+    "week_type" SMALLINT   /* EVEN: 0\\nODD: 1 */,
+    "subgroup" INT,
+    "created_at" TIMESTAMP NOT NULL  DEFAULT CURRENT_TIMESTAMP,
+    "updated_at" TIMESTAMP NOT NULL  DEFAULT CURRENT_TIMESTAMP,
+    "subject_id" INT NOT NULL REFERENCES "subjects" ("id") ON DELETE CASCADE
+);
+INSERT INTO "lessons_new" (
+    "id", "day_of_week", "start_minutes", "end_minutes", "lesson_type", "teacher",
+    "classroom", "week_type", "subgroup", "created_at", "updated_at", "subject_id"
+)
+SELECT
+    "id", "day_of_week",
+    CAST(substr("start_time", 1, instr("start_time", ':') - 1) AS INTEGER) * 60
+        + CAST(substr("start_time", instr("start_time", ':') + 1) AS INTEGER),
+    CAST(substr("end_time", 1, instr("end_time", ':') - 1) AS INTEGER) * 60
+        + CAST(substr("end_time", instr("end_time", ':') + 1) AS INTEGER),
+    "lesson_type", "teacher", "classroom",
+    CASE "week_type" WHEN 'even' THEN 0 WHEN 'odd' THEN 1 END,
+    "subgroup", "created_at", "created_at", "subject_id"
+FROM "lessons";
+DROP TABLE "lessons";
+ALTER TABLE "lessons_new" RENAME TO "lessons";
+CREATE INDEX "idx_lessons_week_ty_b823bb" ON "lessons" ("week_type", "day_of_week", "subgroup");"""
+
+SQLITE_DOWNGRADE = """
+        CREATE TABLE "lessons_old" (
+    "id" INTEGER PRIMARY KEY AUTOINCREMENT NOT NULL,
+    "day_of_week" INT NOT NULL,
+    "start_time" VARCHAR(10) NOT NULL,
+    "end_time" VARCHAR(10) NOT NULL,
+    "lesson_type" VARCHAR(50) NOT NULL,
+    "teacher" VARCHAR(255),
+    "classroom" VARCHAR(50),
+    "week_type" VARCHAR(10),
+    "subgroup" INT,
+    "created_at" TIMESTAMP NOT NULL  DEFAULT CURRENT_TIMESTAMP,
+    "subject_id" INT NOT NULL REFERENCES "subjects" ("id") ON DELETE CASCADE
+);
+INSERT INTO "lessons_old" (
+    "id", "day_of_week", "start_time", "end_time", "lesson_type", "teacher",
+    "classroom", "week_type", "subgroup", "created_at", "subject_id"
+)
+SELECT
+    "id", "day_of_week",
+    printf('%02d:%02d', "start_minutes" / 60, "start_minutes" % 60),
+    printf('%02d:%02d', "end_minutes" / 60, "end_minutes" % 60),
+    "lesson_type", "teacher", "classroom",
+    CASE "week_type" WHEN 0 THEN 'even' WHEN 1 THEN 'odd' END,
+    "subgroup", "created_at", "subject_id"
+FROM "lessons";
+DROP TABLE "lessons";
+ALTER TABLE "lessons_old" RENAME TO "lessons";"""
+
+POSTGRES_UPGRADE = """
+        ALTER TABLE "lessons" ALTER COLUMN "day_of_week" TYPE SMALLINT;
+ALTER TABLE "lessons" RENAME COLUMN "start_time" TO "start_minutes";
+ALTER TABLE "lessons" ALTER COLUMN "start_minutes" TYPE SMALLINT
+    USING split_part("start_minutes", ':', 1)::INT * 60 + split_part("start_minutes", ':', 2)::INT;
+ALTER TABLE "lessons" RENAME COLUMN "end_time" TO "end_minutes";
+ALTER TABLE "lessons" ALTER COLUMN "end_minutes" TYPE SMALLINT
+    USING split_part("end_minutes", ':', 1)::INT * 60 + split_part("end_minutes", ':', 2)::INT;
+ALTER TABLE "lessons" ALTER COLUMN "week_type" TYPE SMALLINT
+    USING CASE "week_type" WHEN 'even' THEN 0 WHEN 'odd' THEN 1 END;
+COMMENT ON COLUMN "lessons"."week_type" IS 'EVEN: 0\\nODD: 1';
+ALTER TABLE "lessons" ADD "updated_at" TIMESTAMPTZ NOT NULL  DEFAULT CURRENT_TIMESTAMP;
+CREATE INDEX "idx_lessons_week_ty_b823bb" ON "lessons" ("week_type", "day_of_week", "subgroup");"""
+
+POSTGRES_DOWNGRADE = """
+        DROP INDEX "idx_lessons_week_ty_b823bb";
+ALTER TABLE "lessons" DROP COLUMN "updated_at";
+COMMENT ON COLUMN "lessons"."week_type" IS NULL;
+ALTER TABLE "lessons" ALTER COLUMN "week_type" TYPE VARCHAR(10)
+    USING CASE "week_type" WHEN 0 THEN 'even' WHEN 1 THEN 'odd' END;
+ALTER TABLE "lessons" ALTER COLUMN "end_minutes" TYPE VARCHAR(10)
+    USING lpad(("end_minutes" / 60)::TEXT, 2, '0') || ':' || lpad(("end_minutes" % 60)::TEXT, 2, '0');
+ALTER TABLE "lessons" RENAME COLUMN "end_minutes" TO "end_time";
+ALTER TABLE "lessons" ALTER COLUMN "start_minutes" TYPE VARCHAR(10)
+    USING lpad(("start_minutes" / 60)::TEXT, 2, '0') || ':' || lpad(("start_minutes" % 60)::TEXT, 2, '0');
+ALTER TABLE "lessons" RENAME COLUMN "start_minutes" TO "start_time";
+ALTER TABLE "lessons" ALTER COLUMN "day_of_week" TYPE INT;"""
+
+
+async def upgrade(db: BaseDBAsyncClient) -> str:
+    return POSTGRES_UPGRADE if db.capabilities.dialect == "postgres" else SQLITE_UPGRADE
+
+
+async def downgrade(db: BaseDBAsyncClient) -> str:
+    return POSTGRES_DOWNGRADE if db.capabilities.dialect == "postgres" else SQLITE_DOWNGRADE
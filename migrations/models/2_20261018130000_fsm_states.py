@@ -0,0 +1,29 @@
+from tortoise import BaseDBAsyncClient
+
+SQLITE_UPGRADE = """
+        CREATE TABLE IF NOT EXISTS "fsm_states" (
+    "key" VARCHAR(255) NOT NULL  PRIMARY KEY,
+    "state" VARCHAR(255),
+    "data" JSON NOT NULL,
+    "updated_at" TIMESTAMP NOT NULL  DEFAULT CURRENT_TIMESTAMP
+) /* Состояние и данные FSM одного пользователя (для DbStorage) */;
+CREATE INDEX IF NOT EXISTS "idx_fsm_states_updated_12b2d7" ON "fsm_states" ("updated_at");"""
+
+POSTGRES_UPGRADE = """
+        CREATE TABLE IF NOT EXISTS "fsm_states" (
+    "key" VARCHAR(255) NOT NULL  PRIMARY KEY,
+    "state" VARCHAR(255),
+    "data" JSONB NOT NULL,
+    "updated_at" TIMESTAMPTZ NOT NULL  DEFAULT CURRENT_TIMESTAMP
+);
+CREATE INDEX IF NOT EXISTS "idx_fsm_states_updated_12b2d7" ON "fsm_states" ("updated_at");
+COMMENT ON TABLE "fsm_states" IS 'Состояние и данные FSM одного пользователя (для DbStorage)';"""
+
+
+async def upgrade(db: BaseDBAsyncClient) -> str:
+    return POSTGRES_UPGRADE if db.capabilities.dialect == "postgres" else SQLITE_UPGRADE
+
+
+async def downgrade(db: BaseDBAsyncClient) -> str:
+    return """
+        DROP TABLE IF EXISTS "fsm_states";"""
@@ -0,0 +1,17 @@
+from tortoise import BaseDBAsyncClient
+
+
+async def upgrade(db: BaseDBAsyncClient) -> str:
+    if db.capabilities.dialect == "postgres":
+        return """
+        ALTER TABLE "users" ADD "remind_before" SMALLINT;
+        ALTER TABLE "users" ADD "morning_digest" BOOL NOT NULL  DEFAULT False;"""
+    return """
+        ALTER TABLE "users" ADD "remind_before" SMALLINT;
+        ALTER TABLE "users" ADD "morning_digest" INT NOT NULL  DEFAULT 0;"""
+
+
+async def downgrade(db: BaseDBAsyncClient) -> str:
+    return """
+        ALTER TABLE "users" DROP COLUMN "remind_before";
+        ALTER TABLE "users" DROP COLUMN "morning_digest";"""
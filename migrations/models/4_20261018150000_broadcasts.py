@@ -0,0 +1,42 @@
+from tortoise import BaseDBAsyncClient
+
+SQLITE_UPGRADE = """
+        CREATE TABLE IF NOT EXISTS "broadcasts" (
+    "id" INTEGER PRIMARY KEY AUTOINCREMENT NOT NULL,
+    "text" TEXT NOT NULL,
+    "status" VARCHAR(9) NOT NULL  DEFAULT 'running' /* RUNNING: running\\nDONE: done\\nCANCELLED: cancelled */,
+    "last_user_id" BIGINT NOT NULL  DEFAULT 0,
+    "sent" INT NOT NULL  DEFAULT 0,
+    "blocked" INT NOT NULL  DEFAULT 0,
+    "failed" INT NOT NULL  DEFAULT 0,
+    "created_by" BIGINT,
+    "created_at" TIMESTAMP NOT NULL  DEFAULT CURRENT_TIMESTAMP,
+    "updated_at" TIMESTAMP NOT NULL  DEFAULT CURRENT_TIMESTAMP,
+    "finished_at" TIMESTAMP
+) /* Рассылка всем пользователям; last_user_id — до какого id она уже дошла */;"""
+
+POSTGRES_UPGRADE = """
+        CREATE TABLE IF NOT EXISTS "broadcasts" (
+    "id" SERIAL NOT NULL PRIMARY KEY,
+    "text" TEXT NOT NULL,
+    "status" VARCHAR(9) NOT NULL  DEFAULT 'running',
+    "last_user_id" BIGINT NOT NULL  DEFAULT 0,
+    "sent" INT NOT NULL  DEFAULT 0,
+    "blocked" INT NOT NULL  DEFAULT 0,
+    "failed" INT NOT NULL  DEFAULT 0,
+    "created_by" BIGINT,
+    "created_at" TIMESTAMPTZ NOT NULL  DEFAULT CURRENT_TIMESTAMP,
+    "updated_at" TIMESTAMPTZ NOT NULL  DEFAULT CURRENT_TIMESTAMP,
+    "finished_at" TIMESTAMPTZ
+);
+COMMENT ON COLUMN "broadcasts"."status" IS 'RUNNING: running\\nDONE: done\\nCANCELLED: cancelled';
+COMMENT ON TABLE "broadcasts" IS 'Рассылка всем пользователям; last_user_id — до какого id она уже дошла';"""
+
+
+async def upgrade(db: BaseDBAsyncClient) -> str:
+    return POSTGRES_UPGRADE if db.capabilities.dialect == "postgres" else SQLITE_UPGRADE
+
+
+async def downgrade(db: BaseDBAsyncClient) -> str:
+    return """
+        DROP TABLE IF EXISTS "broadcasts";"""
@@ -0,0 +1,124 @@
+from tortoise import BaseDBAsyncClient
+
+# Уже загруженное расписание и пользователи переходят в группу с этим именем
+# (совпадает со значением DEFAULT_GROUP по умолчанию)
+SQLITE_UPGRADE = """
+        CREATE TABLE IF NOT EXISTS "groups" (
+    "id" INTEGER PRIMARY KEY AUTOINCREMENT NOT NULL,
+    "name" VARCHAR(100) NOT NULL UNIQUE,
+    "created_at" TIMESTAMP NOT NULL  DEFAULT CURRENT_TIMESTAMP
+) /* Учебная группа; у каждой группы своё расписание */;
+INSERT INTO "groups" ("name")
+SELECT 'Основная' WHERE EXISTS (SELECT 1 FROM "lessons") OR EXISTS (SELECT 1 FROM "users");
+CREATE TABLE "lessons_new" (
+    "id" INTEGER PRIMARY KEY AUTOINCREMENT NOT NULL,
+    "day_of_week" SMALLINT NOT NULL,
+    "start_minutes" SMALLINT NOT NULL,
+    "end_minutes" SMALLINT NOT NULL,
+    "lesson_type" VARCHAR(50) NOT NULL,
+    "teacher" VARCHAR(255),
+    "classroom" VARCHAR(50),
+    "week_type" SMALLINT   /* EVEN: 0\\nODD: 1 */,
+    "subgroup" INT,
+    "created_at" TIMESTAMP NOT NULL  DEFAULT CURRENT_TIMESTAMP,
+    "updated_at" TIMESTAMP NOT NULL  DEFAULT CURRENT_TIMESTAMP,
+    "group_id" INT NOT NULL REFERENCES "groups" ("id") ON DELETE CASCADE,
+    "subject_id" INT NOT NULL REFERENCES "subjects" ("id") ON DELETE CASCADE
+);
+INSERT INTO "lessons_new" (
+    "id", "day_of_week", "start_minutes", "end_minutes", "lesson_type", "teacher",
+    "classroom", "week_type", "subgroup", "created_at", "updated_at", "group_id", "subject_id"
+)
+SELECT
+    "id", "day_of_week", "start_minutes", "end_minutes", "lesson_type", "teacher",
+    "classroom", "week_type", "subgroup", "created_at", "updated_at",
+    (SELECT "id" FROM "groups" WHERE "name" = 'Основная'), "subject_id"
+FROM "lessons";
+DROP TABLE "lessons";
+ALTER TABLE "lessons_new" RENAME TO "lessons";
+CREATE INDEX "idx_lessons_group_i_a796e9" ON "lessons" ("group_id", "week_type", "day_of_week", "subgroup");
+ALTER TABLE "users" ADD "group_id" INT REFERENCES "groups" ("id") ON DELETE SET NULL;
+UPDATE "users" SET "group_id" = (SELECT "id" FROM "groups" WHERE "name" = 'Основная');
+CREATE INDEX "idx_users_group_i_eeb251" ON "users" ("group_id", "subgroup");"""
+
+# Столбец со внешним ключом SQLite удалить не может: users тоже пересоздаётся
+SQLITE_DOWNGRADE = """
+        DROP INDEX "idx_users_group_i_eeb251";
+CREATE TABLE "users_old" (
+    "id" INTEGER PRIMARY KEY AUTOINCREMENT NOT NULL,
+    "username" VARCHAR(255),
+    "full_name" VARCHAR(255),
+    "subgroup" INT,
+    "created_at" TIMESTAMP NOT NULL  DEFAULT CURRENT_TIMESTAMP,
+    "updated_at" TIMESTAMP NOT NULL  DEFAULT CURRENT_TIMESTAMP,
+    "remind_before" SMALLINT,
+    "morning_digest" INT NOT NULL  DEFAULT 0
+);
+INSERT INTO "users_old" (
+    "id", "username", "full_name", "subgroup", "created_at", "updated_at", "remind_before", "morning_digest"
+)
+SELECT
+    "id", "username", "full_name", "subgroup", "created_at", "updated_at", "remind_before", "morning_digest"
+FROM "users";
+DROP TABLE "users";
+ALTER TABLE "users_old" RENAME TO "users";
+CREATE TABLE "lessons_old" (
+    "id" INTEGER PRIMARY KEY AUTOINCREMENT NOT NULL,
+    "day_of_week" SMALLINT NOT NULL,
+    "start_minutes" SMALLINT NOT NULL,
+    "end_minutes" SMALLINT NOT NULL,
+    "lesson_type" VARCHAR(50) NOT NULL,
+    "teacher" VARCHAR(255),
+    "classroom" VARCHAR(50),
+    "week_type" SMALLINT   /* EVEN: 0\\nODD: 1 */,
+    "subgroup" INT,
+    "created_at" TIMESTAMP NOT NULL  DEFAULT CURRENT_TIMESTAMP,
+    "updated_at" TIMESTAMP NOT NULL  DEFAULT CURRENT_TIMESTAMP,
+    "subject_id" INT NOT NULL REFERENCES "subjects" ("id") ON DELETE CASCADE
+);
+INSERT INTO "lessons_old" (
+    "id", "day_of_week", "start_minutes", "end_minutes", "lesson_type", "teacher",
+    "classroom", "week_type", "subgroup", "created_at", "updated_at", "subject_id"
+)
+SELECT
+    "id", "day_of_week", "start_minutes", "end_minutes", "lesson_type", "teacher",
+    "classroom", "week_type", "subgroup", "created_at", "updated_at", "subject_id"
+FROM "lessons";
+DROP TABLE "lessons";
+ALTER TABLE "lessons_old" RENAME TO "lessons";
+CREATE INDEX "idx_lessons_week_ty_b823bb" ON "lessons" ("week_type", "day_of_week", "subgroup");
+DROP TABLE "groups";"""
+
+POSTGRES_UPGRADE = """
+        CREATE TABLE IF NOT EXISTS "groups" (
+    "id" SERIAL NOT NULL PRIMARY KEY,
+    "name" VARCHAR(100) NOT NULL UNIQUE,
+    "created_at" TIMESTAMPTZ NOT NULL  DEFAULT CURRENT_TIMESTAMP
+);
+COMMENT ON TABLE "groups" IS 'Учебная группа; у каждой группы своё расписание';
+INSERT INTO "groups" ("name")
+SELECT 'Основная' WHERE EXISTS (SELECT 1 FROM "lessons") OR EXISTS (SELECT 1 FROM "users");
+ALTER TABLE "lessons" ADD "group_id" INT REFERENCES "groups" ("id") ON DELETE CASCADE;
+UPDATE "lessons" SET "group_id" = (SELECT "id" FROM "groups" WHERE "name" = 'Основная');
+ALTER TABLE "lessons" ALTER COLUMN "group_id" SET NOT NULL;
+DROP INDEX "idx_lessons_week_ty_b823bb";
+CREATE INDEX "idx_lessons_group_i_a796e9" ON "lessons" ("group_id", "week_type", "day_of_week", "subgroup");
+ALTER TABLE "users" ADD "group_id" INT REFERENCES "groups" ("id") ON DELETE SET NULL;
+UPDATE "users" SET "group_id" = (SELECT "id" FROM "groups" WHERE "name" = 'Основная');
+CREATE INDEX "idx_users_group_i_eeb251" ON "users" ("group_id", "subgroup");"""
+
+POSTGRES_DOWNGRADE = """
+        DROP INDEX "idx_users_group_i_eeb251";
+ALTER TABLE "users" DROP COLUMN "group_id";
+DROP INDEX "idx_lessons_group_i_a796e9";
+ALTER TABLE "lessons" DROP COLUMN "group_id";
+CREATE INDEX "idx_lessons_week_ty_b823bb" ON "lessons" ("week_type", "day_of_week", "subgroup");
+DROP TABLE "groups";"""
+
+
+async def upgrade(db: BaseDBAsyncClient) -> str:
+    return POSTGRES_UPGRADE if db.capabilities.dialect == "postgres" else SQLITE_UPGRADE
+
+
+async def downgrade(db: BaseDBAsyncClient) -> str:
+    return POSTGRES_DOWNGRADE if db.capabilities.dialect == "postgres" else SQLITE_DOWNGRADE
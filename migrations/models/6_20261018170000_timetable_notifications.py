@@ -0,0 +1,25 @@
+from tortoise import BaseDBAsyncClient
+
+SQLITE_UPGRADE = """
+        CREATE TABLE IF NOT EXISTS "timetable_notifications" (
+    "id" INTEGER PRIMARY KEY AUTOINCREMENT NOT NULL,
+    "fingerprint" VARCHAR(100) NOT NULL UNIQUE,
+    "created_at" TIMESTAMP NOT NULL  DEFAULT CURRENT_TIMESTAMP
+) /* Разосланное уведомление об изменении расписания; fingerprint — отпечаток нового расписания */;"""
+
+POSTGRES_UPGRADE = """
+        CREATE TABLE IF NOT EXISTS "timetable_notifications" (
+    "id" SERIAL NOT NULL PRIMARY KEY,
+    "fingerprint" VARCHAR(100) NOT NULL UNIQUE,
+    "created_at" TIMESTAMPTZ NOT NULL  DEFAULT CURRENT_TIMESTAMP
+);
+COMMENT ON TABLE "timetable_notifications" IS 'Разосланное уведомление об изменении расписания; fingerprint — отпечаток нового расписания';"""
+
+
+async def upgrade(db: BaseDBAsyncClient) -> str:
+    return POSTGRES_UPGRADE if db.capabilities.dialect == "postgres" else SQLITE_UPGRADE
+
+
+async def downgrade(db: BaseDBAsyncClient) -> str:
+    return """
+        DROP TABLE IF EXISTS "timetable_notifications";"""
@@ -0,0 +1,17 @@
+from tortoise import BaseDBAsyncClient
+
+
+async def upgrade(db: BaseDBAsyncClient) -> str:
+    if db.capabilities.dialect == "postgres":
+        return """
+        ALTER TABLE "users" ADD "last_seen_at" TIMESTAMPTZ;
+        CREATE INDEX "idx_users_last_se_54f739" ON "users" ("last_seen_at");"""
+    return """
+        ALTER TABLE "users" ADD "last_seen_at" TIMESTAMP;
+        CREATE INDEX "idx_users_last_se_54f739" ON "users" ("last_seen_at");"""
+
+
+async def downgrade(db: BaseDBAsyncClient) -> str:
+    return """
+        DROP INDEX "idx_users_last_se_54f739";
+        ALTER TABLE "users" DROP COLUMN "last_seen_at";"""
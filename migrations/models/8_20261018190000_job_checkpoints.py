@@ -0,0 +1,25 @@
+from tortoise import BaseDBAsyncClient
+
+SQLITE_UPGRADE = """
+        CREATE TABLE IF NOT EXISTS "job_checkpoints" (
+    "name" VARCHAR(50) NOT NULL  PRIMARY KEY,
+    "fired_until" TIMESTAMP NOT NULL,
+    "updated_at" TIMESTAMP NOT NULL  DEFAULT CURRENT_TIMESTAMP
+) /* Докуда дошла фоновая задача; fired_until — время последнего сработавшего таймера */;"""
+
+POSTGRES_UPGRADE = """
+        CREATE TABLE IF NOT EXISTS "job_checkpoints" (
+    "name" VARCHAR(50) NOT NULL  PRIMARY KEY,
+    "fired_until" TIMESTAMPTZ NOT NULL,
+    "updated_at" TIMESTAMPTZ NOT NULL  DEFAULT CURRENT_TIMESTAMP
+);
+COMMENT ON TABLE "job_checkpoints" IS 'Докуда дошла фоновая задача; fired_until — время последнего сработавшего таймера';"""
+
+
+async def upgrade(db: BaseDBAsyncClient) -> str:
+    return POSTGRES_UPGRADE if db.capabilities.dialect == "postgres" else SQLITE_UPGRADE
+
+
+async def downgrade(db: BaseDBAsyncClient) -> str:
+    return """
+        DROP TABLE IF EXISTS "job_checkpoints";"""
@@ -0,0 +1,31 @@
+from enum import Enum
+
+from tortoise.models import Model
+from tortoise import fields
+
+
+class BroadcastStatus(str, Enum):
+    RUNNING = "running"
+    DONE = "done"
+    CANCELLED = "cancelled"
+
+
+class Broadcast(Model):
+    """Рассылка всем пользователям; last_user_id — до какого id она уже дошла"""
+    id = fields.IntField(pk=True)
+    text = fields.TextField()
+    status = fields.CharEnumField(BroadcastStatus, default=BroadcastStatus.RUNNING)
+    last_user_id = fields.BigIntField(default=0)
+    sent = fields.IntField(default=0)
+    blocked = fields.IntField(default=0)
+    failed = fields.IntField(default=0)
+    created_by = fields.BigIntField(null=True)
+    created_at = fields.DatetimeField(auto_now_add=True)
+    updated_at = fields.DatetimeField(auto_now=True)
+    finished_at = fields.DatetimeField(null=True)
+
+    class Meta:
+        table = "broadcasts"
+
+    def __str__(self):
+        return f"Рассылка {self.id} ({self.status.value})"
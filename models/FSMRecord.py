@@ -0,0 +1,16 @@
+from tortoise.models import Model
+from tortoise import fields
+
+
+class FSMRecord(Model):
+    """Состояние и данные FSM одного пользователя (для DbStorage)"""
+    key = fields.CharField(max_length=255, pk=True)
+    state = fields.CharField(max_length=255, null=True)
+    data = fields.JSONField(default=dict)
+    updated_at = fields.DatetimeField(auto_now=True, index=True)
+
+    class Meta:
+        table = "fsm_states"
+
+    def __str__(self):
+        return f"FSM {self.key}: {self.state}"
@@ -0,0 +1,15 @@
+from tortoise.models import Model
+from tortoise import fields
+
+
+class Group(Model):
+    """Учебная группа; у каждой группы своё расписание"""
+    id = fields.IntField(pk=True)
+    name = fields.CharField(max_length=100, unique=True)
+    created_at = fields.DatetimeField(auto_now_add=True)
+
+    class Meta:
+        table = "groups"
+
+    def __str__(self):
+        return self.name
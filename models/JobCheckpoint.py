@@ -0,0 +1,12 @@
+from tortoise.models import Model
+from tortoise import fields
+
+
+class JobCheckpoint(Model):
+    """Докуда дошла фоновая задача; fired_until — время последнего сработавшего таймера"""
+    name = fields.CharField(max_length=50, pk=True)
+    fired_until = fields.DatetimeField()
+    updated_at = fields.DatetimeField(auto_now=True)
+
+    class Meta:
+        table = "job_checkpoints"
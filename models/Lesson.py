@@ -1,26 +1,64 @@
+from enum import IntEnum
+
 from tortoise.models import Model
 from tortoise import fields
 
 
+class WeekType(IntEnum):
+    EVEN = 0
+    ODD = 1
+
+    @property
+    def slug(self) -> str:
+        return self.name.lower()
+
+    @classmethod
+    def from_slug(cls, slug: str | None) -> "WeekType | None":
+        return cls[slug.upper()] if slug is not None else None
+
+
+def minutes_to_time(minutes: int) -> str:
+    return f"{minutes // 60:02d}:{minutes % 60:02d}"
+
+
 class Lesson(Model):
     id = fields.IntField(pk=True)
+    group = fields.ForeignKeyField('models.Group', related_name='lessons')
     subject = fields.ForeignKeyField('models.Subject', related_name='lessons')
-    day_of_week = fields.IntField()
-    start_time = fields.CharField(max_length=10)
-    end_time = fields.CharField(max_length=10)
+    day_of_week = fields.SmallIntField()
+    # Время хранится в минутах от начала суток, чтобы сортировать пары средствами БД
+    start_minutes = fields.SmallIntField()
+    end_minutes = fields.SmallIntField()
     lesson_type = fields.CharField(max_length=50)
     teacher = fields.CharField(max_length=255, null=True)
     classroom = fields.CharField(max_length=50, null=True)
-    week_type = fields.CharField(max_length=10, null=True)
+    week = fields.IntEnumField(WeekType, source_field="week_type", null=True)
     subgroup = fields.IntField(null=True)
     created_at = fields.DatetimeField(auto_now_add=True)
+    updated_at = fields.DatetimeField(auto_now=True)
 
     class Meta:
         table = "lessons"
+        indexes = (("group", "week", "day_of_week", "subgroup"),)
 
     def __str__(self):
         return f"{self.subject.name} - {self.get_day_name()} {self.start_time}"
 
+    @property
+    def start_time(self) -> str:
+        """Время начала в формате HH:MM"""
+        return minutes_to_time(self.start_minutes)
+
+    @property
+    def end_time(self) -> str:
+        """Время окончания в формате HH:MM"""
+        return minutes_to_time(self.end_minutes)
+
+    @property
+    def week_type(self) -> str | None:
+        """Тип недели: "even", "odd" или None"""
+        return self.week.slug if self.week is not None else None
+
     def get_day_name(self) -> str:
         """Возвращает название дня недели"""
         days = ["Понедельник", "Вторник", "Среда", "Четверг", "Пятница", "Суббота", "Воскресенье"]
@@ -0,0 +1,12 @@
+from tortoise.models import Model
+from tortoise import fields
+
+
+class TimetableNotification(Model):
+    """Разосланное уведомление об изменении расписания; fingerprint — отпечаток нового расписания"""
+    id = fields.IntField(pk=True)
+    fingerprint = fields.CharField(max_length=100, unique=True)
+    created_at = fields.DatetimeField(auto_now_add=True)
+
+    class Meta:
+        table = "timetable_notifications"
@@ -5,12 +5,19 @@ class User(Model):
     id = fields.BigIntField(pk=True)
     username = fields.CharField(max_length=255, null=True)
     full_name = fields.CharField(max_length=255, null=True)
+    group = fields.ForeignKeyField('models.Group', related_name='users', null=True, on_delete=fields.SET_NULL)
     subgroup = fields.IntField(null=True)
+    # За сколько минут до пары присылать напоминание (None — не присылать)
+    remind_before = fields.SmallIntField(null=True)
+    morning_digest = fields.BooleanField(default=False)
     created_at = fields.DatetimeField(auto_now_add=True)
     updated_at = fields.DatetimeField(auto_now=True)
+    # Последняя активность с точностью до LAST_SEEN_RESOLUTION (utils/user.py)
+    last_seen_at = fields.DatetimeField(null=True, index=True)
 
     class Meta:
         table = "users"
+        indexes = (("group", "subgroup"),)
 
     def __str__(self):
         return f"Пользователь {self.id} ({self.full_name})"
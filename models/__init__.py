@@ -1,3 +1,8 @@
-from .Lesson import Lesson
+from .Group import Group
+from .Lesson import Lesson, WeekType
 from .Subject import Subject
 from .User import User
+from .FSMRecord import FSMRecord
+from .Broadcast import Broadcast, BroadcastStatus
+from .TimetableNotification import TimetableNotification
+from .JobCheckpoint import JobCheckpoint
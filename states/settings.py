@@ -2,4 +2,5 @@ from aiogram.fsm.state import StatesGroup, State
 
 
 class SettingsState(StatesGroup):
+    choose_group = State()
     choose_subgroup = State()
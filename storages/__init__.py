@@ -0,0 +1,24 @@
+from datetime import timedelta
+
+from aiogram.fsm.storage.base import BaseStorage
+from aiogram.fsm.storage.memory import MemoryStorage
+
+import config
+
+
+def create_fsm_storage() -> BaseStorage:
+    """FSM-хранилище, выбранное в FSM_STORAGE: memory, redis или db"""
+    ttl = timedelta(seconds=config.FSM_STATE_TTL) if config.FSM_STATE_TTL else None
+
+    match config.FSM_STORAGE:
+        case 'memory':
+            return MemoryStorage()
+        case 'redis':
+            # Пакет redis нужен только для этого варианта
+            from aiogram.fsm.storage.redis import RedisStorage
+            return RedisStorage.from_url(config.REDIS_URL, state_ttl=ttl, data_ttl=ttl)
+        case 'db':
+            from .db import DbStorage
+            return DbStorage(ttl=ttl)
+        case _:
+            raise ValueError('Некорректный FSM_STORAGE в .env файле!')
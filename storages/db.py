@@ -0,0 +1,67 @@
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Mapping, Optional
+
+from aiogram.fsm.state import State
+from aiogram.fsm.storage.base import BaseStorage, DefaultKeyBuilder, KeyBuilder, StateType, StorageKey
+
+from tortoise.exceptions import IntegrityError
+
+from models import FSMRecord
+
+
+class DbStorage(BaseStorage):
+    """
+    FSM-хранилище в основной базе данных (через Tortoise).
+    Записи, не обновлявшиеся дольше ttl, считаются устаревшими и удаляются.
+    """
+
+    def __init__(self, key_builder: Optional[KeyBuilder] = None, ttl: Optional[timedelta] = None):
+        self.key_builder = key_builder or DefaultKeyBuilder()
+        self.ttl = ttl
+
+    def _is_expired(self, record: FSMRecord) -> bool:
+        return self.ttl is not None and record.updated_at < datetime.now(timezone.utc) - self.ttl
+
+    async def _get_record(self, key: StorageKey) -> Optional[FSMRecord]:
+        record = await FSMRecord.get_or_none(key=self.key_builder.build(key))
+        if record is not None and self._is_expired(record):
+            await record.delete()
+            return None
+        return record
+
+    async def _upsert(self, key: StorageKey, **values: Any) -> None:
+        # Обычно запись уже есть, поэтому сначала пробуем UPDATE
+        record_key = self.key_builder.build(key)
+        values["updated_at"] = datetime.now(timezone.utc)
+        if await FSMRecord.filter(key=record_key).update(**values):
+            return
+
+        try:
+            await FSMRecord.create(key=record_key, **values)
+        except IntegrityError:
+            # Запись успел создать параллельный запрос
+            await FSMRecord.filter(key=record_key).update(**values)
+
+    async def set_state(self, key: StorageKey, state: StateType = None) -> None:
+        await self._upsert(key, state=state.state if isinstance(state, State) else state)
+
+    async def get_state(self, key: StorageKey) -> Optional[str]:
+        record = await self._get_record(key)
+        return record.state if record is not None else None
+
+    async def set_data(self, key: StorageKey, data: Mapping[str, Any]) -> None:
+        await self._upsert(key, data=dict(data))
+
+    async def get_data(self, key: StorageKey) -> Dict[str, Any]:
+        record = await self._get_record(key)
+        return dict(record.data) if record is not None else {}
+
+    async def delete_expired(self) -> int:
+        """Удаляет все устаревшие записи"""
+        if self.ttl is None:
+            return 0
+        return await FSMRecord.filter(updated_at__lt=datetime.now(timezone.utc) - self.ttl).delete()
+
+    async def close(self) -> None:
+        # Соединение общее с остальным ботом и закрывается в close_db
+        pass
@@ -0,0 +1,22 @@
+import asyncio
+from typing import Awaitable, Callable
+
+import pytest
+from tortoise import Tortoise
+
+
+@pytest.fixture
+def run_db() -> Callable[[Callable[[], Awaitable]], object]:
+    """Выполняет корутину на чистой базе SQLite в памяти"""
+    def run(test: Callable[[], Awaitable]):
+        async def main():
+            await Tortoise.init(db_url="sqlite://:memory:", modules={"models": ["models"]})
+            await Tortoise.generate_schemas()
+            try:
+                return await test()
+            finally:
+                await Tortoise.close_connections()
+
+        return asyncio.run(main())
+
+    return run
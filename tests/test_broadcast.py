@@ -0,0 +1,31 @@
+import asyncio
+
+from models import Broadcast
+from utils.broadcast import Broadcaster
+
+
+def test_resume_does_not_relaunch_started_broadcast(run_db):
+    async def check():
+        broadcaster = Broadcaster()
+        launched = []
+
+        async def run(broadcast):
+            launched.append(broadcast.id)
+            await asyncio.Event().wait()
+
+        broadcaster._run = run
+        broadcast = await Broadcast.create(text="hello")
+        # start запускает рассылку, пока resume ждёт ответа базы
+        resuming = asyncio.create_task(broadcaster.resume())
+        await asyncio.sleep(0)
+        broadcaster._launch(broadcast)
+        first = broadcaster._tasks[broadcast.id]
+        await resuming
+        await asyncio.sleep(0)
+        task = broadcaster._tasks[broadcast.id]
+        await broadcaster.stop()
+        return launched, task is first
+
+    launched, same_task = run_db(check)
+    assert len(launched) == 1
+    assert same_task
@@ -0,0 +1,32 @@
+import json
+
+from utils.schedule_sync import sync_schedule
+from utils.timetable import get_timetable_fingerprint
+
+LESSON = {
+    "group": "ИВТ-21", "day": "Понедельник", "time": "8:00-9:35", "subject": "Математический анализ",
+    "type": "л", "teacher": "доц. Жалнина А.А.", "week": "even",
+}
+
+
+def write_schedule(path, classroom):
+    path.write_text(json.dumps([{**LESSON, "classroom": classroom}], ensure_ascii=False), encoding="utf-8")
+
+
+def test_fingerprint_changes_on_update_only_sync(run_db, tmp_path):
+    path = tmp_path / "schedule.json"
+
+    async def check():
+        write_schedule(path, "2115")
+        await sync_schedule(path)
+        fingerprints = [await get_timetable_fingerprint()]
+        for classroom in ("2219", "5203"):
+            write_schedule(path, classroom)
+            report = await sync_schedule(path)
+            assert len(report.changes.updated) == 1
+            fingerprints.append(await get_timetable_fingerprint())
+        return fingerprints
+
+    first, second, third = run_db(check)
+    assert first != second
+    assert second != third
@@ -0,0 +1,163 @@
+"""
+Академический календарь: чётность недели и учебные дни по датам.
+
+Календарь читается из JSON-файла (CALENDAR_PATH) при старте и раскладывается в
+словарь дата → CalendarDay на весь учебный год, так что любой запрос по дате —
+одно обращение к словарю. Формат файла:
+
+    {
+        "terms": [
+            {"start": "2026-09-01", "end": "2026-12-28", "first_week": "odd"},
+            {"start": "2027-02-09", "end": "2027-06-30", "first_week": "odd"}
+        ],
+        "breaks": [
+            {"from": "2026-11-04", "to": "2026-11-04", "name": "День народного единства"}
+        ]
+    }
+
+Недели семестра считаются с понедельника недели, в которую попадает start;
+first_week — чётность этой первой недели. Дни вне семестров и дни из breaks
+неучебные. Если файла нет, чётность считается по-старому — от 1 сентября,
+и все дни учебные.
+"""
+import json
+import logging
+from dataclasses import dataclass
+from datetime import date, timedelta
+from pathlib import Path
+
+from utils.common import is_even_week_from_september
+
+logger = logging.getLogger(__name__)
+
+WEEK_TYPES = ("even", "odd")
+
+
+class CalendarError(Exception):
+    """Ошибка в файле академического календаря"""
+
+
+@dataclass(frozen=True)
+class CalendarDay:
+    date: date
+    week_type: str
+    study: bool = True
+    # Название каникул или праздника для неучебного дня
+    note: str | None = None
+
+
+def _legacy_day(target_date: date) -> CalendarDay:
+    return CalendarDay(target_date, "even" if is_even_week_from_september(target_date) else "odd")
+
+
+def _parse_date(value, field: str) -> date:
+    try:
+        return date.fromisoformat(value)
+    except (TypeError, ValueError):
+        raise CalendarError(f"{field}: ожидается дата в формате ГГГГ-ММ-ДД, получено {value!r}") from None
+
+
+def _other_week(week_type: str) -> str:
+    return "odd" if week_type == "even" else "even"
+
+
+class AcademicCalendar:
+    def __init__(self, days: dict[date, CalendarDay] | None = None):
+        self._days = days or {}
+
+    def __len__(self) -> int:
+        return len(self._days)
+
+    @property
+    def configured(self) -> bool:
+        return bool(self._days)
+
+    @classmethod
+    def from_config(cls, data: dict) -> "AcademicCalendar":
+        terms = data.get("terms") or []
+        if not terms:
+            raise CalendarError("в календаре нет ни одного семестра (terms)")
+
+        days: dict[date, CalendarDay] = {}
+        for number, term in enumerate(terms, start=1):
+            start = _parse_date(term.get("start"), f"семестр {number}, start")
+            end = _parse_date(term.get("end"), f"семестр {number}, end")
+            first_week = term.get("first_week", "odd")
+            if first_week not in WEEK_TYPES:
+                raise CalendarError(f"семестр {number}: first_week должен быть even или odd")
+            if end < start:
+                raise CalendarError(f"семестр {number}: конец раньше начала")
+
+            first_monday = start - timedelta(days=start.weekday())
+            current = start
+            while current <= end:
+                weeks = (current - first_monday).days // 7
+                days[current] = CalendarDay(current, first_week if weeks % 2 == 0 else _other_week(first_week))
+                current += timedelta(days=1)
+
+        # Дни между семестрами — каникулы; чётность для них не важна, но пусть будет определена
+        first, last = min(days), max(days)
+        current = first
+        while current <= last:
+            if current not in days:
+                days[current] = CalendarDay(current, _legacy_day(current).week_type, study=False, note="каникулы")
+            current += timedelta(days=1)
+
+        for number, item in enumerate(data.get("breaks") or [], start=1):
+            start = _parse_date(item.get("from"), f"перерыв {number}, from")
+            end = _parse_date(item.get("to", item.get("from")), f"перерыв {number}, to")
+            current = start
+            while current <= end:
+                week_type = days[current].week_type if current in days else _legacy_day(current).week_type
+                days[current] = CalendarDay(current, week_type, study=False, note=item.get("name"))
+                current += timedelta(days=1)
+
+        return cls(days)
+
+    @classmethod
+    def load(cls, path: str | Path) -> "AcademicCalendar":
+        """Календарь из файла; без файла — старое правило чётности от 1 сентября"""
+        path = Path(path)
+        if not path.exists():
+            return cls()
+        try:
+            data = json.loads(path.read_text(encoding="utf-8"))
+        except json.JSONDecodeError as e:
+            raise CalendarError(f"{path}: {e}") from None
+        return cls.from_config(data)
+
+    def day(self, target_date: date) -> CalendarDay:
+        calendar_day = self._days.get(target_date)
+        if calendar_day is not None:
+            return calendar_day
+        if self._days:
+            # За пределами описанного года занятий нет
+            return CalendarDay(target_date, _legacy_day(target_date).week_type, study=False, note="каникулы")
+        return _legacy_day(target_date)
+
+    def week_type(self, target_date: date) -> str:
+        return self.day(target_date).week_type
+
+    def days(self, start: date, count: int) -> list[CalendarDay]:
+        return [self.day(start + timedelta(days=offset)) for offset in range(count)]
+
+    def study_days(self) -> list[CalendarDay]:
+        """Все учебные дни описанного года по порядку (пусто, если календаря нет)"""
+        return sorted((day for day in self._days.values() if day.study), key=lambda day: day.date)
+
+
+_calendar = AcademicCalendar()
+
+
+def get_calendar() -> AcademicCalendar:
+    return _calendar
+
+
+def load_calendar(path: str | Path) -> AcademicCalendar:
+    global _calendar
+    _calendar = AcademicCalendar.load(path)
+    if _calendar.configured:
+        logger.info("Академический календарь загружен: %s дней", len(_calendar))
+    else:
+        logger.info("Файл календаря %s не найден, чётность недель считается от 1 сентября", path)
+    return _calendar
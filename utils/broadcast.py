@@ -0,0 +1,241 @@
+"""
+Массовая рассылка с соблюдением лимитов Telegram.
+
+Все массовые отправки (рассылки, напоминания) проходят через общие ограничители:
+глобальный — не больше BROADCAST_RATE сообщений в секунду на бота, и отдельный
+на каждый чат — не больше одного сообщения в секунду. При ответе 429 отправка
+ставится на паузу на retry_after секунд и повторяется.
+
+Рассылка всем пользователям читает id из базы порциями по ключу (id > последнего
+обработанного), так что таблица целиком в память не загружается. После каждой
+порции прогресс сохраняется в Broadcast, и прерванная рассылка продолжается с
+того же места после перезапуска. Порция, прерванная посередине, при повторе
+будет отправлена заново.
+
+Отправляет рассылки только экземпляр бота с фоновыми задачами (RUN_JOBS): он
+периодически подхватывает рассылки со статусом running, в том числе созданные
+другими экземплярами. Отмена меняет статус в базе, а отправляющий экземпляр
+проверяет его перед каждой порцией.
+"""
+import asyncio
+import logging
+import time
+from datetime import datetime, timezone
+from typing import Callable, Iterable
+
+from aiogram import Bot
+from aiogram.exceptions import TelegramAPIError, TelegramForbiddenError, TelegramRetryAfter
+
+import config
+from models import Broadcast, BroadcastStatus, User
+from utils.rate_limit import KeyedTokenBuckets, TokenBucket
+
+logger = logging.getLogger(__name__)
+
+SENT = "sent"
+BLOCKED = "blocked"
+FAILED = "failed"
+
+MAX_RETRIES = 5
+
+global_limiter = TokenBucket(config.BROADCAST_RATE)
+chat_limiter = KeyedTokenBuckets(rate=1.0)
+
+
+async def send_limited(bot: Bot, chat_id: int, text: str) -> str:
+    """Отправляет сообщение через ограничители; возвращает SENT, BLOCKED или FAILED"""
+    for _ in range(MAX_RETRIES):
+        await chat_limiter.get(chat_id).acquire()
+        await global_limiter.acquire()
+        try:
+            await bot.send_message(chat_id, text)
+            return SENT
+        except TelegramRetryAfter as e:
+            global_limiter.pause(e.retry_after)
+        except TelegramForbiddenError:
+            # Пользователь заблокировал бота или удалил аккаунт
+            return BLOCKED
+        except TelegramAPIError as e:
+            logger.warning("Не удалось отправить сообщение в чат %s: %s", chat_id, e)
+            return FAILED
+    return FAILED
+
+
+async def send_many(
+        bot: Bot,
+        chat_ids: Iterable[int],
+        text: str,
+        concurrency: int | None = None,
+        on_result: Callable[[int, str], None] | None = None,
+) -> dict[int, str]:
+    """
+    Отправляет один текст многим чатам; возвращает статус по каждому чату.
+
+    Отправляют concurrency обработчиков, которые по очереди берут id из общего
+    итератора, поэтому задач столько же, сколько обработчиков, а не получателей.
+    """
+    statuses: dict[int, str] = {}
+    pending = iter(chat_ids)
+
+    async def worker() -> None:
+        for chat_id in pending:
+            status = statuses[chat_id] = await send_limited(bot, chat_id, text)
+            if on_result is not None:
+                on_result(chat_id, status)
+
+    await asyncio.gather(*(worker() for _ in range(concurrency or config.BROADCAST_CONCURRENCY)))
+    return statuses
+
+
+class Broadcaster:
+    def __init__(self, chunk_size: int = 500, concurrency: int = 20):
+        self.chunk_size = chunk_size
+        self.concurrency = concurrency
+        self._bot: Bot | None = None
+        self._tasks: dict[int, asyncio.Task] = {}
+        self._started: dict[int, tuple[float, int]] = {}
+        self._finished: dict[int, float] = {}
+        self._running: dict[int, Broadcast] = {}
+        self._watcher: asyncio.Task | None = None
+
+    @property
+    def enabled(self) -> bool:
+        return self._watcher is not None
+
+    async def start(self, bot: Bot, text: str, created_by: int | None = None) -> Broadcast:
+        broadcast = await Broadcast.create(text=text, created_by=created_by)
+        if self.enabled:
+            self._launch(broadcast)
+        return broadcast
+
+    async def resume(self) -> int:
+        """Запускает рассылки со статусом running, которые ещё не идут в этом процессе"""
+        broadcasts = await Broadcast.filter(status=BroadcastStatus.RUNNING) \
+            .exclude(id__in=list(self._tasks)).order_by("id")
+        for broadcast in broadcasts:
+            self._launch(broadcast)
+        return len(broadcasts)
+
+    def watch(self, bot: Bot, interval: float) -> None:
+        """Делает этот процесс отправителем рассылок: прерванных и созданных другими экземплярами"""
+        if self._watcher is None:
+            self._bot = bot
+            self._watcher = asyncio.create_task(self._watch(interval))
+
+    async def _watch(self, interval: float) -> None:
+        while True:
+            try:
+                await self.resume()
+            except Exception:
+                logger.exception("Не удалось проверить незавершённые рассылки")
+            await asyncio.sleep(interval)
+
+    def _launch(self, broadcast: Broadcast) -> None:
+        # resume мог прочитать рассылку, которую start запустил, пока шёл запрос
+        if broadcast.id in self._tasks:
+            return
+        self._running[broadcast.id] = broadcast
+        self._started[broadcast.id] = (time.monotonic(), broadcast.sent)
+        task = asyncio.create_task(self._run(broadcast))
+        self._tasks[broadcast.id] = task
+        task.add_done_callback(lambda _: self._tasks.pop(broadcast.id, None))
+
+    async def _run(self, broadcast: Broadcast) -> None:
+        def count(chat_id: int, status: str) -> None:
+            # Счётчики видны в /broadcast_status сразу, а в базу попадают вместе с концом порции
+            setattr(broadcast, status, getattr(broadcast, status) + 1)
+
+        try:
+            while True:
+                # Рассылку могли отменить с другого экземпляра бота
+                status = await Broadcast.filter(id=broadcast.id).first().values_list("status", flat=True)
+                if status != BroadcastStatus.RUNNING:
+                    broadcast.status = BroadcastStatus(status)
+                    self._finished[broadcast.id] = time.monotonic()
+                    logger.info(self.report(broadcast))
+                    return
+
+                user_ids = await User.filter(id__gt=broadcast.last_user_id).order_by("id") \
+                    .limit(self.chunk_size).values_list("id", flat=True)
+                if not user_ids:
+                    break
+
+                await send_many(self._bot, user_ids, broadcast.text, self.concurrency, count)
+                broadcast.last_user_id = user_ids[-1]
+                await broadcast.save(update_fields=["last_user_id", "sent", "blocked", "failed", "updated_at"])
+
+            now = datetime.now(timezone.utc)
+            # Отмена, пришедшая во время последней порции, не перезаписывается
+            if await Broadcast.filter(id=broadcast.id, status=BroadcastStatus.RUNNING) \
+                    .update(status=BroadcastStatus.DONE, finished_at=now, updated_at=now):
+                broadcast.status = BroadcastStatus.DONE
+                broadcast.finished_at = now
+            self._finished[broadcast.id] = time.monotonic()
+            logger.info(self.report(broadcast))
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            # Статус остаётся running: рассылка продолжится после перезапуска
+            logger.exception("Рассылка %s прервана ошибкой", broadcast.id)
+
+    async def cancel(self, broadcast_id: int) -> bool:
+        """Отменяет рассылку в базе; отправляющий экземпляр увидит статус перед следующей порцией"""
+        now = datetime.now(timezone.utc)
+        cancelled = await Broadcast.filter(id=broadcast_id, status=BroadcastStatus.RUNNING) \
+            .update(status=BroadcastStatus.CANCELLED, finished_at=now, updated_at=now)
+        if not cancelled:
+            return False
+
+        task = self._tasks.get(broadcast_id)
+        if task is not None:
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+
+        broadcast = self._running.get(broadcast_id)
+        if broadcast is not None:
+            broadcast.status = BroadcastStatus.CANCELLED
+            broadcast.finished_at = now
+            self._finished[broadcast_id] = time.monotonic()
+        return True
+
+    async def stop(self) -> None:
+        """Останавливает рассылки, оставляя их незавершёнными для продолжения"""
+        tasks = list(self._tasks.values())
+        if self._watcher is not None:
+            tasks.append(self._watcher)
+            self._watcher = None
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    async def get(self, broadcast_id: int | None = None) -> Broadcast | None:
+        """Рассылка по id или последняя; для идущих — с текущими счётчиками"""
+        if broadcast_id is None:
+            broadcast = await Broadcast.all().order_by("-id").first()
+        else:
+            broadcast = await Broadcast.get_or_none(id=broadcast_id)
+        if broadcast is not None and broadcast.id in self._running:
+            return self._running[broadcast.id]
+        return broadcast
+
+    def throughput(self, broadcast: Broadcast) -> float | None:
+        """Сообщений в секунду с момента запуска рассылки в этом процессе"""
+        started = self._started.get(broadcast.id)
+        if started is None:
+            return None
+        started_at, sent_before = started
+        elapsed = self._finished.get(broadcast.id, time.monotonic()) - started_at
+        return (broadcast.sent - sent_before) / elapsed if elapsed > 0 else 0.0
+
+    def report(self, broadcast: Broadcast) -> str:
+        text = (
+            f"Рассылка {broadcast.id} ({broadcast.status.value}): отправлено {broadcast.sent}, "
+            f"заблокировали бота {broadcast.blocked}, ошибок {broadcast.failed}"
+        )
+        throughput = self.throughput(broadcast)
+        if throughput is not None:
+            text += f", {throughput:.1f} сообщ./с"
+        return text
+
+
+broadcaster = Broadcaster(config.BROADCAST_CHUNK_SIZE, config.BROADCAST_CONCURRENCY)
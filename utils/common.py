@@ -1,3 +1,4 @@
+import re
 from datetime import date
 
 
@@ -19,3 +20,29 @@ def is_even_week_from_september(target_date: date | None = None) -> bool:
 def time_to_minutes(time_str: str) -> int:
     time_parts = time_str.split(':')
     return int(time_parts[0]) * 60 + int(time_parts[1])
+
+
+DATE_PATTERN = re.compile(r"(\d{1,2})\.(\d{1,2})(?:\.(\d{4}))?")
+
+
+def parse_date(text: str, today: date | None = None) -> date | None:
+    """
+    Дата вида 24.10 или 24.10.2026; без года выбирается ближайшая к today
+    (в декабре «15.01» — это январь следующего года)
+    """
+    if today is None:
+        today = date.today()
+
+    match = DATE_PATTERN.fullmatch(text.strip())
+    if match is None:
+        return None
+
+    day, month, year = int(match[1]), int(match[2]), match[3]
+    years = [int(year)] if year else [today.year - 1, today.year, today.year + 1]
+    candidates = []
+    for candidate_year in years:
+        try:
+            candidates.append(date(candidate_year, month, day))
+        except ValueError:
+            continue
+    return min(candidates, key=lambda candidate: abs(candidate - today), default=None)
@@ -3,17 +3,29 @@ from functools import wraps
 from aiogram.fsm.context import FSMContext
 from aiogram.types import Message
 
-from keyboards.reply import get_subgroup_keyboard
 from models import User
-from states import SettingsState
+from utils.settings import ask_group, ask_subgroup, needs_subgroup
+
+
+def require_group(func):
+    @wraps(func)
+    async def wrapper(message: Message, user: User, state: FSMContext, *args, **kwargs):
+        if user.group_id is None:
+            await ask_group(message, state, 'Сначала выберите группу')
+            return
+        return await func(message, user, state, *args, **kwargs)
+
+    return wrapper
 
 
 def require_subgroup(func):
     @wraps(func)
     async def wrapper(message: Message, user: User, state: FSMContext, *args, **kwargs):
-        if user.subgroup is None:
-            await state.set_state(SettingsState.choose_subgroup)
-            await message.answer('Сначала выберите подгруппу', reply_markup=get_subgroup_keyboard())
+        if user.group_id is None:
+            await ask_group(message, state, 'Сначала выберите группу')
+            return
+        if needs_subgroup(user):
+            await ask_subgroup(message, state, user.group_id, 'Сначала выберите подгруппу')
             return
         return await func(message, user, state, *args, **kwargs)
 
@@ -1,104 +1,267 @@
 from itertools import groupby
-from typing import Sequence
+from typing import Callable, Iterable, Sequence
 from datetime import date
 
 from models import Lesson
+from utils.schedule_import import LessonRow
 
+DAY_NAMES = ["Понедельник", "Вторник", "Среда", "Четверг", "Пятница", "Суббота", "Воскресенье"]
+DAY_SHORT_NAMES = ["Пн", "Вт", "Ср", "Чт", "Пт", "Сб", "Вс"]
 
-def format_today_schedule(lessons: Sequence[Lesson]) -> str:
-    today = date.today()
-    today_str = today.strftime('%d.%m.%Y')
+# Предельная длина сообщения Telegram
+MESSAGE_LIMIT = 4096
 
-    if not lessons:
-        return f"{today_str} — пар нет 🎉"
 
-    lines = [f"📅 Расписание на {today_str}:"]
+def get_week_label(week_type: str) -> str:
+    return "Чётная неделя" if week_type == "even" else "Нечётная неделя"
+
+
+def format_lesson_details(lesson: Lesson) -> str:
+    """Тип пары, преподаватель и аудитория в виде суффикса строки"""
+    parts = []
 
-    for lesson in lessons:
-        line = f"• {lesson.start_time}–{lesson.end_time} — {lesson.subject.name}"
+    if lesson.lesson_type:
+        parts.append(f" ({lesson.lesson_type})")
 
-        if lesson.lesson_type:
-            line += f" ({lesson.lesson_type})"
+    if lesson.teacher:
+        parts.append(f", {lesson.teacher}")
 
-        if lesson.teacher:
-            line += f", {lesson.teacher}"
+    if lesson.classroom:
+        parts.append(f", ауд. {lesson.classroom}")
 
-        if lesson.classroom:
-            line += f", ауд. {lesson.classroom}"
+    return "".join(parts)
 
-        lines.append(line)
+
+def format_lesson_line(lesson: Lesson, details: str | None = None) -> str:
+    """Строка пары; details — суффикс после предмета (по умолчанию format_lesson_details)"""
+    if details is None:
+        details = format_lesson_details(lesson)
+    return f"• {lesson.start_time}–{lesson.end_time} — {lesson.subject.name}{details}"
+
+
+def format_today_schedule(lessons: Sequence[Lesson], target_date: date | None = None) -> str:
+    if target_date is None:
+        target_date = date.today()
+    today_str = target_date.strftime('%d.%m.%Y')
+
+    if not lessons:
+        return f"{today_str} — пар нет 🎉"
+
+    lines = [f"📅 Расписание на {today_str}:"]
+    lines.extend(format_lesson_line(lesson) for lesson in lessons)
 
     return "\n".join(lines)
 
 
+def format_day_off(target_date: date, note: str | None = None) -> str:
+    return f"{target_date.strftime('%d.%m.%Y')} — {note or 'неучебный день'}, пар нет 🎉"
+
+
 def format_user_week_schedule(lessons: Sequence[Lesson], week_type: str) -> str:
-    week_label = "Чётная неделя" if week_type == "even" else "Нечётная неделя"
+    week_label = get_week_label(week_type)
 
     if not lessons:
         return f"{week_label} — пар нет на этой неделе."
 
-    day_names = ["Понедельник", "Вторник", "Среда", "Четверг", "Пятница", "Суббота", "Воскресенье"]
+    blocks = [f"📚 {week_label}"]
 
-    schedule = f"📚 {week_label}\n\n"
+    for day, day_group in groupby(lessons, key=lambda l: l.day_of_week):
+        lines = [f"{DAY_NAMES[day]}:"]
+        lines.extend(format_lesson_line(lesson) for lesson in day_group)
+        blocks.append("\n".join(lines))
+
+    return "\n\n".join(blocks)
+
+
+def format_general_week_schedule(lessons: Sequence[Lesson], week_type: str) -> str:
+    week_label = get_week_label(week_type)
+
+    if not lessons:
+        return f"{week_label} — расписание не заполнено."
+
+    blocks = [f"📚 {week_label} (общее расписание)"]
 
     for day, day_group in groupby(lessons, key=lambda l: l.day_of_week):
-        schedule += f"{day_names[day]}:\n"
-        for lesson in day_group:
-            line = f"• {lesson.start_time}–{lesson.end_time} — {lesson.subject.name}"
+        lines = [f"{DAY_NAMES[day]}:"]
+        lines.extend(format_general_day_lines(day_group))
+        blocks.append("\n".join(lines))
 
-            if lesson.lesson_type:
-                line += f" ({lesson.lesson_type})"
+    return "\n\n".join(blocks)
 
-            if lesson.teacher:
-                line += f", {lesson.teacher}"
 
-            if lesson.classroom:
-                line += f", ауд. {lesson.classroom}"
+def format_general_day_lines(lessons: Iterable[Lesson]) -> list[str]:
+    """Пары одного дня всех подгрупп: одновременные пары в одной строке"""
+    lines = []
 
-            schedule += line + "\n"
-        schedule += "\n"
+    for start_time, time_group in groupby(lessons, key=lambda l: l.start_time):
+        time_lessons = list(time_group)
+        end_time = time_lessons[0].end_time
 
-    return schedule.rstrip("\n")
+        parts = []
+        for lesson in time_lessons:
+            part = lesson.subject.name
+            if lesson.subgroup is not None:
+                part += f" ({lesson.subgroup} подгруппа)"
 
+            parts.append(part + format_lesson_details(lesson))
 
-def format_general_week_schedule(lessons: Sequence[Lesson], week_type: str) -> str:
-    week_label = "Чётная неделя" if week_type == "even" else "Нечётная неделя"
+        lines.append(f"• {start_time}–{end_time} — {' | '.join(parts)}")
+
+    return lines
+
+
+def format_weekday_schedule(lessons: Sequence[Lesson], week_type: str, day_of_week: int, general: bool = False) -> str:
+    """Расписание на день недели без привязки к дате, например «Понедельник, чётная неделя»"""
+    title = f"{DAY_NAMES[day_of_week]}, {get_week_label(week_type).lower()}"
 
     if not lessons:
-        return f"{week_label} — расписание не заполнено."
+        return f"{title} — пар нет 🎉"
+
+    lines = [f"📅 {title}:"]
+    if general:
+        lines.extend(format_general_day_lines(lessons))
+    else:
+        lines.extend(format_lesson_line(lesson) for lesson in lessons)
+
+    return "\n".join(lines)
+
+
+def format_found_lesson_line(lesson: Lesson, extra: str | None) -> str:
+    """Строка пары в поиске: тип, группа и подгруппа, затем extra — то, чего нет в запросе"""
+    parts = []
+
+    if lesson.lesson_type:
+        parts.append(f" ({lesson.lesson_type})")
+
+    parts.append(f", {lesson.group.name}")
+    if lesson.subgroup is not None:
+        parts.append(f", {lesson.subgroup} подгруппа")
+
+    if extra:
+        parts.append(f", {extra}")
 
-    day_names = ["Понедельник", "Вторник", "Среда", "Четверг", "Пятница", "Суббота", "Воскресенье"]
+    return format_lesson_line(lesson, "".join(parts))
 
-    schedule = f"📚 {week_label} (общее расписание)\n\n"
+
+def format_teacher_lesson_line(lesson: Lesson) -> str:
+    return format_found_lesson_line(lesson, f"ауд. {lesson.classroom}" if lesson.classroom else None)
+
+
+def format_room_lesson_line(lesson: Lesson) -> str:
+    return format_found_lesson_line(lesson, lesson.teacher)
+
+
+def _format_week_blocks(title: str, lessons: Sequence[Lesson], format_line: Callable[[Lesson], str]) -> str:
+    blocks = [title]
 
     for day, day_group in groupby(lessons, key=lambda l: l.day_of_week):
-        schedule += f"{day_names[day]}:\n"
+        lines = [f"{DAY_NAMES[day]}:"]
+        lines.extend(format_line(lesson) for lesson in day_group)
+        blocks.append("\n".join(lines))
+
+    return "\n\n".join(blocks)
+
+
+def format_teacher_week_schedule(teacher: str, lessons: Sequence[Lesson], week_type: str) -> str:
+    """Пары преподавателя за неделю; lessons упорядочены по дню и времени"""
+    week_label = get_week_label(week_type).lower()
+
+    if not lessons:
+        return f"👤 {teacher}: {week_label} — пар нет."
+
+    return _format_week_blocks(f"👤 {teacher}, {week_label}", lessons, format_teacher_lesson_line)
+
+
+def format_room_week_schedule(room: str, lessons: Sequence[Lesson], week_type: str) -> str:
+    """Пары в аудитории за неделю; lessons упорядочены по дню и времени"""
+    week_label = get_week_label(week_type).lower()
+
+    if not lessons:
+        return f"🚪 {room}: {week_label} — свободна."
+
+    return _format_week_blocks(f"🚪 {room}, {week_label}", lessons, format_room_lesson_line)
+
+
+def format_occupancy(
+        title: str,
+        current: Lesson | None,
+        upcoming: tuple[date, Lesson] | None,
+        format_line: Callable[[Lesson], str],
+        today: date,
+) -> str:
+    """Что идёт сейчас и что будет следующим у преподавателя или в аудитории"""
+    lines = [title]
+
+    if current is not None:
+        lines.extend(["Сейчас:", format_line(current)])
+    else:
+        lines.append("Сейчас пары нет")
+
+    if upcoming is not None:
+        upcoming_date, lesson = upcoming
+        when = "сегодня" if upcoming_date == today else f"{DAY_SHORT_NAMES[upcoming_date.weekday()]} {upcoming_date.strftime('%d.%m')}"
+        lines.extend([f"Следующая — {when}:", format_line(lesson)])
+    else:
+        lines.append("Ближайших пар нет")
+
+    return "\n".join(lines)
+
+
+def format_lesson_reminder(lessons: Sequence[Lesson], minutes_before: int) -> str:
+    lines = [f"⏰ Через {minutes_before} мин:"]
+    lines.extend(format_lesson_line(lesson) for lesson in lessons)
+
+    return "\n".join(lines)
+
+
+def format_change_header(group: str, week_type: str, subgroup: int | None) -> str:
+    audience = get_week_label(week_type).lower()
+    if subgroup is not None:
+        audience += f", {subgroup} подгруппа"
+    return f"🔔 Изменения в расписании {group} ({audience}):"
+
+
+def format_lesson_slot(lesson: LessonRow) -> str:
+    return f"{DAY_SHORT_NAMES[lesson.day_of_week]} {lesson.start_time}"
+
+
+def format_lesson_added(lesson: LessonRow) -> str:
+    return f"• {format_lesson_slot(lesson)}: добавлена {lesson.subject}{format_lesson_details(lesson)}"
+
+
+def format_lesson_removed(lesson: LessonRow) -> str:
+    return f"• {format_lesson_slot(lesson)}: отменена {lesson.subject}"
+
+
+def format_lesson_moved(old: LessonRow, new: LessonRow) -> str:
+    return f"• {format_lesson_slot(old)} → {format_lesson_slot(new)}: {new.subject}"
 
-        day_lessons = list(day_group)
-        for start_time, time_group in groupby(day_lessons, key=lambda l: l.start_time):
-            time_lessons = list(time_group)
-            end_time = time_lessons[0].end_time
 
-            parts = []
-            for lesson in time_lessons:
-                part = lesson.subject.name
-                if lesson.subgroup is not None:
-                    part += f" ({lesson.subgroup} подгруппа)"
+def format_lesson_updated(old: LessonRow, new: LessonRow) -> str:
+    """Строка вида «Пн 11:45, Предмет: ауд. 2131а → 3304»"""
+    changes = []
 
-                if lesson.lesson_type:
-                    part += f" ({lesson.lesson_type})"
+    if old.classroom != new.classroom:
+        changes.append(f"ауд. {old.classroom or '—'} → {new.classroom or '—'}")
 
-                if lesson.teacher:
-                    part += f", {lesson.teacher}"
+    if old.teacher != new.teacher:
+        changes.append(f"преподаватель {old.teacher or '—'} → {new.teacher or '—'}")
 
-                if lesson.classroom:
-                    part += f", ауд. {lesson.classroom}"
+    if old.end_time != new.end_time:
+        changes.append(f"окончание {old.end_time} → {new.end_time}")
 
-                parts.append(part)
+    if old.lesson_type != new.lesson_type:
+        changes.append(f"{old.lesson_type or '—'} → {new.lesson_type or '—'}")
 
-            line = f"• {start_time}–{end_time} — {' | '.join(parts)}"
-            schedule += line + "\n"
+    return f"• {format_lesson_slot(new)}, {new.subject}: {'; '.join(changes)}"
 
-        schedule += "\n"
 
-    return schedule.rstrip("\n")
\ No newline at end of file
+def pack_messages(blocks: Iterable[str], limit: int = MESSAGE_LIMIT) -> list[str]:
+    """Склеивает блоки через пустую строку в как можно меньшее число сообщений не длиннее limit"""
+    messages: list[str] = []
+    for block in blocks:
+        if messages and len(messages[-1]) + 2 + len(block) <= limit:
+            messages[-1] += "\n\n" + block
+        else:
+            messages.append(block)
+    return messages
@@ -0,0 +1,366 @@
+"""
+Расписание в формате iCalendar (.ics) для Google Календаря и календаря телефона.
+
+Лента — пары группы (и подгруппы), развёрнутые по учебным дням: из
+академического календаря, а без него — на ICS_WEEKS недель вперёд по правилу
+чётности от 1 сентября. Каждое занятие — отдельное событие: чётность недель и
+каникулы не выражаются одним правилом повторения.
+
+Календари опрашивают ленту часто, поэтому лента собирается один раз на версию
+снимка расписания и хранится готовой: текст, сжатый gzip вариант и сильные
+ETag для каждого. Ответ на запрос — словарь и, при совпадении If-None-Match,
+304 без тела. База не нужна ни для ленты, ни для личной ссылки, если
+пользователь уже известен (см. FeedAudiences).
+
+Личная ссылка содержит id пользователя, подписанный HMAC с ICS_SECRET, и
+отдаёт ленту его текущей группы и подгруппы.
+"""
+import asyncio
+import base64
+import gzip
+import hashlib
+import hmac
+import logging
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import date, datetime, timedelta, timezone
+
+from aiohttp import web
+
+import config
+from models import Lesson, User
+from utils.academic_calendar import AcademicCalendar, CalendarDay, get_calendar
+from utils.single_flight import SingleFlight
+from utils.timetable import TimetableSnapshot, get_timetable
+
+logger = logging.getLogger(__name__)
+
+Audience = tuple[int, int | None]
+
+PRODID = "-//ScheduleBot//RU"
+
+
+def escape_text(value: str) -> str:
+    return value.replace("\\", "\\\\").replace(";", "\\;").replace(",", "\\,").replace("\n", "\\n")
+
+
+def fold_line(line: str) -> str:
+    """Строки длиннее 75 байт переносятся с пробелом в начале продолжения (RFC 5545)"""
+    encoded = line.encode("utf-8")
+    if len(encoded) <= 75:
+        return line
+
+    parts = []
+    current = b""
+    for char in line:
+        size = len(char.encode("utf-8"))
+        limit = 75 if not parts else 74
+        if len(current) + size > limit:
+            parts.append(current.decode("utf-8"))
+            current = b""
+        current += char.encode("utf-8")
+    parts.append(current.decode("utf-8"))
+    return "\r\n ".join(parts)
+
+
+_feed_days: tuple[AcademicCalendar, date, list[CalendarDay]] | None = None
+
+
+def feed_days(today: date) -> list[CalendarDay]:
+    """
+    Учебные дни ленты: описанный год календаря или ICS_WEEKS недель с начала текущей.
+    Список запоминается до смены дня или календаря: его спрашивает каждый запрос ленты.
+    """
+    global _feed_days
+
+    calendar = get_calendar()
+    if _feed_days is not None and _feed_days[0] is calendar and _feed_days[1] == today:
+        return _feed_days[2]
+
+    if calendar.configured:
+        days = calendar.study_days()
+    else:
+        days = calendar.days(today - timedelta(days=today.weekday()), config.ICS_WEEKS * 7)
+    _feed_days = (calendar, today, days)
+    return days
+
+
+def audience_week(snapshot: TimetableSnapshot, audience: Audience, week_type: str) -> tuple[Lesson, ...]:
+    group_id, subgroup = audience
+    if subgroup is None and snapshot.group_subgroups(group_id):
+        # Лента без подгруппы — все пары группы
+        return snapshot.general_week(group_id, week_type)
+    return snapshot.user_week(group_id, week_type, subgroup)
+
+
+def _event(lesson: Lesson, day: date, stamp: str) -> list[str]:
+    start = datetime.combine(day, datetime.min.time()) + timedelta(minutes=lesson.start_minutes)
+    end = datetime.combine(day, datetime.min.time()) + timedelta(minutes=lesson.end_minutes)
+    summary = lesson.subject.name
+    if lesson.lesson_type:
+        summary += f" ({lesson.lesson_type})"
+    if lesson.subgroup is not None:
+        summary += f", {lesson.subgroup} подгр."
+
+    lines = [
+        "BEGIN:VEVENT",
+        f"UID:{lesson.id}-{day:%Y%m%d}@schedulebot",
+        f"DTSTAMP:{stamp}",
+        # Время «плавающее» — местное время устройства, как и в самом расписании
+        f"DTSTART:{start:%Y%m%dT%H%M%S}",
+        f"DTEND:{end:%Y%m%dT%H%M%S}",
+        f"SUMMARY:{escape_text(summary)}",
+    ]
+    if lesson.classroom:
+        lines.append(f"LOCATION:{escape_text(lesson.classroom)}")
+    if lesson.teacher:
+        lines.append(f"DESCRIPTION:{escape_text(lesson.teacher)}")
+    lines.append("END:VEVENT")
+    return lines
+
+
+def build_calendar(snapshot: TimetableSnapshot, audience: Audience, days: list[CalendarDay], now: datetime) -> str:
+    group_id, subgroup = audience
+    name = snapshot.groups.get(group_id, "Расписание")
+    if subgroup is not None:
+        name += f", {subgroup} подгруппа"
+    stamp = f"{now.astimezone(timezone.utc):%Y%m%dT%H%M%SZ}"
+
+    lines = [
+        "BEGIN:VCALENDAR",
+        "VERSION:2.0",
+        f"PRODID:{PRODID}",
+        "CALSCALE:GREGORIAN",
+        "METHOD:PUBLISH",
+        f"X-WR-CALNAME:{escape_text(name)}",
+    ]
+    weeks = {week_type: audience_week(snapshot, audience, week_type) for week_type in ("even", "odd")}
+    for day in days:
+        for lesson in weeks[day.week_type]:
+            if lesson.day_of_week == day.date.weekday():
+                lines.extend(_event(lesson, day.date, stamp))
+    lines.append("END:VCALENDAR")
+    return "".join(fold_line(line) + "\r\n" for line in lines)
+
+
+def _etag(body: bytes, suffix: str = "") -> str:
+    return f'"{hashlib.sha256(body).hexdigest()[:32]}{suffix}"'
+
+
+@dataclass(frozen=True)
+class Feed:
+    body: bytes
+    gzipped: bytes
+    etag: str
+    gzip_etag: str
+
+    @classmethod
+    def build(cls, text: str) -> "Feed":
+        body = text.encode("utf-8")
+        # mtime=0: одинаковый текст сжимается в одинаковые байты
+        gzipped = gzip.compress(body, mtime=0)
+        return cls(body, gzipped, _etag(body), _etag(body, "-gz"))
+
+
+class FeedCache:
+    """Готовые ленты по (группа, подгруппа, начало окна); сбрасываются при смене версии снимка"""
+
+    def __init__(self):
+        self.version: int | None = None
+        self.builds = 0
+        self.hits = 0
+        self._feeds: dict[tuple, Feed] = {}
+
+    def __len__(self) -> int:
+        return len(self._feeds)
+
+    async def get(self, audience: Audience, today: date | None = None) -> Feed:
+        if today is None:
+            today = date.today()
+        snapshot = get_timetable()
+        if snapshot.version != self.version:
+            self._feeds = {}
+            self.version = snapshot.version
+
+        days = feed_days(today)
+        key = (*audience, days[0].date if days else None)
+        feed = self._feeds.get(key)
+        if feed is not None:
+            self.hits += 1
+            return feed
+
+        async def build() -> Feed:
+            self.builds += 1
+            # Большая лента собирается и сжимается в потоке, не задерживая обработку обновлений
+            return await asyncio.to_thread(
+                lambda: Feed.build(build_calendar(snapshot, audience, days, datetime.now(timezone.utc)))
+            )
+
+        # Календари, пришедшие за лентой во время сборки, ждут ту же сборку
+        feed = await feed_builds.run((snapshot.version, key), build)
+        if snapshot.version == self.version:
+            self._feeds[key] = feed
+        return feed
+
+
+feed_builds = SingleFlight("ics_build")
+feed_cache = FeedCache()
+
+
+def make_token(user_id: int) -> str:
+    signature = hmac.new(config.ICS_SECRET.encode(), str(user_id).encode(), hashlib.sha256).digest()
+    return f"{user_id}-{base64.urlsafe_b64encode(signature[:15]).decode()}"
+
+
+def read_token(token: str) -> int | None:
+    """id пользователя из личной ссылки или None, если подпись не сходится"""
+    user_id, _, _ = token.partition("-")
+    if not config.ICS_SECRET or not user_id.isdigit():
+        return None
+    return int(user_id) if hmac.compare_digest(make_token(int(user_id)), token) else None
+
+
+class FeedAudiences:
+    """
+    Группа и подгруппа владельцев личных ссылок (LRU с TTL, как UserCache).
+    Пользователь загружается из базы при первом запросе ленты; настройки,
+    сохранённые в этом процессе, обновляет save_user_settings, а сохранённые
+    другими экземплярами бота видны после истечения ttl.
+    """
+
+    def __init__(self, max_size: int = 10000, ttl: float = 300):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._audiences: OrderedDict[int, tuple[float, Audience | None]] = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._audiences)
+
+    async def get(self, user_id: int) -> Audience | None:
+        item = self._audiences.get(user_id)
+        if item is not None and time.monotonic() - item[0] <= self.ttl:
+            self._audiences.move_to_end(user_id)
+            return item[1]
+
+        row = await feed_owner_lookups.run(
+            user_id, lambda: User.filter(id=user_id).first().values_list("group_id", "subgroup"))
+        audience = tuple(row) if row and row[0] is not None else None
+        self._put(user_id, audience)
+        return audience
+
+    def _put(self, user_id: int, audience: Audience | None) -> None:
+        self._audiences[user_id] = (time.monotonic(), audience)
+        self._audiences.move_to_end(user_id)
+        while len(self._audiences) > self.max_size:
+            self._audiences.popitem(last=False)
+
+    def update(self, user: User) -> None:
+        if user.id in self._audiences:
+            self._put(user.id, (user.group_id, user.subgroup) if user.group_id is not None else None)
+
+
+feed_owner_lookups = SingleFlight("ics_owner_lookup")
+feed_audiences = FeedAudiences(ttl=config.ICS_OWNER_TTL)
+
+
+def feed_url(audience: Audience) -> str:
+    group_id, subgroup = audience
+    return f"{config.ICS_BASE_URL.rstrip('/')}/calendar/{group_id}/{subgroup if subgroup is not None else 'all'}.ics"
+
+
+def personal_feed_url(user_id: int) -> str:
+    return f"{config.ICS_BASE_URL.rstrip('/')}/calendar/me/{make_token(user_id)}.ics"
+
+
+def _matches(if_none_match: str, etag: str) -> bool:
+    tags = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+    return "*" in tags or etag in tags
+
+
+def _quality(params: str) -> float:
+    for param in params.split(";"):
+        name, _, value = param.partition("=")
+        if name.strip().lower() == "q":
+            try:
+                return float(value)
+            except ValueError:
+                return 0.0
+    return 1.0
+
+
+def accepts_gzip(accept_encoding: str) -> bool:
+    """Разрешает ли Accept-Encoding gzip с учётом q-значений: «gzip;q=0» — запрет"""
+    qualities = {}
+    for item in accept_encoding.split(","):
+        coding, _, params = item.partition(";")
+        if coding.strip():
+            qualities[coding.strip().lower()] = _quality(params)
+    return qualities.get("gzip", qualities.get("x-gzip", qualities.get("*", 0.0))) > 0
+
+
+def feed_response(request: web.Request, feed: Feed) -> web.Response:
+    use_gzip = accepts_gzip(request.headers.get("Accept-Encoding", ""))
+    etag = feed.gzip_etag if use_gzip else feed.etag
+    headers = {
+        "ETag": etag,
+        "Vary": "Accept-Encoding",
+        "Cache-Control": f"public, max-age={config.ICS_MAX_AGE}",
+    }
+    if _matches(request.headers.get("If-None-Match", ""), etag):
+        return web.Response(status=304, headers=headers)
+
+    if use_gzip:
+        headers["Content-Encoding"] = "gzip"
+    return web.Response(
+        body=feed.gzipped if use_gzip else feed.body,
+        content_type="text/calendar",
+        charset="utf-8",
+        headers=headers,
+    )
+
+
+async def handle_group_feed(request: web.Request) -> web.Response:
+    snapshot = get_timetable()
+    group_id = request.match_info["group_id"]
+    subgroup = request.match_info["subgroup"]
+    if not group_id.isdigit() or int(group_id) not in snapshot.groups:
+        raise web.HTTPNotFound()
+    if subgroup != "all" and (not subgroup.isdigit() or int(subgroup) not in snapshot.group_subgroups(int(group_id))):
+        raise web.HTTPNotFound()
+
+    return feed_response(request, await feed_cache.get((int(group_id), None if subgroup == "all" else int(subgroup))))
+
+
+async def handle_personal_feed(request: web.Request) -> web.Response:
+    user_id = read_token(request.match_info["token"])
+    if user_id is None:
+        raise web.HTTPNotFound()
+    audience = await feed_audiences.get(user_id)
+    if audience is None:
+        raise web.HTTPNotFound()
+    return feed_response(request, await feed_cache.get(audience))
+
+
+class FeedServer:
+    """HTTP-сервер с лентами .ics"""
+
+    def __init__(self):
+        self._runner: web.AppRunner | None = None
+
+    async def start(self, host: str, port: int) -> None:
+        app = web.Application()
+        app.router.add_get("/calendar/me/{token}.ics", handle_personal_feed)
+        app.router.add_get("/calendar/{group_id}/{subgroup}.ics", handle_group_feed)
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        await web.TCPSite(self._runner, host, port).start()
+        logger.info("Ленты календаря доступны на http://%s:%s/calendar/", host, port)
+
+    async def stop(self) -> None:
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+
+
+feed_server = FeedServer()
@@ -0,0 +1,274 @@
+"""
+Инлайн-режим: расписание по запросу «@bot пн чёт 1», «сегодня» или фамилии преподавателя.
+
+Запрос разбирается в InlineRequest: дата (сегодня, завтра) или день недели, тип
+недели, подгруппа, группа, а остаток ищется среди преподавателей, затем аудиторий
+(utils.search). Чего нет в запросе, берётся из настроек пользователя — такой
+ответ личный (is_personal).
+Разобранный запрос и есть нормализованный ключ: «пн чёт 1» и «Понедельник чётная 1»
+совпадают, поэтому серия одинаковых запросов из чата собирается один раз на
+версию снимка расписания. Тексты берутся из кэша готовых текстов (utils.render_cache).
+"""
+from dataclasses import dataclass, replace
+from datetime import date, datetime, time, timedelta
+from typing import Callable, Hashable
+
+from aiogram.types import InlineQueryResultArticle, InputTextMessageContent
+
+import config
+from models import User
+from utils.academic_calendar import get_calendar
+from utils.formatters import (
+    DAY_NAMES,
+    DAY_SHORT_NAMES,
+    format_room_week_schedule,
+    format_teacher_week_schedule,
+    get_week_label,
+)
+from utils.render_cache import (
+    render_day_schedule,
+    render_general_week_schedule,
+    render_general_weekday_schedule,
+    render_user_week_schedule,
+    render_weekday_schedule,
+)
+from utils.search import get_search_index
+from utils.timetable import TimetableSnapshot, get_timetable
+
+# Telegram принимает не больше 50 результатов на запрос
+MAX_RESULTS = 50
+
+DAY_ALIASES = {
+    **{name.casefold(): day for day, name in enumerate(DAY_NAMES)},
+    **{name.casefold(): day for day, name in enumerate(DAY_SHORT_NAMES)},
+}
+DATE_ALIASES = {"сегодня": 0, "завтра": 1}
+WEEK_ALIASES = {
+    "чет": "even", "четн": "even", "четная": "even",
+    "нечет": "odd", "нечетн": "odd", "нечетная": "odd",
+}
+
+
+def normalize_query(text: str) -> list[str]:
+    """Слова запроса без регистра и «ё»"""
+    return text.casefold().replace("ё", "е").replace(",", " ").split()
+
+
+@dataclass(frozen=True)
+class InlineRequest:
+    group_id: int | None = None
+    subgroup: int | None = None
+    week_type: str | None = None
+    day_of_week: int | None = None
+    days_ahead: int | None = None
+    # Часть имени преподавателя или код аудитории
+    search: str = ""
+
+
+def parse_inline_query(text: str, snapshot: TimetableSnapshot) -> InlineRequest:
+    values = {}
+    rest = []
+    for word in normalize_query(text):
+        if word in DATE_ALIASES:
+            values["days_ahead"] = DATE_ALIASES[word]
+        elif word in DAY_ALIASES:
+            values["day_of_week"] = DAY_ALIASES[word]
+        elif word in WEEK_ALIASES:
+            values["week_type"] = WEEK_ALIASES[word]
+        elif len(word) == 1 and word.isdigit():
+            values["subgroup"] = int(word)
+        else:
+            rest.append(word)
+
+    # Название группы может состоять из нескольких слов («ивт 21») или стоять рядом с фамилией
+    group_id = snapshot.find_group(" ".join(rest)) if rest else None
+    if group_id is not None:
+        rest = []
+    else:
+        for word in rest:
+            group_id = snapshot.find_group(word)
+            if group_id is not None:
+                rest.remove(word)
+                break
+
+    return InlineRequest(group_id=group_id, search=" ".join(rest), **values)
+
+
+def personalize(request: InlineRequest, user: User) -> tuple[InlineRequest, bool]:
+    """
+    Дополняет запрос группой и подгруппой пользователя; True, если ответ зависит
+    от настроек пользователя (в том числе пустой ответ тому, кто не выбрал группу)
+    """
+    if request.search or request.group_id not in (None, user.group_id):
+        return request, False
+    if request.group_id is not None and request.subgroup is not None:
+        return request, False
+
+    return replace(
+        request,
+        group_id=user.group_id,
+        subgroup=request.subgroup if request.subgroup is not None else user.subgroup,
+    ), True
+
+
+@dataclass(frozen=True)
+class InlineAnswer:
+    results: tuple[InlineQueryResultArticle, ...]
+    is_personal: bool
+    # Ответ привязан к сегодняшней дате, и кэшировать его дольше полуночи нельзя
+    dated: bool
+
+    def cache_time(self, now: datetime) -> int:
+        if not self.dated:
+            return config.INLINE_CACHE_TIME
+        midnight = datetime.combine(now.date() + timedelta(days=1), time.min)
+        return max(0, min(config.INLINE_CACHE_TIME, int((midnight - now).total_seconds())))
+
+
+class InlineAnswerCache:
+    """Готовые ответы по нормализованному запросу; сбрасываются при смене версии снимка"""
+
+    def __init__(self, max_size: int = 1024):
+        self.max_size = max_size
+        self.version: int | None = None
+        self.hits = 0
+        self.misses = 0
+        self._items: dict[Hashable, InlineAnswer] = {}
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def get_or_build(self, key: Hashable, version: int, build: Callable[[], InlineAnswer]) -> InlineAnswer:
+        if version != self.version:
+            self._items = {}
+            self.version = version
+
+        answer = self._items.get(key)
+        if answer is not None:
+            self.hits += 1
+            return answer
+
+        self.misses += 1
+        answer = build()
+        if len(self._items) >= self.max_size:
+            self._items = {}
+        self._items[key] = answer
+        return answer
+
+
+inline_cache = InlineAnswerCache()
+
+
+def _week_types(request: InlineRequest, today: date) -> list[str]:
+    """Тип недели из запроса или оба, начиная с текущего"""
+    if request.week_type is not None:
+        return [request.week_type]
+    current = get_calendar().week_type(today)
+    return [current, "odd" if current == "even" else "even"]
+
+
+def _article(number: int, title: str, description: str, text: str) -> InlineQueryResultArticle:
+    return InlineQueryResultArticle(
+        id=str(number),
+        title=title,
+        description=description,
+        input_message_content=InputTextMessageContent(message_text=text),
+    )
+
+
+def _audience(snapshot: TimetableSnapshot, request: InlineRequest) -> str:
+    audience = snapshot.groups.get(request.group_id, "")
+    if request.subgroup in snapshot.group_subgroups(request.group_id):
+        audience += f", {request.subgroup} подгруппа"
+    return audience
+
+
+def _group_views(request: InlineRequest, snapshot: TimetableSnapshot, today: date) -> list[tuple[str, str]]:
+    """(заголовок, текст) видов расписания группы по запросу"""
+    group_id, subgroup = request.group_id, request.subgroup
+    # Без подгруппы показываем общее расписание, а не только общие пары
+    general = subgroup not in snapshot.group_subgroups(group_id) and bool(snapshot.group_subgroups(group_id))
+
+    def day_view(title: str, target_date: date) -> tuple[str, str]:
+        calendar_day = get_calendar().day(target_date)
+        if general and calendar_day.study:
+            return title, render_general_weekday_schedule(group_id, calendar_day.week_type, target_date.weekday())
+        return title, render_day_schedule(group_id, subgroup, target_date)
+
+    def weekday_view(week_type: str, weekday: int) -> tuple[str, str]:
+        title = f"{DAY_NAMES[weekday]}, {get_week_label(week_type).lower()}"
+        if general:
+            return title, render_general_weekday_schedule(group_id, week_type, weekday)
+        return title, render_weekday_schedule(group_id, subgroup, week_type, weekday)
+
+    def week_view(week_type: str) -> tuple[str, str]:
+        if general:
+            return get_week_label(week_type), render_general_week_schedule(group_id, week_type)
+        return get_week_label(week_type), render_user_week_schedule(group_id, subgroup, week_type)
+
+    if request.days_ahead is not None:
+        target_date = today + timedelta(days=request.days_ahead)
+        title = "Сегодня" if request.days_ahead == 0 else "Завтра"
+        return [day_view(f"{title}, {target_date.strftime('%d.%m')}", target_date)]
+
+    if request.day_of_week is not None:
+        return [weekday_view(week_type, request.day_of_week) for week_type in _week_types(request, today)]
+
+    if request.week_type is not None:
+        return [week_view(request.week_type)]
+
+    tomorrow = today + timedelta(days=1)
+    return [
+        day_view(f"Сегодня, {today.strftime('%d.%m')}", today),
+        day_view(f"Завтра, {tomorrow.strftime('%d.%m')}", tomorrow),
+        *(week_view(week_type) for week_type in _week_types(request, today)),
+    ]
+
+
+def _search_views(request: InlineRequest, today: date) -> list[tuple[str, str, str]]:
+    """(преподаватель или аудитория, тип недели, текст) для найденных по запросу"""
+    index = get_search_index()
+    formatter = format_teacher_week_schedule
+    matches = index.find_teachers(request.search)
+    if not matches:
+        formatter = format_room_week_schedule
+        matches = index.find_rooms(request.search)
+
+    return [
+        (match.name, get_week_label(week_type),
+         formatter(match.name, match.week(week_type, request.day_of_week, request.group_id), week_type))
+        for match in matches
+        for week_type in _week_types(request, today)
+    ]
+
+
+def build_inline_answer(request: InlineRequest, is_personal: bool, snapshot: TimetableSnapshot, today: date) -> InlineAnswer:
+    if request.search:
+        views = _search_views(request, today)
+    elif request.group_id is not None:
+        audience = _audience(snapshot, request)
+        views = [(title, audience, text) for title, text in _group_views(request, snapshot, today)]
+    else:
+        views = []
+
+    results = tuple(
+        _article(number, title, description, text)
+        for number, (title, description, text) in enumerate(views[:MAX_RESULTS])
+    )
+    dated = request.days_ahead is not None or (not request.search and request.day_of_week is None
+                                               and request.week_type is None)
+    return InlineAnswer(results, is_personal, dated)
+
+
+def answer_inline_query(text: str, user: User, now: datetime | None = None) -> InlineAnswer:
+    """Ответ на инлайн-запрос из кэша или собранный заново"""
+    if now is None:
+        now = datetime.now()
+    snapshot = get_timetable()
+    request, is_personal = personalize(parse_inline_query(text, snapshot), user)
+    today = now.date()
+    return inline_cache.get_or_build(
+        (request, is_personal, today),
+        snapshot.version,
+        lambda: build_inline_answer(request, is_personal, snapshot, today),
+    )
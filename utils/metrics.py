@@ -0,0 +1,324 @@
+"""
+Метрики производительности в формате Prometheus.
+
+Гистограммы и счётчики хранятся в памяти процесса и отдаются текстом по
+локальному HTTP-адресу /metrics (METRICS_PORT); там же /ready — готовность бота.
+Пакет prometheus_client не нужен: формат выдачи простой, а меток у наших
+метрик немного.
+
+Всё, что происходит за время обработки одного обновления — запросы к базе,
+вызовы Bot API, — складывается ещё и в UpdateStats текущего обновления
+(contextvar), чтобы медленное обновление можно было разложить по частям.
+"""
+import logging
+import time
+from bisect import bisect_left
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from functools import wraps
+
+from aiohttp import web
+from aiogram.client.session.middlewares.base import BaseRequestMiddleware
+from tortoise import connections
+
+import config
+
+logger = logging.getLogger(__name__)
+
+# Границы корзин, с: от миллисекунды до десяти секунд
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+
+# Методы клиента Tortoise, через которые проходит любой SQL-запрос
+DB_CLIENT_METHODS = ("execute_query", "execute_query_dict", "execute_insert", "execute_many", "execute_script")
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(labels: dict[str, str]) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(str(value))}"' for name, value in labels.items()) + "}"
+
+
+def _format_value(value: float) -> str:
+    return str(int(value)) if float(value).is_integer() else repr(value)
+
+
+class Counter:
+    def __init__(self, name: str, documentation: str, labels: tuple[str, ...] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labels = labels
+        self._values: dict[tuple[str, ...], float] = {}
+
+    def inc(self, *label_values: str, amount: float = 1.0) -> None:
+        self._values[label_values] = self._values.get(label_values, 0.0) + amount
+
+    def value(self, *label_values: str) -> float:
+        return self._values.get(label_values, 0.0)
+
+    def expose(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} counter"]
+        for label_values, value in sorted(self._values.items()):
+            lines.append(f"{self.name}{_format_labels(dict(zip(self.labels, label_values)))} {_format_value(value)}")
+        return lines
+
+
+class Gauge:
+    def __init__(self, name: str, documentation: str, labels: tuple[str, ...] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labels = labels
+        self._values: dict[tuple[str, ...], float] = {}
+
+    def set(self, value: float, *label_values: str) -> None:
+        self._values[label_values] = value
+
+    def value(self, *label_values: str) -> float:
+        return self._values.get(label_values, 0.0)
+
+    def expose(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} gauge"]
+        for label_values, value in sorted(self._values.items()):
+            lines.append(f"{self.name}{_format_labels(dict(zip(self.labels, label_values)))} {_format_value(value)}")
+        return lines
+
+
+@dataclass
+class _Series:
+    buckets: list[int]
+    count: int = 0
+    sum: float = 0.0
+
+
+class Histogram:
+    def __init__(self, name: str, documentation: str, labels: tuple[str, ...] = (),
+                 buckets: tuple[float, ...] = LATENCY_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labels = labels
+        self.buckets = tuple(sorted(buckets))
+        self._series: dict[tuple[str, ...], _Series] = {}
+
+    def observe(self, value: float, *label_values: str) -> None:
+        series = self._series.get(label_values)
+        if series is None:
+            series = self._series[label_values] = _Series([0] * len(self.buckets))
+        # Корзины хранятся без накопления; накопленные суммы считаются при выдаче
+        index = bisect_left(self.buckets, value)
+        if index < len(self.buckets):
+            series.buckets[index] += 1
+        series.count += 1
+        series.sum += value
+
+    def count(self, *label_values: str) -> int:
+        series = self._series.get(label_values)
+        return series.count if series else 0
+
+    def expose(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        for label_values, series in sorted(self._series.items()):
+            labels = dict(zip(self.labels, label_values))
+            cumulative = 0
+            for bound, hits in zip(self.buckets, series.buckets):
+                cumulative += hits
+                lines.append(f"{self.name}_bucket{_format_labels({**labels, 'le': _format_value(bound)})} {cumulative}")
+            lines.append(f"{self.name}_bucket{_format_labels({**labels, 'le': '+Inf'})} {series.count}")
+            lines.append(f"{self.name}_sum{_format_labels(labels)} {_format_value(series.sum)}")
+            lines.append(f"{self.name}_count{_format_labels(labels)} {series.count}")
+        return lines
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._metrics: list[Counter | Gauge | Histogram] = []
+
+    def counter(self, name: str, documentation: str, labels: tuple[str, ...] = ()) -> Counter:
+        metric = Counter(name, documentation, labels)
+        self._metrics.append(metric)
+        return metric
+
+    def gauge(self, name: str, documentation: str, labels: tuple[str, ...] = ()) -> Gauge:
+        metric = Gauge(name, documentation, labels)
+        self._metrics.append(metric)
+        return metric
+
+    def histogram(self, name: str, documentation: str, labels: tuple[str, ...] = (),
+                  buckets: tuple[float, ...] = LATENCY_BUCKETS) -> Histogram:
+        metric = Histogram(name, documentation, labels, buckets)
+        self._metrics.append(metric)
+        return metric
+
+    def expose(self) -> str:
+        return "\n".join(line for metric in self._metrics for line in metric.expose()) + "\n"
+
+
+registry = MetricsRegistry()
+
+update_duration = registry.histogram(
+    "bot_update_duration_seconds", "Время обработки обновления по обработчикам", ("handler",))
+update_db_queries = registry.histogram(
+    "bot_update_db_queries", "Запросов к базе за одно обновление", ("handler",), COUNT_BUCKETS)
+update_db_duration = registry.histogram(
+    "bot_update_db_seconds", "Суммарное время запросов к базе за одно обновление", ("handler",))
+slow_updates = registry.counter(
+    "bot_slow_updates_total", "Обновления дольше METRICS_SLOW_UPDATE_MS", ("handler",))
+db_query_duration = registry.histogram(
+    "bot_db_query_duration_seconds", "Время одного запроса к базе", ("method",))
+api_request_duration = registry.histogram(
+    "bot_api_request_duration_seconds", "Время вызова Bot API", ("method",))
+api_request_errors = registry.counter(
+    "bot_api_request_errors_total", "Вызовы Bot API, завершившиеся ошибкой", ("method",))
+fsm_transitions = registry.counter(
+    "bot_fsm_transitions_total", "Переходы между состояниями FSM", ("from_state", "to_state"))
+updates_waiting = registry.gauge(
+    "bot_updates_waiting", "Обновления, ожидающие своей очереди или свободного слота")
+updates_running = registry.gauge(
+    "bot_updates_running", "Обновления в обработке")
+update_wait_duration = registry.histogram(
+    "bot_update_wait_seconds", "Ожидание обновления в планировщике до начала обработки")
+updates_rejected = registry.counter(
+    "bot_updates_rejected_total", "Обновления webhook, отклонённые при переполненной очереди")
+ready = registry.gauge(
+    "bot_ready", "1, когда запуск завершён и бот принимает обновления")
+startup_phase_duration = registry.gauge(
+    "bot_startup_phase_seconds", "Длительность фаз последнего запуска", ("phase",))
+
+
+@dataclass
+class UpdateStats:
+    """Из чего сложилось время обработки одного обновления"""
+    handler: str
+    db_queries: int = 0
+    db_seconds: float = 0.0
+    api_calls: list[tuple[str, float]] = field(default_factory=list)
+
+    @property
+    def api_seconds(self) -> float:
+        return sum(seconds for _, seconds in self.api_calls)
+
+
+current_update: ContextVar[UpdateStats | None] = ContextVar("current_update", default=None)
+
+
+def _timed_query(method_name: str, method):
+    @wraps(method)
+    async def wrapper(*args, **kwargs):
+        started = time.perf_counter()
+        try:
+            return await method(*args, **kwargs)
+        finally:
+            elapsed = time.perf_counter() - started
+            db_query_duration.observe(elapsed, method_name)
+            stats = current_update.get()
+            if stats is not None:
+                stats.db_queries += 1
+                stats.db_seconds += elapsed
+
+    wrapper.__metrics_timed__ = True
+    return wrapper
+
+
+def instrument_db() -> None:
+    """
+    Засекает каждый запрос Tortoise. Обёртываются методы классов подключённых
+    клиентов и их подклассов (транзакций); метод, переопределённый в подклассе,
+    обёртывается отдельно, унаследованный — уже обёрнут у родителя.
+    """
+    classes = set()
+    pending = [type(client) for client in connections.all()]
+    while pending:
+        cls = pending.pop()
+        if cls not in classes:
+            classes.add(cls)
+            pending.extend(cls.__subclasses__())
+
+    for cls in classes:
+        for name in DB_CLIENT_METHODS:
+            method = cls.__dict__.get(name)
+            if method is not None and not getattr(method, "__metrics_timed__", False):
+                setattr(cls, name, _timed_query(name, method))
+
+
+class ApiMetricsMiddleware(BaseRequestMiddleware):
+    """Время каждого вызова Bot API (подключается к сессии бота)"""
+
+    async def __call__(self, make_request, bot, method):
+        name = type(method).__name__
+        started = time.perf_counter()
+        try:
+            return await make_request(bot, method)
+        except Exception:
+            api_request_errors.inc(name)
+            raise
+        finally:
+            elapsed = time.perf_counter() - started
+            api_request_duration.observe(elapsed, name)
+            stats = current_update.get()
+            if stats is not None:
+                stats.api_calls.append((name, elapsed))
+
+
+class MetricsServer:
+    """Локальный HTTP-сервер с /metrics для Prometheus"""
+
+    def __init__(self):
+        self._runner: web.AppRunner | None = None
+
+    @staticmethod
+    async def _handle(_: web.Request) -> web.Response:
+        return web.Response(text=registry.expose(), content_type="text/plain", charset="utf-8",
+                            headers={"X-Content-Type-Options": "nosniff"})
+
+    @staticmethod
+    async def _handle_ready(_: web.Request) -> web.Response:
+        """Проверка готовности для оркестратора: 200 после прогрева, 503 до него и при остановке"""
+        if ready.value():
+            return web.Response(text="ready")
+        return web.Response(status=503, text="starting")
+
+    async def start(self, host: str, port: int) -> None:
+        app = web.Application()
+        app.router.add_get("/metrics", self._handle)
+        app.router.add_get("/ready", self._handle_ready)
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        await web.TCPSite(self._runner, host, port).start()
+        logger.info("Метрики доступны на http://%s:%s/metrics", host, port)
+
+    async def stop(self) -> None:
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+
+
+metrics_server = MetricsServer()
+
+
+def log_slow_update(stats: UpdateStats, total: float) -> None:
+    slow_updates.inc(stats.handler)
+    api = ", ".join(f"{name} {seconds * 1000:.0f} мс" for name, seconds in stats.api_calls) or "нет"
+    logger.warning(
+        "Медленное обновление (%s): всего %.0f мс, база %.0f мс (%s запросов), Bot API %.0f мс (%s), "
+        "остальное %.0f мс",
+        stats.handler, total * 1000, stats.db_seconds * 1000, stats.db_queries, stats.api_seconds * 1000, api,
+        max(0.0, total - stats.db_seconds - stats.api_seconds) * 1000,
+        extra={"update_metrics": {
+            "handler": stats.handler,
+            "total_ms": round(total * 1000, 1),
+            "db_queries": stats.db_queries,
+            "db_ms": round(stats.db_seconds * 1000, 1),
+            "api_calls": [{"method": name, "ms": round(seconds * 1000, 1)} for name, seconds in stats.api_calls],
+        }},
+    )
+
+
+def record_update(stats: UpdateStats, total: float) -> None:
+    update_duration.observe(total, stats.handler)
+    update_db_queries.observe(stats.db_queries, stats.handler)
+    update_db_duration.observe(stats.db_seconds, stats.handler)
+    if config.METRICS_SLOW_UPDATE_MS and total * 1000 >= config.METRICS_SLOW_UPDATE_MS:
+        log_slow_update(stats, total)
@@ -0,0 +1,181 @@
+"""
+Уведомления об изменениях расписания.
+
+Изменения из ChangeSet раскладываются по аудиториям (группа, тип недели,
+подгруппа). Пара без подгруппы видна всем подгруппам группы — так же, как в
+выборке расписания пользователя, — поэтому её изменение попадает в аудитории
+каждой подгруппы.
+Текст рендерится один раз на аудиторию, а получатели выбираются одним
+запросом на аудиторию, а не на пользователя.
+
+Изменение видят все экземпляры бота, поэтому перед рассылкой экземпляр
+записывает отпечаток нового расписания в timetable_notifications; если запись
+уже есть, уведомления разослал кто-то другой.
+"""
+import asyncio
+import logging
+from collections import defaultdict
+
+from aiogram import Bot
+from tortoise.exceptions import IntegrityError
+
+from models import TimetableNotification, User
+from utils.broadcast import SENT, send_many
+from utils.formatters import (
+    format_change_header,
+    format_lesson_added,
+    format_lesson_moved,
+    format_lesson_removed,
+    format_lesson_updated,
+)
+from utils.common import time_to_minutes
+from utils.schedule_import import LessonRow
+from utils.schedule_sync import ChangeSet
+from utils.timetable import TimetableSnapshot, on_timetable_change
+
+logger = logging.getLogger(__name__)
+
+Audience = tuple[str, str, int | None]
+
+
+def _sort_key(row: LessonRow) -> tuple[int, int]:
+    return row.day_of_week, time_to_minutes(row.start_time)
+
+
+def _pair_moves(changes: ChangeSet) -> tuple[list[tuple[LessonRow, LessonRow]], list[LessonRow], list[LessonRow]]:
+    """Находит переносы: пара удалена и добавлена в той же группе с тем же предметом, неделей и подгруппой"""
+    def move_key(row: LessonRow):
+        return row.group, row.week_type, row.subgroup, row.subject, row.lesson_type
+
+    removed = defaultdict(list)
+    for row in changes.removed:
+        removed[move_key(row)].append(row)
+    added = defaultdict(list)
+    for row in changes.added:
+        added[move_key(row)].append(row)
+
+    moves = []
+    for key, rows in added.items():
+        if len(rows) == 1 and len(removed.get(key, ())) == 1:
+            moves.append((removed.pop(key)[0], rows[0]))
+
+    moved = {id(new) for _, new in moves}
+    return (
+        moves,
+        [row for row in changes.added if id(row) not in moved],
+        [row for rows in removed.values() for row in rows],
+    )
+
+
+def render_change_messages(changes: ChangeSet, subgroups: dict[str, set[int | None]]) -> dict[Audience, str]:
+    """
+    Текст уведомления для каждой затронутой аудитории (группа, тип недели, подгруппа).
+    subgroups — подгруппы пользователей каждой группы (None — подгруппа не выбрана).
+    """
+    lines: dict[Audience, list[tuple[tuple[int, int], str]]] = defaultdict(list)
+
+    def add(row: LessonRow, line: str) -> None:
+        # Пары без типа недели не попадают ни в одно недельное расписание
+        if row.week_type is None:
+            return
+        group_subgroups = subgroups.get(row.group, set())
+        for subgroup in (group_subgroups if row.subgroup is None else {row.subgroup} & group_subgroups):
+            lines[(row.group, row.week_type, subgroup)].append((_sort_key(row), line))
+
+    moves, added, removed = _pair_moves(changes)
+    for old, new in changes.updated:
+        add(new, format_lesson_updated(old, new))
+    for old, new in moves:
+        add(new, format_lesson_moved(old, new))
+    for row in added:
+        add(row, format_lesson_added(row))
+    for row in removed:
+        add(row, format_lesson_removed(row))
+
+    return {
+        audience: "\n".join([format_change_header(*audience), *(line for _, line in sorted(audience_lines))])
+        for audience, audience_lines in sorted(lines.items(), key=lambda item: (item[0][:2], item[0][2] or 0))
+    }
+
+
+class ChangeNotifier:
+    def __init__(self):
+        self.notifications = 0
+        self.sent = 0
+        self._bot: Bot | None = None
+        self._tasks: set[asyncio.Task] = set()
+
+    async def claim(self, fingerprint: tuple) -> bool:
+        """Отмечает изменение разосланным; False — его уже разослал другой экземпляр"""
+        try:
+            await TimetableNotification.create(fingerprint=":".join(map(str, fingerprint)))
+        except IntegrityError:
+            return False
+        return True
+
+    async def notify(self, changes: ChangeSet, group_ids: dict[str, int],
+                     fingerprint: tuple | None = None) -> dict[Audience, int]:
+        """
+        Рассылает уведомления затронутым аудиториям; возвращает число доставленных по каждой.
+        group_ids — id групп по названиям, fingerprint — отпечаток нового расписания.
+        """
+        if fingerprint is not None and not await self.claim(fingerprint):
+            logger.info("Уведомления об изменении %s уже разосланы другим экземпляром", fingerprint)
+            return {}
+
+        affected = {group_ids[name]: name for name in changes.affected_groups if name in group_ids}
+        subgroups: dict[str, set[int | None]] = defaultdict(set)
+        for group_id, subgroup in await User.filter(group_id__in=list(affected)).distinct() \
+                .values_list("group_id", "subgroup"):
+            subgroups[affected[group_id]].add(subgroup)
+        messages = render_change_messages(changes, subgroups)
+
+        delivered = {}
+        for (group, week_type, subgroup), text in messages.items():
+            users = User.filter(group_id=group_ids[group])
+            users = users.filter(subgroup=subgroup) if subgroup is not None else users.filter(subgroup__isnull=True)
+            user_ids = await users.values_list("id", flat=True)
+            statuses = await send_many(self._bot, user_ids, text)
+            delivered[(group, week_type, subgroup)] = sum(status == SENT for status in statuses.values())
+
+        self.notifications += 1
+        self.sent += sum(delivered.values())
+        logger.info("Уведомления об изменениях расписания: %s", delivered)
+        return delivered
+
+    def schedule(self, changes: ChangeSet, group_ids: dict[str, int], fingerprint: tuple | None = None) -> None:
+        """Запускает рассылку в фоне, не задерживая обновление снимка"""
+        task = asyncio.create_task(self.notify(changes, group_ids, fingerprint))
+        self._tasks.add(task)
+        task.add_done_callback(self._done)
+
+    def _done(self, task: asyncio.Task) -> None:
+        self._tasks.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            logger.error("Не удалось разослать уведомления об изменениях", exc_info=task.exception())
+
+    @property
+    def enabled(self) -> bool:
+        return self._bot is not None
+
+    def start(self, bot: Bot) -> None:
+        self._bot = bot
+
+    async def stop(self) -> None:
+        tasks = list(self._tasks)
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._bot = None
+
+
+change_notifier = ChangeNotifier()
+
+
+@on_timetable_change
+def _on_timetable_change(old: TimetableSnapshot, new: TimetableSnapshot, changes: ChangeSet | None) -> None:
+    # Первая загрузка при старте — не изменение; без точного диффа уведомлять не о чем
+    if not change_notifier.enabled or old.version == 0 or not changes:
+        return
+    group_ids = {name: group_id for group_id, name in {**old.groups, **new.groups}.items()}
+    change_notifier.schedule(changes, group_ids, new.fingerprint)
@@ -0,0 +1,90 @@
+"""
+Ограничение частоты по алгоритму маркерного ведра (token bucket).
+
+Ведро пополняется со скоростью rate маркеров в секунду и вмещает не больше
+capacity. acquire резервирует маркеры сразу, даже в долг, и спит, пока долг
+не погасится, поэтому одновременные вызовы выстраиваются в очередь без блокировок.
+"""
+import asyncio
+import time
+from typing import Hashable
+
+
+class TokenBucket:
+    def __init__(self, rate: float, capacity: float = 1.0):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self.paused_until = 0.0
+
+    def _refill(self, now: float) -> None:
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def try_acquire(self, cost: float = 1.0) -> bool:
+        """Забирает маркеры, если они есть прямо сейчас"""
+        now = time.monotonic()
+        self._refill(now)
+        if now < self.paused_until or self.tokens < cost:
+            return False
+        self.tokens -= cost
+        return True
+
+    async def acquire(self, cost: float = 1.0) -> None:
+        """Забирает маркеры, при необходимости дожидаясь их"""
+        now = time.monotonic()
+        self._refill(now)
+        self.tokens -= cost
+        delay = max(-self.tokens / self.rate, self.paused_until - now)
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+    def wait_time(self, cost: float = 1.0) -> float:
+        """Через сколько секунд наберётся cost маркеров (0 — уже есть)"""
+        now = time.monotonic()
+        self._refill(now)
+        return max((cost - self.tokens) / self.rate, self.paused_until - now, 0.0)
+
+    def pause(self, seconds: float) -> None:
+        """Не выдаёт маркеры ближайшие seconds секунд (например, по retry_after)"""
+        self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+
+    def is_idle(self, now: float) -> bool:
+        """Ведро успело наполниться, и его можно забыть без потери состояния"""
+        return now >= self.paused_until and self.tokens + (now - self.updated) * self.rate >= self.capacity
+
+
+class KeyedTokenBuckets:
+    """Отдельное ведро на каждый ключ (чат, пользователя); простаивающие вёдра удаляются"""
+
+    def __init__(self, rate: float, capacity: float = 1.0, sweep_interval: float = 60.0):
+        self.rate = rate
+        self.capacity = capacity
+        self.sweep_interval = sweep_interval
+        self.evicted = 0
+        self._buckets: dict[Hashable, TokenBucket] = {}
+        self._next_sweep = time.monotonic() + sweep_interval
+
+    def __len__(self) -> int:
+        return len(self._buckets)
+
+    def get(self, key: Hashable) -> TokenBucket:
+        now = time.monotonic()
+        if now >= self._next_sweep:
+            self.sweep(now)
+
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            bucket = self._buckets[key] = TokenBucket(self.rate, self.capacity)
+        return bucket
+
+    def sweep(self, now: float | None = None) -> int:
+        if now is None:
+            now = time.monotonic()
+        idle = [key for key, bucket in self._buckets.items() if bucket.is_idle(now)]
+        for key in idle:
+            del self._buckets[key]
+        self.evicted += len(idle)
+        self._next_sweep = now + self.sweep_interval
+        return len(idle)
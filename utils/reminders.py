@@ -0,0 +1,346 @@
+"""
+Напоминания о парах и утренняя сводка.
+
+Подписчики держатся в памяти, сгруппированные по аудитории (группа, подгруппа)
+и сроку напоминания, и загружаются из базы одним запросом при старте. Времена
+срабатывания на день считаются заранее из снимка расписания: один таймер на
+(аудитория, начало пары, срок напоминания) и один таймер утренней сводки на
+аудиторию. Все таймеры лежат в одной куче, которую обслуживает одна задача;
+текст рендерится один раз на таймер и рассылается всей аудитории
+через общие ограничители частоты (utils.broadcast). Сработавшие таймеры
+доставляются по одному из очереди, так что одновременно отправляет не больше
+BROADCAST_CONCURRENCY обработчиков, сколько бы таймеров ни совпало по времени.
+
+Время последнего сработавшего таймера сохраняется в базе (JobCheckpoint), и после
+перезапуска таймеры, опоздавшие в пределах MISFIRE_GRACE, срабатывают, только если
+не сработали до перезапуска.
+"""
+import asyncio
+import heapq
+import logging
+from collections import defaultdict
+from dataclasses import dataclass
+from datetime import date, datetime, time, timedelta
+
+from aiogram import Bot
+from tortoise.expressions import Q
+
+import config
+from models import JobCheckpoint, User
+from utils.broadcast import BLOCKED, SENT, send_many
+from utils.academic_calendar import get_calendar
+from utils.common import time_to_minutes
+from utils.formatters import format_lesson_reminder
+from utils.render_cache import render_day_schedule
+from utils.timetable import get_timetable, on_timetable_change
+
+logger = logging.getLogger(__name__)
+
+MAX_REMIND_BEFORE = 180
+
+# Таймеры, опоздавшие не больше чем на это время (перезапуск, долгая рассылка), всё равно срабатывают
+MISFIRE_GRACE = timedelta(minutes=5)
+
+# Спим не дольше минуты, чтобы не проспать таймер при переводе системных часов
+MAX_SLEEP = 60
+
+CHECKPOINT_NAME = "reminders"
+
+
+# Аудитория напоминаний: (группа, подгруппа); подгруппа None — у группы нет деления
+Audience = tuple[int, int | None]
+
+
+class ReminderSubscribers:
+    """Подписчики на напоминания, сгруппированные по группе и подгруппе"""
+
+    def __init__(self):
+        self._settings: dict[int, tuple[Audience, int | None, bool]] = {}
+        self._reminders: dict[tuple[Audience, int], set[int]] = defaultdict(set)
+        self._digest: dict[Audience, set[int]] = defaultdict(set)
+
+    def __len__(self) -> int:
+        return len(self._settings)
+
+    async def load(self) -> int:
+        """Загружает всех подписчиков одним запросом"""
+        rows = await User.filter(
+            Q(remind_before__isnull=False) | Q(morning_digest=True),
+            group_id__isnull=False,
+        ).values_list("id", "group_id", "subgroup", "remind_before", "morning_digest")
+
+        self._settings = {}
+        self._reminders = defaultdict(set)
+        self._digest = defaultdict(set)
+        for user_id, group_id, subgroup, remind_before, morning_digest in rows:
+            self._add(user_id, (group_id, subgroup), remind_before, morning_digest)
+        return len(self._settings)
+
+    def _add(self, user_id: int, audience: Audience, remind_before: int | None, morning_digest: bool) -> None:
+        if remind_before is None and not morning_digest:
+            return
+
+        self._settings[user_id] = (audience, remind_before, morning_digest)
+        if remind_before is not None:
+            self._reminders[(audience, remind_before)].add(user_id)
+        if morning_digest:
+            self._digest[audience].add(user_id)
+
+    def discard(self, user_id: int) -> None:
+        settings = self._settings.pop(user_id, None)
+        if settings is None:
+            return
+
+        audience, remind_before, morning_digest = settings
+        if remind_before is not None:
+            users = self._reminders[(audience, remind_before)]
+            users.discard(user_id)
+            if not users:
+                del self._reminders[(audience, remind_before)]
+        if morning_digest:
+            users = self._digest[audience]
+            users.discard(user_id)
+            if not users:
+                del self._digest[audience]
+
+    def update(self, user: User) -> bool:
+        """Обновляет подписку пользователя; True, если изменился набор аудиторий"""
+        keys = self.keys()
+        self.discard(user.id)
+        if user.group_id is not None:
+            self._add(user.id, (user.group_id, user.subgroup), user.remind_before, user.morning_digest)
+        return self.keys() != keys
+
+    def keys(self) -> tuple[frozenset[tuple[Audience, int]], frozenset[Audience]]:
+        return frozenset(self._reminders), frozenset(self._digest)
+
+    def reminder_audiences(self) -> list[tuple[Audience, int]]:
+        """Пары (аудитория, за сколько минут напоминать), у которых есть подписчики"""
+        return list(self._reminders)
+
+    def digest_audiences(self) -> list[Audience]:
+        return list(self._digest)
+
+    def reminder_recipients(self, audience: Audience, remind_before: int) -> list[int]:
+        return list(self._reminders.get((audience, remind_before), ()))
+
+    def digest_recipients(self, audience: Audience) -> list[int]:
+        return list(self._digest.get(audience, ()))
+
+
+@dataclass(frozen=True)
+class Timer:
+    fire_at: datetime
+    kind: str  # "lesson" или "digest"
+    group_id: int
+    subgroup: int | None
+    start_minutes: int = 0
+    remind_before: int = 0
+
+    @property
+    def audience(self) -> Audience:
+        return self.group_id, self.subgroup
+
+
+class ReminderScheduler:
+    def __init__(self, subscribers: ReminderSubscribers, digest_time: str = "07:30", reload_interval: float = 0):
+        self.subscribers = subscribers
+        # Подписчики перечитываются из базы: настройки могли сохранить другие экземпляры бота
+        self.reload_interval = reload_interval
+        self.digest_minutes = time_to_minutes(digest_time)
+        self.fired = 0
+        self.sent = 0
+        self.failed = 0
+        self._bot: Bot | None = None
+        # Элементы кучи — (время, порядковый номер, таймер): номер разрешает равенство времён
+        self._heap: list[tuple[datetime, int, Timer]] = []
+        self._day: date | None = None
+        self._fired: set[Timer] = set()
+        # Время последнего таймера, сработавшего до перезапуска
+        self._restored_until: datetime | None = None
+        self._wakeup = asyncio.Event()
+        self._task: asyncio.Task | None = None
+        self._delivery_task: asyncio.Task | None = None
+        self._due: asyncio.Queue[Timer] = asyncio.Queue()
+
+    def plan(self, now: datetime) -> int:
+        """Раскладывает таймеры на сегодня, пропуская прошедшие и уже сработавшие"""
+        today = now.date()
+        if today != self._day:
+            self._day = today
+            self._fired = set()
+
+        calendar_day = get_calendar().day(today)
+        if not calendar_day.study:
+            # В неучебный день ни напоминаний, ни сводки
+            self._heap = []
+            return 0
+
+        snapshot = get_timetable()
+        week_type = calendar_day.week_type
+        weekday = today.weekday()
+        midnight = datetime.combine(today, time.min)
+
+        timers = [
+            Timer(midnight + timedelta(minutes=self.digest_minutes), "digest", group_id, subgroup)
+            for group_id, subgroup in self.subscribers.digest_audiences()
+        ]
+        for (group_id, subgroup), remind_before in self.subscribers.reminder_audiences():
+            lessons = snapshot.user_day(group_id, week_type, weekday, subgroup)
+            timers.extend(
+                Timer(midnight + timedelta(minutes=start - remind_before), "lesson", group_id, subgroup, start, remind_before)
+                for start in {lesson.start_minutes for lesson in lessons}
+            )
+
+        earliest = now - MISFIRE_GRACE
+        self._heap = [
+            (timer.fire_at, number, timer) for number, timer in enumerate(timers)
+            if timer.fire_at >= earliest and timer not in self._fired
+            and (self._restored_until is None or timer.fire_at > self._restored_until)
+        ]
+        heapq.heapify(self._heap)
+        return len(self._heap)
+
+    def replan(self) -> None:
+        """Пересчитывает таймеры после изменения расписания или подписок"""
+        if self._task is not None:
+            self.plan(datetime.now())
+            self._wakeup.set()
+
+    def render(self, timer: Timer) -> str | None:
+        """Текст для всей группы таймера или None, если пар уже нет"""
+        target_date = timer.fire_at.date()
+        calendar_day = get_calendar().day(target_date)
+        if not calendar_day.study:
+            return None
+        lessons = get_timetable().user_day(timer.group_id, calendar_day.week_type, target_date.weekday(), timer.subgroup)
+
+        if timer.kind == "digest":
+            return render_day_schedule(timer.group_id, timer.subgroup, target_date) if lessons else None
+
+        lessons = [lesson for lesson in lessons if lesson.start_minutes == timer.start_minutes]
+        return format_lesson_reminder(lessons, timer.remind_before) if lessons else None
+
+    async def fire(self, timer: Timer) -> None:
+        text = self.render(timer)
+        if text is None:
+            return
+
+        if timer.kind == "digest":
+            recipients = self.subscribers.digest_recipients(timer.audience)
+        else:
+            recipients = self.subscribers.reminder_recipients(timer.audience, timer.remind_before)
+        await self.deliver(recipients, text)
+
+    async def deliver(self, user_ids: list[int], text: str) -> None:
+        # Лимиты отправки общие с рассылками, см. utils.broadcast
+        statuses = await send_many(self._bot, user_ids, text)
+        for user_id, status in statuses.items():
+            if status == SENT:
+                self.sent += 1
+                continue
+
+            self.failed += 1
+            if status == BLOCKED:
+                # Пользователь заблокировал бота: не пишем ему до перезапуска
+                self.subscribers.discard(user_id)
+
+    async def restore(self) -> None:
+        """Читает из базы, докуда таймеры сработали до перезапуска"""
+        fired_until = await JobCheckpoint.filter(name=CHECKPOINT_NAME).first().values_list("fired_until", flat=True)
+        # Таймеры считаются в местном времени без часового пояса
+        self._restored_until = fired_until.replace(tzinfo=None) if fired_until is not None else None
+
+    async def save_checkpoint(self, fired_until: datetime) -> None:
+        await JobCheckpoint.update_or_create(name=CHECKPOINT_NAME, defaults={"fired_until": fired_until})
+
+    async def run(self) -> None:
+        loop = asyncio.get_running_loop()
+        reload_at = loop.time() + self.reload_interval
+        try:
+            await self.restore()
+        except Exception:
+            logger.exception("Не удалось прочитать, какие напоминания уже отправлены")
+        self.plan(datetime.now())
+        while True:
+            now = datetime.now()
+            if self.reload_interval and loop.time() >= reload_at:
+                reload_at = loop.time() + self.reload_interval
+                try:
+                    await self.subscribers.load()
+                except Exception:
+                    logger.exception("Не удалось перечитать подписчиков напоминаний")
+                self.plan(now)
+            elif now.date() != self._day:
+                self.plan(now)
+
+            fired_until = None
+            while self._heap and self._heap[0][0] <= now:
+                fired_until, _, timer = heapq.heappop(self._heap)
+                self._fired.add(timer)
+                self.fired += 1
+                self._due.put_nowait(timer)
+            if fired_until is not None:
+                # Отметка ставится до доставки: после перезапуска лучше пропустить напоминание, чем повторить
+                try:
+                    await self.save_checkpoint(fired_until)
+                except Exception:
+                    logger.exception("Не удалось сохранить время сработавших напоминаний")
+
+            if self._heap:
+                wake_at = self._heap[0][0]
+            else:
+                wake_at = datetime.combine(now.date() + timedelta(days=1), time.min)
+            timeout = min(max((wake_at - now).total_seconds(), 0), MAX_SLEEP)
+
+            self._wakeup.clear()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=timeout)
+            except asyncio.TimeoutError:
+                pass
+
+    async def deliver_due(self) -> None:
+        """Доставляет сработавшие таймеры по одному, в порядке срабатывания"""
+        while True:
+            timer = await self._due.get()
+            try:
+                await self.fire(timer)
+            except Exception:
+                logger.exception("Не удалось доставить %s", timer)
+
+    def start(self, bot: Bot) -> None:
+        if self._task is None:
+            self._bot = bot
+            self._task = asyncio.create_task(self.run())
+            self._delivery_task = asyncio.create_task(self.deliver_due())
+
+    async def stop(self) -> None:
+        tasks = [task for task in (self._task, self._delivery_task) if task is not None]
+        self._task = self._delivery_task = None
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    def stats(self) -> dict[str, int]:
+        return {
+            "subscribers": len(self.subscribers),
+            "timers": len(self._heap),
+            "fired": self.fired,
+            "sent": self.sent,
+            "failed": self.failed,
+        }
+
+
+reminder_subscribers = ReminderSubscribers()
+reminder_scheduler = ReminderScheduler(reminder_subscribers, config.DIGEST_TIME, config.REMINDER_RELOAD_SECONDS)
+
+
+@on_timetable_change
+def _on_timetable_change(old, new, changes) -> None:
+    reminder_scheduler.replan()
+
+
+def update_subscription(user: User) -> None:
+    """Применяет изменённые настройки пользователя к напоминаниям"""
+    if reminder_subscribers.update(user):
+        reminder_scheduler.replan()
@@ -0,0 +1,165 @@
+"""
+Кэш готовых текстов расписания.
+
+Различных ответов в группе немного: два типа недели × подгруппы × дни недели
+плюс общие виды. Тексты рендерятся один раз на версию снимка расписания и дальше
+отдаются из словаря своей группы. При смене снимка просматриваются только группы,
+затронутые изменениями, и удаляются только затронутые тексты.
+
+Ключ текста внутри группы: (вид, тип недели, подгруппа, день недели, ...).
+"""
+from datetime import date
+from typing import Callable, Hashable
+
+from utils.academic_calendar import get_calendar
+from utils.formatters import (
+    format_day_off,
+    format_today_schedule,
+    format_user_week_schedule,
+    format_general_week_schedule,
+    format_weekday_schedule,
+)
+from utils.schedule_sync import ChangeSet
+from utils.timetable import TimetableSnapshot, get_timetable, on_timetable_change
+
+
+class RenderCache:
+    """Тексты разложены по группам: смена расписания одной группы не трогает остальные"""
+
+    def __init__(self, max_size: int = 4096):
+        self.max_size = max_size
+        self.version: int | None = None
+        self.hits = 0
+        self.misses = 0
+        self._size = 0
+        self._groups: dict[int | None, dict[Hashable, str]] = {}
+
+    def __len__(self) -> int:
+        return self._size
+
+    def get_or_render(self, group_id: int | None, key: Hashable, version: int, render: Callable[[], str]) -> str:
+        if version != self.version:
+            self._clear_items()
+            self.version = version
+
+        items = self._groups.get(group_id)
+        text = items.get(key) if items is not None else None
+        if text is not None:
+            self.hits += 1
+            return text
+
+        self.misses += 1
+        text = render()
+        if self.max_size <= 0:
+            # Кэш отключён (например, в нагрузочном тесте)
+            return text
+        if self._size >= self.max_size:
+            self._clear_items()
+        self._groups.setdefault(group_id, {})[key] = text
+        self._size += 1
+        return text
+
+    def _clear_items(self) -> None:
+        self._groups = {}
+        self._size = 0
+
+    def clear(self) -> None:
+        self._clear_items()
+        self.version = None
+
+    def migrate(self, old_version: int, new_version: int, changes: ChangeSet | None, group_names: dict[int, str]) -> int:
+        """Переносит тексты на новую версию снимка, удаляя затронутые изменениями"""
+        if self.version != old_version or changes is None:
+            self._clear_items()
+        else:
+            affected_groups = changes.affected_groups
+            for group_id, items in self._groups.items():
+                group = group_names.get(group_id)
+                if group not in affected_groups:
+                    continue
+                self._groups[group_id] = {
+                    key: text for key, text in items.items()
+                    if not is_affected(group, key, changes)
+                }
+            self._size = sum(len(items) for items in self._groups.values())
+        self.version = new_version
+        return self._size
+
+
+def is_affected(group: str | None, key: Hashable, changes: ChangeSet) -> bool:
+    view, week_type, subgroup, weekday, *_ = key
+    return changes.affects(group, week_type, subgroup, weekday)
+
+
+render_cache = RenderCache()
+
+
+@on_timetable_change
+def _on_timetable_change(old: TimetableSnapshot, new: TimetableSnapshot, changes: ChangeSet | None) -> None:
+    render_cache.migrate(old.version, new.version, changes, {**old.groups, **new.groups})
+
+
+def render_day_schedule(group_id: int | None, subgroup: int | None, target_date: date) -> str:
+    snapshot = get_timetable()
+    calendar_day = get_calendar().day(target_date)
+    if not calendar_day.study:
+        return format_day_off(target_date, calendar_day.note)
+
+    week_type = calendar_day.week_type
+    weekday = target_date.weekday()
+
+    return render_cache.get_or_render(
+        group_id,
+        ("day", week_type, subgroup, weekday, target_date),
+        snapshot.version,
+        lambda: format_today_schedule(snapshot.user_day(group_id, week_type, weekday, subgroup), target_date)
+    )
+
+
+def render_today_schedule(group_id: int | None, subgroup: int | None) -> str:
+    return render_day_schedule(group_id, subgroup, date.today())
+
+
+def render_weekday_schedule(group_id: int | None, subgroup: int | None, week_type: str, weekday: int) -> str:
+    snapshot = get_timetable()
+    return render_cache.get_or_render(
+        group_id,
+        ("weekday", week_type, subgroup, weekday),
+        snapshot.version,
+        lambda: format_weekday_schedule(snapshot.user_day(group_id, week_type, weekday, subgroup), week_type, weekday)
+    )
+
+
+def render_general_weekday_schedule(group_id: int | None, week_type: str, weekday: int) -> str:
+    snapshot = get_timetable()
+
+    def render() -> str:
+        lessons = [l for l in snapshot.general_week(group_id, week_type) if l.day_of_week == weekday]
+        return format_weekday_schedule(lessons, week_type, weekday, general=True)
+
+    return render_cache.get_or_render(
+        group_id,
+        ("general_weekday", week_type, None, weekday),
+        snapshot.version,
+        render
+    )
+
+
+def render_user_week_schedule(group_id: int | None, subgroup: int | None, week_type: str) -> str:
+    snapshot = get_timetable()
+    return render_cache.get_or_render(
+        group_id,
+        ("user_week", week_type, subgroup, None),
+        snapshot.version,
+        lambda: format_user_week_schedule(snapshot.user_week(group_id, week_type, subgroup), week_type)
+    )
+
+
+def render_general_week_schedule(group_id: int | None, week_type: str) -> str:
+    snapshot = get_timetable()
+    return render_cache.get_or_render(
+        group_id,
+        ("general_week", week_type, None, None),
+        snapshot.version,
+        lambda: format_general_week_schedule(snapshot.general_week(group_id, week_type), week_type)
+    )
@@ -0,0 +1,288 @@
+"""
+Импорт расписания из файла.
+
+Файл (JSON, CSV или YAML) разбирается в проверенные строки LessonRow, группы и
+предметы находятся одним запросом, а пары записываются через bulk_create в одной
+транзакции, так что бот никогда не видит пустое или наполовину залитое расписание.
+Файл может содержать расписание нескольких групп (поле group); строкам без группы
+назначается группа по умолчанию, а пары остальных групп импорт не затрагивает.
+Формат источника выбирается по расширению файла; новые форматы добавляются
+через register_parser.
+"""
+import csv
+import json
+import time
+from dataclasses import dataclass, field, replace
+from pathlib import Path
+from typing import Any, Callable, Iterable
+
+from tortoise.transactions import in_transaction
+
+from tortoise.models import Model
+
+from models import Group, Lesson, Subject, WeekType
+from utils.common import time_to_minutes
+
+DAYS_MAP = {
+    "Понедельник": 0,
+    "Вторник": 1,
+    "Среда": 2,
+    "Четверг": 3,
+    "Пятница": 4,
+    "Суббота": 5,
+    "Воскресенье": 6
+}
+
+WEEK_TYPES = {"even", "odd"}
+
+BULK_BATCH_SIZE = 500
+
+
+class ScheduleImportError(ValueError):
+    pass
+
+
+@dataclass(frozen=True)
+class LessonRow:
+    subject: str
+    day_of_week: int
+    start_time: str
+    end_time: str
+    lesson_type: str
+    teacher: str | None = None
+    classroom: str | None = None
+    week_type: str | None = None
+    subgroup: int | None = None
+    group: str | None = None
+
+    @classmethod
+    def from_lesson(cls, lesson: Lesson) -> "LessonRow":
+        """Строка из пары, загруженной вместе с предметом и группой"""
+        return cls(
+            subject=lesson.subject.name,
+            day_of_week=lesson.day_of_week,
+            start_time=lesson.start_time,
+            end_time=lesson.end_time,
+            lesson_type=lesson.lesson_type,
+            teacher=lesson.teacher,
+            classroom=lesson.classroom,
+            week_type=lesson.week_type,
+            subgroup=lesson.subgroup,
+            group=lesson.group.name,
+        )
+
+
+@dataclass
+class ImportReport:
+    source: str
+    rows: int = 0
+    groups: int = 0
+    subjects_created: int = 0
+    lessons_deleted: int = 0
+    lessons_created: int = 0
+    timings: dict[str, float] = field(default_factory=dict)
+
+    def __str__(self) -> str:
+        stages = ", ".join(f"{stage} {seconds * 1000:.1f} мс" for stage, seconds in self.timings.items())
+        return (
+            f"Импорт {self.source}: строк {self.rows}, групп {self.groups}, новых предметов {self.subjects_created}, "
+            f"удалено пар {self.lessons_deleted}, создано пар {self.lessons_created} ({stages})"
+        )
+
+
+PARSERS: dict[str, Callable[[Path], list[dict[str, Any]]]] = {}
+
+
+def register_parser(*extensions: str):
+    """Регистрирует функцию разбора файла для указанных расширений"""
+    def decorator(func: Callable[[Path], list[dict[str, Any]]]):
+        for extension in extensions:
+            PARSERS[extension.lower()] = func
+        return func
+
+    return decorator
+
+
+@register_parser(".json")
+def parse_json(path: Path) -> list[dict[str, Any]]:
+    with path.open(encoding="utf-8") as f:
+        data = json.load(f)
+    if isinstance(data, dict):
+        data = data.get("lessons", [])
+    return data
+
+
+@register_parser(".csv")
+def parse_csv(path: Path) -> list[dict[str, Any]]:
+    with path.open(encoding="utf-8-sig", newline="") as f:
+        return list(csv.DictReader(f))
+
+
+@register_parser(".yaml", ".yml")
+def parse_yaml(path: Path) -> list[dict[str, Any]]:
+    try:
+        import yaml
+    except ImportError:
+        raise ScheduleImportError("Для импорта YAML установите пакет PyYAML")
+
+    with path.open(encoding="utf-8") as f:
+        data = yaml.safe_load(f)
+    if isinstance(data, dict):
+        data = data.get("lessons", [])
+    return data
+
+
+def normalize_time(time_str: str) -> str:
+    """Нормализует время в формат HH:MM с ведущим нулем"""
+    parts = time_str.strip().split(':')
+    if len(parts) != 2 or not all(part.isdigit() for part in parts):
+        raise ValueError(f"некорректное время {time_str!r}")
+
+    hour, minute = int(parts[0]), int(parts[1])
+    if hour > 23 or minute > 59:
+        raise ValueError(f"некорректное время {time_str!r}")
+    return f"{hour:02d}:{minute:02d}"
+
+
+def _optional(value: Any) -> str | None:
+    if value is None:
+        return None
+    value = str(value).strip()
+    return value or None
+
+
+def parse_row(raw: dict[str, Any]) -> LessonRow:
+    """Проверяет и приводит одну запись источника к LessonRow"""
+    subject = _optional(raw.get("subject"))
+    if subject is None:
+        raise ValueError("не указан предмет")
+
+    day = raw.get("day")
+    if isinstance(day, int) or (isinstance(day, str) and day.strip().isdigit()):
+        day_of_week = int(day)
+    else:
+        day_of_week = DAYS_MAP.get(str(day).strip().capitalize(), -1)
+    if not 0 <= day_of_week < 7:
+        raise ValueError(f"некорректный день недели {day!r}")
+
+    if raw.get("time"):
+        start, _, end = str(raw["time"]).partition("-")
+    else:
+        start, end = raw.get("start_time") or "", raw.get("end_time") or ""
+    start_time, end_time = normalize_time(start), normalize_time(end)
+    if time_to_minutes(start_time) >= time_to_minutes(end_time):
+        raise ValueError(f"пара заканчивается раньше, чем начинается: {start_time}-{end_time}")
+
+    week_type = _optional(raw.get("week") or raw.get("week_type"))
+    if week_type is not None and week_type not in WEEK_TYPES:
+        raise ValueError(f"некорректный тип недели {week_type!r}")
+
+    subgroup = _optional(raw.get("subgroup"))
+    if subgroup is not None and not subgroup.isdigit():
+        raise ValueError(f"некорректная подгруппа {subgroup!r}")
+
+    return LessonRow(
+        subject=subject,
+        day_of_week=day_of_week,
+        start_time=start_time,
+        end_time=end_time,
+        lesson_type=_optional(raw.get("type") or raw.get("lesson_type")) or "",
+        teacher=_optional(raw.get("teacher")),
+        classroom=_optional(raw.get("classroom")),
+        week_type=week_type,
+        subgroup=int(subgroup) if subgroup is not None else None,
+        group=_optional(raw.get("group")),
+    )
+
+
+def load_rows(path: str | Path, group: str | None = None) -> list[LessonRow]:
+    """Читает файл расписания и возвращает проверенные строки; group — группа для строк без своей"""
+    path = Path(path)
+    parser = PARSERS.get(path.suffix.lower())
+    if parser is None:
+        raise ScheduleImportError(f"Неизвестный формат файла расписания: {path.suffix or path.name}")
+
+    rows = []
+    errors = []
+    for number, raw in enumerate(parser(path), start=1):
+        try:
+            row = parse_row(raw)
+            if row.group is None:
+                if group is None:
+                    raise ValueError("не указана группа")
+                row = replace(row, group=group)
+            rows.append(row)
+        except ValueError as e:
+            errors.append(f"запись {number}: {e}")
+
+    if errors:
+        raise ScheduleImportError("Ошибки в файле расписания:\n" + "\n".join(errors))
+    return rows
+
+
+async def resolve_names(model: type[Model], names: Iterable[str], using_db=None) -> tuple[dict[str, Model], int]:
+    """Находит записи по полю name, недостающие создаёт одной пачкой"""
+    names = set(names)
+    if not names:
+        return {}, 0
+
+    found = {obj.name: obj for obj in await model.filter(name__in=names).using_db(using_db)}
+
+    missing = names - found.keys()
+    if missing:
+        await model.bulk_create([model(name=name) for name in sorted(missing)], using_db=using_db)
+        found = {obj.name: obj for obj in await model.filter(name__in=names).using_db(using_db)}
+
+    return found, len(missing)
+
+
+async def resolve_subjects(names: Iterable[str], using_db=None) -> tuple[dict[str, Subject], int]:
+    """Находит предметы по названиям, недостающие создаёт"""
+    return await resolve_names(Subject, names, using_db)
+
+
+async def resolve_groups(names: Iterable[str], using_db=None) -> tuple[dict[str, Group], int]:
+    """Находит группы по названиям, недостающие создаёт"""
+    return await resolve_names(Group, names, using_db)
+
+
+def build_lesson(row: LessonRow, subject: Subject, group: Group) -> Lesson:
+    return Lesson(
+        group=group,
+        subject=subject,
+        day_of_week=row.day_of_week,
+        start_minutes=time_to_minutes(row.start_time),
+        end_minutes=time_to_minutes(row.end_time),
+        lesson_type=row.lesson_type,
+        teacher=row.teacher,
+        classroom=row.classroom,
+        week=WeekType.from_slug(row.week_type),
+        subgroup=row.subgroup,
+    )
+
+
+async def import_schedule(path: str | Path, group: str | None = None) -> ImportReport:
+    """Полностью заменяет расписание групп из файла его содержимым"""
+    report = ImportReport(source=str(path))
+
+    started = time.perf_counter()
+    rows = load_rows(path, group)
+    report.rows = len(rows)
+    report.timings["разбор"] = time.perf_counter() - started
+
+    async with in_transaction() as connection:
+        started = time.perf_counter()
+        groups, _ = await resolve_groups((row.group for row in rows), connection)
+        report.groups = len(groups)
+        subjects, report.subjects_created = await resolve_subjects((row.subject for row in rows), connection)
+        report.timings["предметы"] = time.perf_counter() - started
+
+        started = time.perf_counter()
+        group_ids = [g.id for g in groups.values()]
+        report.lessons_deleted = await Lesson.filter(group_id__in=group_ids).using_db(connection).delete()
+        lessons = [build_lesson(row, subjects[row.subject], groups[row.group]) for row in rows]
+        await Lesson.bulk_create(lessons, batch_size=BULK_BATCH_SIZE, using_db=connection)
+        report.lessons_created = len(lessons)
+        report.timings["запись"] = time.perf_counter() - started
+
+    return report
@@ -0,0 +1,178 @@
+"""
+Инкрементальная синхронизация расписания.
+
+Вместо удаления и повторной вставки всех пар сравнивает новое расписание с
+текущим по естественному ключу (группа, тип недели, день, начало, подгруппа,
+предмет) и применяет только вставки, изменения и удаления. Сравниваются только
+группы, которые есть в файле, расписание остальных групп не трогается.
+Результат сравнения — ChangeSet, по которому кэши и уведомления понимают, что
+именно изменилось.
+"""
+import time
+from dataclasses import dataclass, field, astuple
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Iterable
+
+from tortoise.transactions import in_transaction
+
+from models import Lesson
+from utils.common import time_to_minutes
+from utils.schedule_import import (
+    BULK_BATCH_SIZE,
+    ImportReport,
+    LessonRow,
+    ScheduleImportError,
+    build_lesson,
+    load_rows,
+    resolve_groups,
+    resolve_subjects,
+)
+
+NaturalKey = tuple[str | None, str | None, int, str, int | None, str]
+
+# Поля, которые могут меняться у пары без смены её естественного ключа
+UPDATED_COLUMNS = ["end_minutes", "lesson_type", "teacher", "classroom", "updated_at"]
+
+
+def natural_key(row: LessonRow) -> NaturalKey:
+    return row.group, row.week_type, row.day_of_week, row.start_time, row.subgroup, row.subject
+
+
+@dataclass(frozen=True)
+class ChangeSet:
+    added: tuple[LessonRow, ...] = ()
+    updated: tuple[tuple[LessonRow, LessonRow], ...] = ()
+    removed: tuple[LessonRow, ...] = ()
+
+    def __bool__(self) -> bool:
+        return bool(self.added or self.updated or self.removed)
+
+    def __str__(self) -> str:
+        return f"добавлено {len(self.added)}, изменено {len(self.updated)}, удалено {len(self.removed)}"
+
+    @property
+    def rows(self) -> list[LessonRow]:
+        """Все затронутые строки: и старые, и новые версии"""
+        return [*self.added, *(row for pair in self.updated for row in pair), *self.removed]
+
+    @property
+    def affected_slots(self) -> set[tuple[str | None, str | None, int, int | None]]:
+        """Затронутые (группа, тип недели, день, подгруппа); подгруппа None — общая пара"""
+        return {(row.group, row.week_type, row.day_of_week, row.subgroup) for row in self.rows}
+
+    @property
+    def affected_groups(self) -> set[str | None]:
+        return {row.group for row in self.rows}
+
+    def affects(
+            self,
+            group: str | None,
+            week_type: str | None,
+            subgroup: int | None = None,
+            day_of_week: int | None = None,
+    ) -> bool:
+        """Затрагивают ли изменения выборку пользователя группы и подгруппы subgroup (None — любая)"""
+        return any(
+            row_group == group
+            and row_week_type == week_type
+            and (day_of_week is None or row_day == day_of_week)
+            and (subgroup is None or row_subgroup is None or row_subgroup == subgroup)
+            for row_group, row_week_type, row_day, row_subgroup in self.affected_slots
+        )
+
+
+def index_rows(rows: Iterable[LessonRow]) -> dict[NaturalKey, LessonRow]:
+    indexed = {}
+    for row in rows:
+        key = natural_key(row)
+        if key in indexed:
+            raise ScheduleImportError(
+                f"Пара встречается дважды: {row.group}, {row.subject}, день {row.day_of_week}, {row.start_time}"
+            )
+        indexed[key] = row
+    return indexed
+
+
+def compute_changes(old_rows: Iterable[LessonRow], new_rows: Iterable[LessonRow]) -> ChangeSet:
+    old = index_rows(old_rows)
+    new = index_rows(new_rows)
+
+    added = tuple(row for key, row in new.items() if key not in old)
+    removed = tuple(row for key, row in old.items() if key not in new)
+    updated = tuple(
+        (old[key], row) for key, row in new.items()
+        if key in old and astuple(old[key]) != astuple(row)
+    )
+    return ChangeSet(added=added, updated=updated, removed=removed)
+
+
+@dataclass
+class SyncReport(ImportReport):
+    changes: ChangeSet = field(default_factory=ChangeSet)
+
+    def __str__(self) -> str:
+        stages = ", ".join(f"{stage} {seconds * 1000:.1f} мс" for stage, seconds in self.timings.items())
+        return f"Синхронизация {self.source}: строк {self.rows}, групп {self.groups}, {self.changes} ({stages})"
+
+
+async def sync_schedule(path: str | Path, group: str | None = None) -> SyncReport:
+    """Приводит расписание групп из файла к его содержимому минимальным набором изменений"""
+    report = SyncReport(source=str(path))
+
+    started = time.perf_counter()
+    rows = load_rows(path, group)
+    report.rows = len(rows)
+    new = index_rows(rows)
+    report.timings["разбор"] = time.perf_counter() - started
+
+    async with in_transaction() as connection:
+        started = time.perf_counter()
+        groups, _ = await resolve_groups((row.group for row in rows), connection)
+        report.groups = len(groups)
+        lessons = await (Lesson.filter(group_id__in=[g.id for g in groups.values()])
+                         .using_db(connection)
+                         .prefetch_related("subject", "group"))
+        stored: dict[NaturalKey, Lesson] = {}
+        duplicates: list[Lesson] = []
+        for lesson in lessons:
+            key = natural_key(LessonRow.from_lesson(lesson))
+            if key in stored:
+                duplicates.append(lesson)
+            else:
+                stored[key] = lesson
+        changes = compute_changes((LessonRow.from_lesson(lesson) for lesson in stored.values()), rows)
+        report.changes = changes
+        report.timings["сравнение"] = time.perf_counter() - started
+
+        started = time.perf_counter()
+        subjects, report.subjects_created = await resolve_subjects((row.subject for row in changes.added), connection)
+        report.timings["предметы"] = time.perf_counter() - started
+
+        started = time.perf_counter()
+        stale_ids = [lesson.id for key, lesson in stored.items() if key not in new]
+        stale_ids.extend(lesson.id for lesson in duplicates)
+        if stale_ids:
+            report.lessons_deleted = await Lesson.filter(id__in=stale_ids).using_db(connection).delete()
+
+        if changes.added:
+            lessons = [build_lesson(row, subjects[row.subject], groups[row.group]) for row in changes.added]
+            await Lesson.bulk_create(lessons, batch_size=BULK_BATCH_SIZE, using_db=connection)
+            report.lessons_created = len(lessons)
+
+        if changes.updated:
+            changed_lessons = []
+            # bulk_update не проставляет auto_now, а по updated_at изменения замечает отпечаток таблицы
+            now = datetime.now(timezone.utc)
+            for _, row in changes.updated:
+                lesson = stored[natural_key(row)]
+                lesson.end_minutes = time_to_minutes(row.end_time)
+                lesson.lesson_type = row.lesson_type
+                lesson.teacher = row.teacher
+                lesson.classroom = row.classroom
+                lesson.updated_at = now
+                changed_lessons.append(lesson)
+            await Lesson.bulk_update(changed_lessons, fields=UPDATED_COLUMNS, using_db=connection)
+        report.timings["запись"] = time.perf_counter() - started
+
+    return report
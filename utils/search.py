@@ -0,0 +1,205 @@
+"""
+Поиск преподавателей и аудиторий по снимку расписания.
+
+Преподаватель и аудитория в парах — свободный текст, поэтому поиск по базе
+(icontains) не использует индексы. Вместо этого при каждой смене снимка
+строится обратный индекс: нормализованная фамилия преподавателя или код
+аудитории → имена в расписании. Слова индекса хранятся отсортированными, так
+что поиск по префиксу — это бинарный поиск; если по префиксу ничего не нашлось,
+берутся близкие по написанию слова (опечатки).
+
+Для каждого найденного преподавателя и аудитории пары разложены по (тип недели,
+день) и упорядочены по началу, поэтому «что сейчас» и «что дальше» находятся
+бинарным поиском по времени.
+"""
+import logging
+from bisect import bisect_left, bisect_right
+from collections import defaultdict
+from dataclasses import dataclass, field
+from datetime import date, datetime, timedelta
+from difflib import get_close_matches
+from typing import Iterable
+
+from models import Lesson
+from utils.academic_calendar import get_calendar
+from utils.timetable import TimetableSnapshot, on_timetable_change
+
+logger = logging.getLogger(__name__)
+
+MAX_MATCHES = 5
+# Насколько похожим должно быть слово с опечаткой (0..1, см. difflib)
+FUZZY_CUTOFF = 0.75
+# На сколько дней вперёд искать следующую пару: две недели — полный цикл чётности
+LOOKAHEAD_DAYS = 14
+
+
+def normalize_word(word: str) -> str:
+    return "".join(ch for ch in word.casefold().replace("ё", "е") if ch.isalnum())
+
+
+def teacher_tokens(teacher: str) -> set[str]:
+    """Слова имени преподавателя без должностей и инициалов («доц. Жалнина А.А.» → {"жалнина"})"""
+    return {
+        normalize_word(word) for word in teacher.split()
+        if not word.endswith(".") and len(normalize_word(word)) > 2
+    }
+
+
+def query_words(query: str) -> list[str]:
+    """Слова поискового запроса; инициалы и сокращения с точкой пропускаются"""
+    return [normalize_word(word) for word in query.split() if not word.endswith(".")]
+
+
+def room_tokens(classroom: str) -> set[str]:
+    """Код аудитории целиком и по словам («лыжная база» → {"лыжнаябаза", "лыжная", "база"})"""
+    tokens = {normalize_word(word) for word in classroom.split()}
+    tokens.add(normalize_word(classroom))
+    tokens.discard("")
+    return tokens
+
+
+class TokenIndex:
+    """Обратный индекс: слово → имена; слова отсортированы для поиска по префиксу"""
+
+    def __init__(self, postings: dict[str, set[str]]):
+        self._postings = postings
+        self._words = sorted(postings)
+
+    def __len__(self) -> int:
+        return len(self._words)
+
+    def _match_word(self, word: str) -> set[str]:
+        names = set()
+        index = bisect_left(self._words, word)
+        while index < len(self._words) and self._words[index].startswith(word):
+            names |= self._postings[self._words[index]]
+            index += 1
+        if not names:
+            for close in get_close_matches(word, self._words, n=MAX_MATCHES, cutoff=FUZZY_CUTOFF):
+                names |= self._postings[close]
+        return names
+
+    def find(self, words: Iterable[str]) -> list[str]:
+        """Имена, подходящие под все слова запроса"""
+        words = [word for word in words if word]
+        if not words:
+            return []
+
+        names = self._match_word(words[0])
+        for word in words[1:]:
+            names &= self._match_word(word)
+        return sorted(names)
+
+
+@dataclass
+class Occupancy:
+    """Пары одного преподавателя или аудитории, разложенные по (тип недели, день)"""
+    name: str
+    lessons: tuple[Lesson, ...]
+    _days: dict[tuple[str, int], tuple[Lesson, ...]] = field(default_factory=dict, repr=False)
+    _starts: dict[tuple[str, int], tuple[int, ...]] = field(default_factory=dict, repr=False)
+
+    @classmethod
+    def build(cls, name: str, lessons: Iterable[Lesson]) -> "Occupancy":
+        ordered = tuple(sorted(lessons, key=lambda l: (l.day_of_week, l.start_minutes)))
+        days: dict[tuple[str, int], list[Lesson]] = defaultdict(list)
+        for lesson in ordered:
+            # Пары без типа недели не попадают ни в одну неделю
+            if lesson.week_type is not None:
+                days[(lesson.week_type, lesson.day_of_week)].append(lesson)
+        return cls(
+            name=name,
+            lessons=ordered,
+            _days={key: tuple(value) for key, value in days.items()},
+            _starts={key: tuple(l.start_minutes for l in value) for key, value in days.items()},
+        )
+
+    def week(self, week_type: str, day_of_week: int | None = None, group_id: int | None = None) -> list[Lesson]:
+        """Пары недели по дням и времени, при необходимости только одного дня и группы"""
+        return [
+            lesson for lesson in self.lessons
+            if lesson.week_type == week_type
+            and day_of_week in (None, lesson.day_of_week)
+            and group_id in (None, lesson.group_id)
+        ]
+
+    def _day(self, target_date: date) -> tuple[tuple[Lesson, ...], tuple[int, ...]]:
+        calendar_day = get_calendar().day(target_date)
+        if not calendar_day.study:
+            return (), ()
+        key = (calendar_day.week_type, target_date.weekday())
+        return self._days.get(key, ()), self._starts.get(key, ())
+
+    def current(self, moment: datetime) -> Lesson | None:
+        """Пара, идущая в момент moment"""
+        lessons, starts = self._day(moment.date())
+        minutes = moment.hour * 60 + moment.minute
+        index = bisect_right(starts, minutes) - 1
+        if index >= 0 and lessons[index].end_minutes > minutes:
+            return lessons[index]
+        return None
+
+    def upcoming(self, moment: datetime) -> tuple[date, Lesson] | None:
+        """Ближайшая пара, начинающаяся после moment, и её дата"""
+        minutes = moment.hour * 60 + moment.minute
+        for offset in range(LOOKAHEAD_DAYS):
+            target_date = moment.date() + timedelta(days=offset)
+            lessons, starts = self._day(target_date)
+            index = bisect_right(starts, minutes) if offset == 0 else 0
+            if index < len(lessons):
+                return target_date, lessons[index]
+        return None
+
+
+class SearchIndex:
+    def __init__(self, version: int, teachers: dict[str, Occupancy], rooms: dict[str, Occupancy]):
+        self.version = version
+        self.teachers = teachers
+        self.rooms = rooms
+        self._teacher_index = TokenIndex(self._postings(teachers, teacher_tokens))
+        self._room_index = TokenIndex(self._postings(rooms, room_tokens))
+
+    @staticmethod
+    def _postings(entries: dict[str, Occupancy], tokenize) -> dict[str, set[str]]:
+        postings: dict[str, set[str]] = defaultdict(set)
+        for name in entries:
+            for token in tokenize(name):
+                postings[token].add(name)
+        return dict(postings)
+
+    @classmethod
+    def build(cls, snapshot: TimetableSnapshot) -> "SearchIndex":
+        by_teacher: dict[str, list[Lesson]] = defaultdict(list)
+        by_room: dict[str, list[Lesson]] = defaultdict(list)
+        for lesson in snapshot.lessons:
+            if lesson.teacher:
+                by_teacher[lesson.teacher].append(lesson)
+            if lesson.classroom:
+                by_room[lesson.classroom].append(lesson)
+
+        return cls(
+            snapshot.version,
+            {name: Occupancy.build(name, lessons) for name, lessons in by_teacher.items()},
+            {name: Occupancy.build(name, lessons) for name, lessons in by_room.items()},
+        )
+
+    def find_teachers(self, query: str, limit: int = MAX_MATCHES) -> list[Occupancy]:
+        return [self.teachers[name] for name in self._teacher_index.find(query_words(query))[:limit]]
+
+    def find_rooms(self, query: str, limit: int = MAX_MATCHES) -> list[Occupancy]:
+        return [self.rooms[name] for name in self._room_index.find(query_words(query))[:limit]]
+
+
+_index = SearchIndex(0, {}, {})
+
+
+def get_search_index() -> SearchIndex:
+    return _index
+
+
+@on_timetable_change
+def _on_timetable_change(old: TimetableSnapshot, new: TimetableSnapshot, changes) -> None:
+    global _index
+    _index = SearchIndex.build(new)
+    logger.info("Поисковый индекс: %s преподавателей, %s аудиторий", len(_index.teachers), len(_index.rooms))
+
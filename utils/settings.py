@@ -0,0 +1,42 @@
+"""
+Выбор группы и подгруппы в настройках пользователя.
+
+Групп может быть сотни, поэтому группа вводится текстом и ищется в снимке
+расписания без учёта регистра и дефисов; при неточном вводе бот предлагает
+подходящие названия кнопками. Подгруппу спрашиваем, только если у группы
+есть пары отдельных подгрупп.
+"""
+from aiogram.fsm.context import FSMContext
+from aiogram.types import Message
+
+from keyboards.reply import get_group_keyboard, get_subgroup_keyboard
+from models import User
+from states import SettingsState
+from utils.timetable import get_timetable
+
+GROUP_SUGGESTIONS = 10
+
+
+def needs_subgroup(user: User) -> bool:
+    """Подгруппа не выбрана, а у группы пользователя есть пары отдельных подгрупп"""
+    return user.subgroup is None and bool(get_timetable().group_subgroups(user.group_id))
+
+
+async def ask_group(message: Message, state: FSMContext, text: str = "Напишите название вашей группы, например ИВТ-21:"):
+    await state.set_state(SettingsState.choose_group)
+    await message.answer(text, reply_markup=get_group_keyboard(()))
+
+
+async def ask_subgroup(message: Message, state: FSMContext, group_id: int, text: str = "Выберите вашу подгруппу:"):
+    await state.set_state(SettingsState.choose_subgroup)
+    await state.update_data(group_id=group_id)
+    await message.answer(text, reply_markup=get_subgroup_keyboard(get_timetable().group_subgroups(group_id)))
+
+
+async def suggest_groups(message: Message, query: str):
+    snapshot = get_timetable()
+    names = [snapshot.groups[group_id] for group_id in snapshot.search_groups(query, GROUP_SUGGESTIONS)]
+    if names:
+        await message.answer("Такой группы нет. Может быть, одна из этих?", reply_markup=get_group_keyboard(names))
+    else:
+        await message.answer("Группа не найдена, проверьте название и попробуйте ещё раз")
@@ -0,0 +1,59 @@
+"""
+Объединение одновременных одинаковых вычислений (single flight).
+
+Первый вызов с ключом запускает вычисление, а вызовы с тем же ключом, пришедшие
+до его завершения, ждут тот же результат (или ту же ошибку), не повторяя работу.
+После завершения ключ забывается: следующий вызов вычисляет заново, поэтому это
+не кэш, а защита от одновременной толпы одинаковых запросов.
+"""
+import asyncio
+from typing import Awaitable, Callable, Hashable, TypeVar
+
+from utils.metrics import registry
+
+T = TypeVar("T")
+
+single_flight_calls = registry.counter(
+    "bot_single_flight_calls_total", "Вызовы через single flight: выполнено и присоединено к идущему",
+    ("name", "result"))
+
+
+class SingleFlight:
+    def __init__(self, name: str):
+        self.name = name
+        self.executed = 0
+        self.coalesced = 0
+        self._inflight: dict[Hashable, asyncio.Future] = {}
+
+    def __len__(self) -> int:
+        return len(self._inflight)
+
+    async def run(self, key: Hashable, compute: Callable[[], Awaitable[T]]) -> T:
+        future = self._inflight.get(key)
+        if future is not None:
+            self.coalesced += 1
+            single_flight_calls.inc(self.name, "coalesced")
+            # shield: отмена одного из ждущих не отменяет вычисление для остальных
+            return await asyncio.shield(future)
+
+        self.executed += 1
+        single_flight_calls.inc(self.name, "executed")
+        future = self._inflight[key] = asyncio.get_running_loop().create_future()
+        try:
+            result = await compute()
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            # Ошибку получат присоединившиеся; если их нет, не пишем «исключение не получено»
+            future.exception()
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            del self._inflight[key]
+
+    def stats(self) -> dict:
+        return {"executed": self.executed, "coalesced": self.coalesced, "inflight": len(self._inflight)}
@@ -0,0 +1,51 @@
+"""
+Замер фаз запуска бота.
+
+Каждая фаза (база, расписание, прогрев кэшей...) засекается отдельно; итог
+пишется в лог одной строкой и сравнивается с бюджетом STARTUP_BUDGET_MS, а
+длительности фаз попадают в метрики. После finish бот считается готовым (/ready).
+"""
+import logging
+import time
+from contextlib import contextmanager
+
+from utils.metrics import ready, startup_phase_duration
+
+logger = logging.getLogger(__name__)
+
+
+class StartupReport:
+    def __init__(self, budget_ms: int):
+        self.budget_ms = budget_ms
+        self.phases: list[tuple[str, float]] = []
+        self._started = time.perf_counter()
+
+    @contextmanager
+    def phase(self, name: str):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - started
+            self.phases.append((name, elapsed))
+            startup_phase_duration.set(elapsed, name)
+            logger.info("Запуск: %s — %.0f мс", name, elapsed * 1000)
+
+    @property
+    def total_ms(self) -> float:
+        return (time.perf_counter() - self._started) * 1000
+
+    def finish(self) -> None:
+        total = self.total_ms
+        breakdown = ", ".join(f"{name} {elapsed * 1000:.0f}" for name, elapsed in self.phases)
+        if self.budget_ms and total > self.budget_ms:
+            logger.warning("Запуск занял %.0f мс — больше бюджета %s мс (%s)", total, self.budget_ms, breakdown)
+        else:
+            logger.info("Запуск занял %.0f мс (%s)", total, breakdown)
+        startup_phase_duration.set(total / 1000, "total")
+        ready.set(1)
+
+
+def set_not_ready() -> None:
+    """Снимает готовность при остановке, чтобы балансировщик перестал слать трафик"""
+    ready.set(0)
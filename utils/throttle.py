@@ -0,0 +1,96 @@
+"""
+Ограничение частоты обновлений от одного пользователя.
+
+У каждого пользователя своё маркерное ведро (KeyedTokenBuckets: ведро —
+несколько чисел, простаивающие вёдра удаляются). Обработчик стоит столько
+маркеров, сколько указано в THROTTLE_COSTS (по имени функции обработчика),
+остальные — один. Если маркеров не хватает совсем немного — обновление
+задерживается до THROTTLE_MAX_DELAY_MS, отдав на это время общий слот
+планировщика, иначе отбрасывается.
+"""
+import config
+from utils.metrics import registry
+from utils.rate_limit import KeyedTokenBuckets
+from utils.update_scheduler import update_scheduler
+
+# Общее расписание группы — самый длинный текст, неделя и несколько дней — дороже одного дня
+DEFAULT_COSTS = {
+    "menu_general_even": 3,
+    "menu_general_odd": 3,
+    "cmd_general_even": 3,
+    "cmd_general_odd": 3,
+    "menu_week_even": 2,
+    "menu_week_odd": 2,
+    "cmd_week_even": 2,
+    "cmd_week_odd": 2,
+    "menu_next_days": 2,
+    "cmd_next_days": 2,
+}
+
+throttled_updates = registry.counter(
+    "bot_throttled_updates_total", "Обновления, задержанные или отброшенные ограничением частоты",
+    ("handler", "result"))
+
+
+def parse_costs(value: str) -> dict[str, float]:
+    """«menu_general_even=3, cmd_today=1» → {"menu_general_even": 3.0, "cmd_today": 1.0}"""
+    costs = {}
+    for item in value.replace(" ", "").split(","):
+        if not item:
+            continue
+        name, _, cost = item.partition("=")
+        costs[name] = float(cost)
+    return costs
+
+
+class Throttle:
+    def __init__(self, rate: float, burst: float, max_delay: float, costs: dict[str, float], warn_interval: float = 10):
+        self.max_delay = max_delay
+        self.costs = costs
+        self.buckets = KeyedTokenBuckets(rate, burst)
+        # Предупреждение о частых нажатиях — не чаще раза в THROTTLE_WARN_INTERVAL (0 — без предупреждений)
+        self.warnings = KeyedTokenBuckets(1 / warn_interval) if warn_interval > 0 else None
+        self.delayed = 0
+        self.dropped = 0
+
+    def cost(self, handler_name: str) -> float:
+        return self.costs.get(handler_name, 1.0)
+
+    async def admit(self, user_id: int, handler_name: str) -> bool:
+        """Пропускает обновление (возможно, после короткой паузы) или возвращает False"""
+        bucket = self.buckets.get(user_id)
+        cost = min(self.cost(handler_name), bucket.capacity)
+        if bucket.try_acquire(cost):
+            return True
+
+        if bucket.wait_time(cost) <= self.max_delay:
+            self.delayed += 1
+            throttled_updates.inc(handler_name, "delayed")
+            # Пауза не должна занимать слот, нужный другим пользователям
+            async with update_scheduler.released():
+                await bucket.acquire(cost)
+            return True
+
+        self.dropped += 1
+        throttled_updates.inc(handler_name, "dropped")
+        return False
+
+    def should_warn(self, user_id: int) -> bool:
+        return self.warnings is not None and self.warnings.get(user_id).try_acquire()
+
+    def stats(self) -> dict:
+        return {
+            "users": len(self.buckets),
+            "evicted": self.buckets.evicted,
+            "delayed": self.delayed,
+            "dropped": self.dropped,
+        }
+
+
+throttle = Throttle(
+    rate=config.THROTTLE_RATE,
+    burst=config.THROTTLE_BURST,
+    max_delay=config.THROTTLE_MAX_DELAY_MS / 1000,
+    costs={**DEFAULT_COSTS, **parse_costs(config.THROTTLE_COSTS)},
+    warn_interval=config.THROTTLE_WARN_INTERVAL,
+)
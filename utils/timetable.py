@@ -0,0 +1,230 @@
+"""
+Снимок расписания в памяти процесса.
+
+Расписание меняется редко, поэтому все пары всех групп загружаются из базы
+один раз (уже упорядоченными по группе, дню и времени) и раскладываются по
+индексам с группой в начале ключа. Запросы пользователей обслуживаются из
+снимка без обращений к базе, и их стоимость не зависит от числа групп. При
+изменении данных собирается новый снимок, который подменяет текущий целиком
+одним присваиванием.
+"""
+import asyncio
+import inspect
+import logging
+from bisect import bisect_left
+from collections import defaultdict
+from dataclasses import dataclass, field
+from typing import Any, Callable, Sequence
+
+from tortoise.functions import Count, Max
+
+from models import Group, Lesson
+from utils.schedule_import import LessonRow, ScheduleImportError
+from utils.schedule_sync import ChangeSet, compute_changes
+from utils.single_flight import SingleFlight
+
+logger = logging.getLogger(__name__)
+
+DAYS_IN_WEEK = 7
+
+
+def normalize_group_name(name: str) -> str:
+    """Ключ для поиска группы: без регистра, пробелов и дефисов («ивт 21» == «ИВТ-21»)"""
+    return "".join(ch for ch in name.casefold() if ch.isalnum())
+
+
+@dataclass(frozen=True)
+class TimetableSnapshot:
+    """Неизменяемый снимок расписания с индексами по (группа, тип недели, день, подгруппа)"""
+    version: int
+    lessons: tuple[Lesson, ...] = ()
+    # Отпечаток таблицы пар, из которой собран снимок: одинаков во всех процессах
+    fingerprint: tuple | None = None
+    groups: dict[int, str] = field(default_factory=dict)
+    subgroups: dict[int, frozenset[int]] = field(default_factory=dict)
+    _general_week: dict[tuple[int, str], tuple[Lesson, ...]] = field(default_factory=dict, repr=False)
+    _user_week: dict[tuple[int, str, int | None], tuple[Lesson, ...]] = field(default_factory=dict, repr=False)
+    _user_day: dict[tuple[int, str, int, int | None], tuple[Lesson, ...]] = field(default_factory=dict, repr=False)
+    _group_keys: tuple[tuple[str, int], ...] = field(default=(), repr=False)
+
+    @classmethod
+    def build(cls, lessons: Sequence[Lesson], version: int, groups: dict[int, str] | None = None,
+              fingerprint: tuple | None = None) -> "TimetableSnapshot":
+        """Строит индексы; lessons должны быть упорядочены по (группа, день, начало, подгруппа)"""
+        ordered = tuple(lessons)
+
+        by_day: dict[tuple[int, str, int], list[Lesson]] = defaultdict(list)
+        general_week: dict[tuple[int, str], list[Lesson]] = defaultdict(list)
+        week_types: dict[int, set[str]] = defaultdict(set)
+        subgroups: dict[int, set[int]] = defaultdict(set)
+        for lesson in ordered:
+            by_day[(lesson.group_id, lesson.week_type, lesson.day_of_week)].append(lesson)
+            general_week[(lesson.group_id, lesson.week_type)].append(lesson)
+            week_types[lesson.group_id].add(lesson.week_type)
+            if lesson.subgroup is not None:
+                subgroups[lesson.group_id].add(lesson.subgroup)
+
+        # Для каждой подгруппы группы заранее отбираем общие пары и пары подгруппы,
+        # None — выборка только общих пар (подгруппа без собственных занятий).
+        # Фильтрация сохраняет порядок, поэтому повторная сортировка не нужна
+        user_day: dict[tuple[int, str, int, int | None], tuple[Lesson, ...]] = {}
+        user_week: dict[tuple[int, str, int | None], tuple[Lesson, ...]] = {}
+        for group_id, group_week_types in week_types.items():
+            for week_type in group_week_types:
+                for subgroup in (None, *subgroups[group_id]):
+                    week_lessons: list[Lesson] = []
+                    for day in range(DAYS_IN_WEEK):
+                        day_lessons = tuple(
+                            l for l in by_day.get((group_id, week_type, day), ())
+                            if l.subgroup is None or l.subgroup == subgroup
+                        )
+                        user_day[(group_id, week_type, day, subgroup)] = day_lessons
+                        week_lessons.extend(day_lessons)
+                    user_week[(group_id, week_type, subgroup)] = tuple(week_lessons)
+
+        groups = dict(groups or {})
+        return cls(
+            version=version,
+            lessons=ordered,
+            fingerprint=fingerprint,
+            groups=groups,
+            subgroups={group_id: frozenset(values) for group_id, values in subgroups.items()},
+            _general_week={k: tuple(v) for k, v in general_week.items()},
+            _user_week=user_week,
+            _user_day=user_day,
+            _group_keys=tuple(sorted((normalize_group_name(name), group_id) for group_id, name in groups.items())),
+        )
+
+    def _subgroup_key(self, group_id: int | None, subgroup: int | None) -> int | None:
+        return subgroup if subgroup in self.subgroups.get(group_id, ()) else None
+
+    def group_subgroups(self, group_id: int | None) -> frozenset[int]:
+        """Подгруппы, у которых в группе есть собственные пары"""
+        return self.subgroups.get(group_id, frozenset())
+
+    def find_group(self, name: str) -> int | None:
+        """id группы по названию без учёта регистра, пробелов и дефисов"""
+        key = normalize_group_name(name)
+        index = bisect_left(self._group_keys, (key,))
+        if index < len(self._group_keys) and self._group_keys[index][0] == key:
+            return self._group_keys[index][1]
+        return None
+
+    def search_groups(self, prefix: str, limit: int = 10) -> list[int]:
+        """id групп, названия которых начинаются с prefix, в алфавитном порядке"""
+        key = normalize_group_name(prefix)
+        index = bisect_left(self._group_keys, (key,))
+        found = []
+        for group_key, group_id in self._group_keys[index:index + limit]:
+            if not group_key.startswith(key):
+                break
+            found.append(group_id)
+        return found
+
+    def general_week(self, group_id: int | None, week_type: str) -> tuple[Lesson, ...]:
+        return self._general_week.get((group_id, week_type), ())
+
+    def user_week(self, group_id: int | None, week_type: str, subgroup: int | None) -> tuple[Lesson, ...]:
+        return self._user_week.get((group_id, week_type, self._subgroup_key(group_id, subgroup)), ())
+
+    def user_day(self, group_id: int | None, week_type: str, day_of_week: int, subgroup: int | None) -> tuple[Lesson, ...]:
+        return self._user_day.get((group_id, week_type, day_of_week, self._subgroup_key(group_id, subgroup)), ())
+
+
+TimetableListener = Callable[[TimetableSnapshot, TimetableSnapshot, ChangeSet | None], Any]
+
+_snapshot = TimetableSnapshot(version=0)
+_fingerprint: tuple | None = None
+_listeners: list[TimetableListener] = []
+timetable_reloads = SingleFlight("timetable_reload")
+
+
+def on_timetable_change(listener: TimetableListener) -> TimetableListener:
+    """
+    Регистрирует обработчик смены снимка: listener(old, new, changes).
+    changes — набор изменений между снимками или None, если его не удалось вычислить.
+    """
+    _listeners.append(listener)
+    return listener
+
+
+def diff_snapshots(old: TimetableSnapshot, new: TimetableSnapshot) -> ChangeSet | None:
+    try:
+        return compute_changes(
+            (LessonRow.from_lesson(lesson) for lesson in old.lessons),
+            (LessonRow.from_lesson(lesson) for lesson in new.lessons),
+        )
+    except ScheduleImportError:
+        # Дубликаты по естественному ключу — точный дифф невозможен
+        return None
+
+
+def get_timetable() -> TimetableSnapshot:
+    """Текущий снимок расписания"""
+    return _snapshot
+
+
+async def get_timetable_fingerprint() -> tuple:
+    """Дешёвый отпечаток таблицы пар: меняется при любом изменении расписания"""
+    row = await (Lesson
+                 .annotate(count=Count("id"), max_id=Max("id"), max_updated_at=Max("updated_at"))
+                 .first()
+                 .values("count", "max_id", "max_updated_at"))
+    return row["count"], row["max_id"], row["max_updated_at"]
+
+
+async def load_timetable() -> TimetableSnapshot:
+    """
+    Загружает расписание из базы и атомарно подменяет текущий снимок.
+    Одновременные перезагрузки (команда администратора и фоновая проверка)
+    объединяются в одну.
+    """
+    return await timetable_reloads.run(None, _load_timetable)
+
+
+async def _load_timetable() -> TimetableSnapshot:
+    global _snapshot, _fingerprint
+
+    fingerprint = await get_timetable_fingerprint()
+    groups = dict(await Group.all().values_list("id", "name"))
+    lessons = await (Lesson.all()
+                     .order_by("group_id", "day_of_week", "start_minutes", "subgroup")
+                     .prefetch_related("subject", "group"))
+    old = _snapshot
+    snapshot = TimetableSnapshot.build(lessons, version=old.version + 1, groups=groups, fingerprint=fingerprint)
+    _snapshot = snapshot
+    _fingerprint = fingerprint
+
+    changes = diff_snapshots(old, snapshot)
+    logger.info(
+        "Снимок расписания загружен: %s групп, %s пар, версия %s, изменения: %s",
+        len(snapshot.groups), len(snapshot.lessons), snapshot.version, changes if changes is not None else "неизвестны"
+    )
+
+    for listener in _listeners:
+        try:
+            result = listener(old, snapshot, changes)
+            if inspect.isawaitable(result):
+                await result
+        except Exception:
+            logger.exception("Ошибка обработчика смены расписания")
+
+    return snapshot
+
+
+async def refresh_timetable_if_changed() -> bool:
+    """Перезагружает снимок, если расписание в базе изменилось (например, после fill_schedule.py)"""
+    if await get_timetable_fingerprint() == _fingerprint:
+        return False
+    await load_timetable()
+    return True
+
+
+async def watch_timetable(interval: float) -> None:
+    """Фоновая проверка изменений расписания, сделанных другим процессом"""
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            await refresh_timetable_if_changed()
+        except Exception:
+            logger.exception("Не удалось обновить снимок расписания")
@@ -0,0 +1,132 @@
+"""
+Планировщик обработки обновлений: общий предел параллельности и порядок по пользователю.
+
+Обновления одного пользователя (event.from_user.id, как в UserMiddleware)
+обрабатываются строго по очереди: смена подгруппы и следующее за ней «На
+сегодня» не обгонят друг друга. Обновления разных пользователей идут
+параллельно, но одновременно обрабатывается не больше max_concurrency.
+
+Планировщик подключается к диспетчеру как events_isolation: FSMContextMiddleware
+берёт его блокировку до чтения состояния, поэтому и состояние FSM читается уже
+после завершения предыдущего обновления того же пользователя. Ожидающий своей
+очереди пользователь не занимает общий слот.
+
+Обратное давление: пока обновлений в работе и в ожидании не меньше max_pending,
+polling не забирает новые (tasks_concurrency_limit), а webhook отвечает Telegram
+ошибкой, и тот повторит доставку позже.
+
+Ожидание, которое не работа (пауза ограничения частоты), обработчик проводит
+в released(): общий слот на это время отдаётся другим пользователям.
+"""
+import asyncio
+import time
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
+from typing import AsyncGenerator
+
+from aiogram.fsm.storage.base import BaseEventIsolation, StorageKey
+
+import config
+from utils.metrics import update_wait_duration, updates_running, updates_waiting
+
+# Держит ли текущее обновление общий слот
+_holding_slot: ContextVar[bool] = ContextVar("holding_slot", default=False)
+
+
+class UpdateScheduler(BaseEventIsolation):
+    def __init__(self, max_concurrency: int = 50, max_pending: int = 1000):
+        self.max_concurrency = max_concurrency
+        self.max_pending = max_pending
+        self.processed = 0
+        self.max_wait = 0.0
+        self._slots = asyncio.Semaphore(max_concurrency)
+        # user_id → [блокировка, сколько обновлений пользователя в работе и в ожидании]
+        self._users: dict[int, list] = {}
+        self._waiting = 0
+        self._running = 0
+
+    @property
+    def pending(self) -> int:
+        return self._waiting + self._running
+
+    @property
+    def saturated(self) -> bool:
+        return self.pending >= self.max_pending
+
+    def _update_gauges(self) -> None:
+        updates_waiting.set(self._waiting)
+        updates_running.set(self._running)
+
+    @asynccontextmanager
+    async def lock(self, key: StorageKey) -> AsyncGenerator[None, None]:
+        entry = self._users.get(key.user_id)
+        if entry is None:
+            entry = self._users[key.user_id] = [asyncio.Lock(), 0]
+        entry[1] += 1
+        self._waiting += 1
+        self._update_gauges()
+        started = time.perf_counter()
+        acquired = False
+        try:
+            # Сначала очередь пользователя, потом общий слот: пользователь с длинной
+            # очередью держит не больше одного слота
+            async with entry[0]:
+                async with self._slots:
+                    waited = time.perf_counter() - started
+                    update_wait_duration.observe(waited)
+                    self.max_wait = max(self.max_wait, waited)
+                    self._waiting -= 1
+                    self._running += 1
+                    acquired = True
+                    self._update_gauges()
+                    token = _holding_slot.set(True)
+                    try:
+                        yield
+                    finally:
+                        _holding_slot.reset(token)
+        finally:
+            if acquired:
+                self._running -= 1
+                self.processed += 1
+            else:
+                self._waiting -= 1
+            self._update_gauges()
+            entry[1] -= 1
+            if entry[1] == 0:
+                del self._users[key.user_id]
+
+    @asynccontextmanager
+    async def released(self) -> AsyncGenerator[None, None]:
+        """Отдаёт общий слот на время ожидания; очередь пользователя остаётся за обновлением"""
+        if not _holding_slot.get():
+            yield
+            return
+
+        self._slots.release()
+        self._running -= 1
+        self._waiting += 1
+        self._update_gauges()
+        try:
+            yield
+        finally:
+            # shield: при отмене слот всё равно вернётся, и выход из lock его отпустит
+            await asyncio.shield(self._slots.acquire())
+            self._waiting -= 1
+            self._running += 1
+            self._update_gauges()
+
+    async def close(self) -> None:
+        # Очереди пользователей удаляются сами, когда пустеют
+        pass
+
+    def stats(self) -> dict:
+        return {
+            "running": self._running,
+            "waiting": self._waiting,
+            "users": len(self._users),
+            "processed": self.processed,
+            "max_wait": self.max_wait,
+        }
+
+
+update_scheduler = UpdateScheduler(config.UPDATE_CONCURRENCY, config.UPDATE_QUEUE_LIMIT)
@@ -1,20 +1,60 @@
+from datetime import datetime, timedelta, timezone
+
 from models import User
+from utils.ics import feed_audiences
+from utils.reminders import update_subscription
+from utils.single_flight import SingleFlight
+from utils.user_cache import user_cache
+from utils.user_queue import upsert_users, user_upsert_queue
+
+# Одновременные промахи кэша по одному пользователю — один запрос к базе
+user_lookups = SingleFlight("user_lookup")
+
+# last_seen_at обновляется не чаще раза в час: точнее для прогрева кэша не нужно,
+# а запись на каждое сообщение свела бы на нет пакетную запись
+LAST_SEEN_RESOLUTION = timedelta(hours=1)
 
 
 async def get_or_create_user(user_id: int, username: str = None, full_name: str = None) -> User:
     """Получить или создать пользователя"""
-    user, created = await User.get_or_create(
-        id=user_id,
-        defaults={
-            'username': username,
-            'full_name': full_name
-        }
-    )
-    if not created:
-        # Обновляем данные, если они изменились
+    now = datetime.now(timezone.utc)
+    user = user_cache.get(user_id)
+    if user is None:
+        user = user_upsert_queue.get(user_id) or await user_lookups.run(user_id, lambda: User.get_or_none(id=user_id))
+        if user is not None:
+            user_cache.put(user)
+
+    if user is None:
+        # Новый пользователь попадёт в базу со следующим сбросом очереди
+        user = User(id=user_id, username=username, full_name=full_name, last_seen_at=now)
+        user_upsert_queue.enqueue(user)
+        user_cache.put(user)
+    else:
+        # Обновляем данные, только если они изменились
+        changed = False
         if username and user.username != username:
             user.username = username
+            changed = True
         if full_name and user.full_name != full_name:
             user.full_name = full_name
-        await user.save()
+            changed = True
+        if user.last_seen_at is None or now - user.last_seen_at >= LAST_SEEN_RESOLUTION:
+            user.last_seen_at = now
+            changed = True
+        if changed:
+            user_upsert_queue.enqueue(user)
+
     return user
+
+
+async def save_user_settings(user: User, **values) -> None:
+    """Сохраняет настройки пользователя и сразу обновляет кэш и подписки на напоминания"""
+    for name, value in values.items():
+        setattr(user, name, value)
+
+    await upsert_users([user], ['username', 'full_name', *values, 'updated_at'])
+    user_upsert_queue.discard(user.id)
+    user_cache.put(user)
+    update_subscription(user)
+    feed_audiences.update(user)
+
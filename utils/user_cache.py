@@ -0,0 +1,78 @@
+"""
+Кэш пользователей для UserMiddleware.
+
+Хранит последние использованные объекты User с ограничением по размеру (LRU)
+и по времени жизни записи (TTL). Изменения, сделанные ботом, пишутся в базу
+и сразу попадают в кэш. Запись профилей в базу — в utils/user_queue.py.
+
+Кэш живёт в памяти одного процесса: изменение группы или подгруппы, сохранённое
+другим экземпляром бота, здесь не видно до истечения TTL. Поэтому в режиме
+webhook, где экземпляров может быть несколько, по умолчанию кэш выключен
+(USER_CACHE_SIZE=0); при единственном экземпляре его можно включить явно.
+"""
+import time
+from collections import OrderedDict
+
+import config
+from models import User
+
+# Размер по умолчанию для polling, где процесс всегда один
+DEFAULT_SIZE = 10000
+
+
+class UserCache:
+    def __init__(self, max_size: int = DEFAULT_SIZE, ttl: float = 600):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._items: OrderedDict[int, tuple[float, User]] = OrderedDict()
+
+    def get(self, user_id: int) -> User | None:
+        item = self._items.get(user_id)
+        if item is None:
+            self.misses += 1
+            return None
+
+        cached_at, user = item
+        if time.monotonic() - cached_at > self.ttl:
+            del self._items[user_id]
+            self.misses += 1
+            return None
+
+        self._items.move_to_end(user_id)
+        self.hits += 1
+        return user
+
+    def put(self, user: User) -> None:
+        self._items[user.id] = (time.monotonic(), user)
+        self._items.move_to_end(user.id)
+
+        while len(self._items) > self.max_size:
+            self._items.popitem(last=False)
+            self.evictions += 1
+
+    def invalidate(self, user_id: int) -> None:
+        self._items.pop(user_id, None)
+
+    def clear(self) -> None:
+        self._items.clear()
+
+    def stats(self) -> dict[str, int]:
+        return {
+            "size": len(self._items),
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
+
+    def configure(self, mode: str) -> None:
+        """Размер из USER_CACHE_SIZE, а без него — по режиму: в webhook кэш выключен"""
+        if config.USER_CACHE_SIZE:
+            self.max_size = int(config.USER_CACHE_SIZE)
+        else:
+            self.max_size = 0 if mode == "webhook" else DEFAULT_SIZE
+
+
+user_cache = UserCache(ttl=config.USER_CACHE_TTL)
@@ -0,0 +1,115 @@
+"""
+Отложенная пакетная запись пользователей.
+
+Новые пользователи, изменения профилей и отметки активности (last_seen_at, не
+чаще раза в час на пользователя) не пишутся в базу на каждое сообщение,
+а копятся в очереди. Фоновая задача сбрасывает очередь одним upsert-запросом
+раз в flush_interval секунд или сразу, как только накопилось max_batch записей.
+"""
+import asyncio
+import logging
+from typing import Iterable
+
+from models import User
+
+logger = logging.getLogger(__name__)
+
+UPSERT_FIELDS = ["username", "full_name", "updated_at", "last_seen_at"]
+
+
+async def upsert_users(users: Iterable[User], update_fields: list[str]) -> None:
+    """
+    Вставляет пользователей или обновляет update_fields у существующих.
+
+    id у User автоинкрементный, и для объекта, загруженного из базы, Tortoise не
+    передаёт его в INSERT — upsert вставил бы новую строку. Поэтому в bulk_create
+    идут копии, созданные с явным id.
+    """
+    copies = []
+    for user in users:
+        # None — значение по умолчанию (у ещё не записанного пользователя нет created_at)
+        values = {name: getattr(user, name) for name in User._meta.fields_db_projection}
+        copies.append(User(**{name: value for name, value in values.items() if value is not None}))
+    await User.bulk_create(copies, on_conflict=["id"], update_fields=update_fields)
+
+
+class UserUpsertQueue:
+    def __init__(self, flush_interval: float = 0.5, max_batch: int = 100):
+        self.flush_interval = flush_interval
+        self.max_batch = max_batch
+        self.flushes = 0
+        self.written = 0
+        self._pending: dict[int, User] = {}
+        self._wakeup = asyncio.Event()
+        self._task: asyncio.Task | None = None
+
+    def enqueue(self, user: User) -> None:
+        self._pending[user.id] = user
+        if len(self._pending) >= self.max_batch:
+            self._wakeup.set()
+
+    def get(self, user_id: int) -> User | None:
+        """Пользователь, ожидающий записи в базу"""
+        return self._pending.get(user_id)
+
+    def discard(self, user_id: int) -> None:
+        self._pending.pop(user_id, None)
+
+    @property
+    def pending_count(self) -> int:
+        return len(self._pending)
+
+    async def flush(self) -> int:
+        users = list(self._pending.values())
+        self._pending = {}
+        if not users:
+            return 0
+
+        try:
+            await upsert_users(users, UPSERT_FIELDS)
+        except Exception:
+            # Возвращаем записи в очередь, не затирая более свежие версии
+            for user in users:
+                self._pending.setdefault(user.id, user)
+            raise
+
+        self.flushes += 1
+        self.written += len(users)
+        return len(users)
+
+    async def run(self) -> None:
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+
+            try:
+                await self.flush()
+            except Exception:
+                logger.exception("Не удалось сохранить пользователей")
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self.run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.flush()
+
+    def stats(self) -> dict[str, int]:
+        return {
+            "pending": len(self._pending),
+            "flushes": self.flushes,
+            "written": self.written,
+        }
+
+
+user_upsert_queue = UserUpsertQueue()
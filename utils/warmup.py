@@ -0,0 +1,50 @@
+"""
+Прогрев кэшей при запуске, до приёма обновлений.
+
+Заранее рендерятся виды, которые показывают кнопки меню: дни на неделю вперёд
+и недельные расписания каждой группы и подгруппы, — и загружаются недавно
+активные пользователи. Первые после перезапуска запросы отдаются из памяти.
+"""
+from datetime import date, timedelta
+
+from models import User
+from utils.render_cache import (
+    render_cache,
+    render_day_schedule,
+    render_general_week_schedule,
+    render_user_week_schedule,
+)
+from utils.timetable import TimetableSnapshot
+from utils.user_cache import user_cache
+
+# Столько дней показывает «7 дней»; вперёд дальше прогревать незачем
+WARM_DAYS = 7
+
+
+def warm_render_cache(snapshot: TimetableSnapshot, today: date) -> int:
+    """Рендерит виды меню для всех групп; возвращает число текстов в кэше"""
+    # Половина кэша остаётся под запросы, чтобы прогрев не вытеснил сам себя
+    limit = render_cache.max_size // 2
+    for group_id in snapshot.groups:
+        for week_type in ("even", "odd"):
+            render_general_week_schedule(group_id, week_type)
+        for subgroup in sorted(snapshot.group_subgroups(group_id)) or [None]:
+            if len(render_cache) >= limit:
+                return len(render_cache)
+            for week_type in ("even", "odd"):
+                render_user_week_schedule(group_id, subgroup, week_type)
+            for offset in range(WARM_DAYS):
+                render_day_schedule(group_id, subgroup, today + timedelta(days=offset))
+    return len(render_cache)
+
+
+async def warm_user_cache(limit: int) -> int:
+    """Загружает в кэш недавно активных пользователей одним запросом"""
+    limit = min(limit, user_cache.max_size)
+    if limit <= 0:
+        return 0
+    users = await User.filter(last_seen_at__isnull=False).order_by("-last_seen_at").limit(limit)
+    for user in reversed(users):
+        # Самые свежие кладутся последними и вытесняются из LRU последними
+        user_cache.put(user)
+    return len(users)
@@ -0,0 +1,76 @@
+"""
+Приём обновлений через webhook на aiohttp
+"""
+import asyncio
+import logging
+
+from aiohttp import web
+from aiogram import Bot, Dispatcher
+from aiogram.webhook.aiohttp_server import SimpleRequestHandler, setup_application
+
+import config
+from utils.metrics import updates_rejected
+from utils.update_scheduler import update_scheduler
+
+logger = logging.getLogger(__name__)
+
+
+class ScheduledRequestHandler(SimpleRequestHandler):
+    """Не принимает обновления, пока очередь планировщика заполнена: Telegram повторит их позже"""
+
+    async def _handle_request_background(self, bot: Bot, request: web.Request) -> web.Response:
+        if update_scheduler.saturated:
+            updates_rejected.inc()
+            return web.Response(status=503, text="Overloaded")
+        return await super()._handle_request_background(bot, request)
+
+
+def create_webhook_app(bot: Bot, dp: Dispatcher) -> web.Application:
+    app = web.Application()
+    handler = ScheduledRequestHandler(
+        dispatcher=dp,
+        bot=bot,
+        secret_token=config.WEBHOOK_SECRET,
+        handle_in_background=True,
+    )
+
+    async def drain_updates(_: web.Application) -> None:
+        """Дожидается обработчиков, запущенных до остановки сервера"""
+        tasks = set(handler._background_feed_update_tasks)
+        if not tasks:
+            return
+
+        logger.info("Ожидание завершения %s обработчиков", len(tasks))
+        _, pending = await asyncio.wait(tasks, timeout=config.WEBHOOK_DRAIN_TIMEOUT)
+        for task in pending:
+            task.cancel()
+        if pending:
+            logger.warning("Прервано %s обработчиков по таймауту", len(pending))
+
+    # Порядок важен: сначала дожидаемся обработчиков, потом закрываем
+    # сессию бота (register) и базу данных (shutdown диспетчера)
+    app.on_shutdown.append(drain_updates)
+    handler.register(app, path=config.WEBHOOK_PATH)
+    setup_application(app, dp, bot=bot)
+    return app
+
+
+async def set_webhook(bot: Bot, dispatcher: Dispatcher) -> None:
+    if not config.WEBHOOK_BASE_URL:
+        logger.warning("WEBHOOK_BASE_URL не задан, webhook в Telegram не регистрируется")
+        return
+
+    await bot.set_webhook(
+        url=config.WEBHOOK_BASE_URL.rstrip("/") + config.WEBHOOK_PATH,
+        secret_token=config.WEBHOOK_SECRET,
+        allowed_updates=dispatcher.resolve_used_update_types(),
+    )
+
+
+def run_webhook(bot: Bot, dp: Dispatcher) -> None:
+    if not config.WEBHOOK_SECRET:
+        raise ValueError('WEBHOOK_SECRET не найден в .env файле!')
+
+    dp.startup.register(set_webhook)
+    app = create_webhook_app(bot, dp)
+    web.run_app(app, host=config.WEBAPP_HOST, port=config.WEBAPP_PORT, print=None)